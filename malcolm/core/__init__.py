@@ -1,9 +1,9 @@
 # Make a nice namespace
 from .alarm import Alarm, AlarmSeverity, AlarmStatus
 from .camel import CAMEL_RE, camel_to_title, snake_to_camel
-from .concurrency import Queue, RLock, Spawned, sleep
+from .concurrency import Event, Queue, RLock, Spawned, sleep
 from .context import Context
-from .controller import DEFAULT_TIMEOUT, ADescription, AMri, Controller
+from .controller import DEFAULT_TIMEOUT, ADescription, AMri, Controller, get_endpoint
 from .define import Define
 from .errors import (
     AbortedError,
@@ -16,7 +16,7 @@ from .errors import (
     UnexpectedError,
     YamlError,
 )
-from .future import Future
+from .future import BatchFuture, Future
 from .hook import AHookable, Hook, Hookable
 from .info import Info
 from .loggable import Loggable
@@ -52,7 +52,7 @@ from .models import (
     VMeta,
 )
 from .moduleutil import submodule_all
-from .notifier import Notifier
+from .notifier import Notifier, squash_changes
 from .part import PART_NAME_RE, APartName, Part, PartRegistrar
 from .process import (
     APublished,
@@ -65,6 +65,7 @@ from .process import (
 )
 from .request import Get, PathRequest, Post, Put, Request, Subscribe, Unsubscribe
 from .response import Delta, Error, Response, Return, Update
+from .serializers import json_encode, serialize_fields, serialize_hook
 from .stateset import StateSet
 from .table import Table
 from .tags import (
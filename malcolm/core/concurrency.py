@@ -1,7 +1,7 @@
 import logging
 import time
 from threading import get_ident as get_thread_ident
-from typing import Any, Callable, Dict, Tuple, TypeVar, Union
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar, Union
 
 import cothread
 
@@ -53,9 +53,13 @@ class Spawned:
         self._result_queue.put(None)
 
     def wait(self, timeout: float = None) -> None:
-        # Only one person can wait on this at a time
+        """Wait for the function to finish. Any number of cothreads can wait,
+        as Controller.handle_request returns one Spawned for a batch of
+        Requests"""
         if self._result == self.NO_RESULT:
             self._result_queue.get(timeout)
+            # Pass it on in case anyone else is waiting on us too
+            self._result_queue.put(None)
 
     def ready(self) -> bool:
         """Return True if the spawned result has returned or errored"""
@@ -69,6 +73,29 @@ class Spawned:
         return self._result
 
 
+class Event:
+    """Event that any number of cothreads can wait for, with the same interface
+    as threading.Event so it can be passed to code written for threads"""
+
+    def __init__(self):
+        self._event = cothread.Event(auto_reset=False)
+
+    def is_set(self) -> bool:
+        return bool(self._event)
+
+    def set(self) -> None:
+        self._event.Signal()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the event to be set, returning False if it timed out"""
+        try:
+            self._event.Wait(timeout)
+        except cothread.Timedout:
+            return False
+        else:
+            return True
+
+
 class Queue:
     """Threadsafe and cothreadsafe queue with gets in calling thread"""
 
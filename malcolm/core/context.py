@@ -1,13 +1,15 @@
 import logging
 import time
 import weakref
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple, Union
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
 
 import cothread
 
+from malcolm.compat import OrderedDict
+
 from .concurrency import Queue
 from .errors import AbortedError, BadValueError, TimeoutError
-from .future import Future
+from .future import BatchFuture, Future
 from .request import Post, Put, Request, Subscribe, Unsubscribe
 from .response import Error, Return, Update
 
@@ -36,6 +38,8 @@ class Context:
         self._subscriptions: Dict[int, Tuple[Callable, Any]] = {}
         self._requests: Dict[Future, Request] = {}
         self._pending_unsubscribes: Dict[Future, Subscribe] = {}
+        # Incremented every time a Future is concluded
+        self._concluded_count = 0
         # If not None, wait for this before listening to STOPs
         self._sentinel_stop = None
 
@@ -80,21 +84,47 @@ class Context:
         self._notify_dispatch_request = notify_dispatch_request
         self._notify_args = args
 
-    def _dispatch_request(self, request):
+    def _register_request(self, controller, request):
+        request.set_callback(self._q.put)
         future = Future(weakref.proxy(self))
         self._futures[request.id] = future
         self._requests[future] = request
-        controller = self.get_controller(request.path[0])
         if self._notify_dispatch_request:
             self._notify_dispatch_request(request, *self._notify_args)
+        return future
+
+    def _dispatch_request(self, request):
+        controller = self.get_controller(request.path[0])
+        future = self._register_request(controller, request)
         self.handle_request(controller, request)
         return future
 
+    def _dispatch_batch(self, requests):
+        # Find all the controllers first, so an unknown mri fails before any
+        # futures are registered
+        controllers = [self.get_controller(request.path[0]) for request in requests]
+        futures = OrderedDict()
+        controller_requests = OrderedDict()
+        for controller, request in zip(controllers, requests):
+            future = self._register_request(controller, request)
+            futures[".".join(request.path)] = future
+            controller_requests.setdefault(controller, []).append(request)
+        for controller, requests in controller_requests.items():
+            self.handle_each_request(controller, requests)
+        return BatchFuture(weakref.proxy(self), futures)
+
     def handle_request(self, controller, request):
         controller.handle_request(request)
         # Yield control to allow the request to be handled
         cothread.Yield()
 
+    def handle_each_request(self, controller, requests):
+        # The controller handles each request on its own, but we only need
+        # to yield once for all of them
+        for request in requests:
+            controller.handle_request(request)
+        cothread.Yield()
+
     def ignore_stops_before_now(self):
         """Ignore any stops received before this point"""
         self._sentinel_stop = object()
@@ -133,7 +163,6 @@ class Context:
              Future: A single Future which will resolve to the result
         """
         request = Put(self._get_next_id(), path, value)
-        request.set_callback(self._q.put)
         future = self._dispatch_request(request)
         return future
 
@@ -166,10 +195,83 @@ class Context:
              Future: as single Future that will resolve to the result
         """
         request = Post(self._get_next_id(), path, params)
-        request.set_callback(self._q.put)
         future = self._dispatch_request(request)
         return future
 
+    def put_values(self, values, timeout=None, event_timeout=None):
+        """Puts values to attributes of one or more Blocks and returns when
+        they all complete
+
+        Args:
+            values (dict): {mri: {attr: value}} of the values to put
+            timeout (float): time in seconds to wait for responses, wait forever
+                if None
+            event_timeout: maximum time in seconds to wait between each response
+                event, wait forever if None
+
+        Returns:
+            dict: {path: result} where path is "mri.attr.value"
+        """
+        future = self.put_values_async(values)
+        self.wait_all_futures(future, timeout=timeout, event_timeout=event_timeout)
+        return future.result()
+
+    def put_values_async(self, values):
+        """Puts values to attributes of one or more Blocks and returns
+        immediately. The Puts for each Block are sent to its controller
+        together
+
+        Args:
+            values (dict): {mri: {attr: value}} of the values to put
+
+        Returns:
+            BatchFuture: A single Future which will resolve when all the Puts
+                complete, raising a ResponseError listing any that failed
+        """
+        requests = []
+        for mri, attr_values in values.items():
+            for attr, value in attr_values.items():
+                path = [mri, attr, "value"]
+                requests.append(Put(self._get_next_id(), path, value))
+        future = self._dispatch_batch(requests)
+        return future
+
+    def post_methods(self, params, timeout=None, event_timeout=None):
+        """Synchronously calls methods of one or more Blocks
+
+        Args:
+            params (dict): {mri: {method: params}} of the methods to call
+            timeout (float): time in seconds to wait for responses, wait forever
+                if None
+            event_timeout: maximum time in seconds to wait between each response
+                event, wait forever if None
+
+        Returns:
+            dict: {path: result} where path is "mri.method"
+        """
+        future = self.post_methods_async(params)
+        self.wait_all_futures(future, timeout=timeout, event_timeout=event_timeout)
+        return future.result()
+
+    def post_methods_async(self, params):
+        """Asynchronously calls methods of one or more Blocks. The Posts for
+        each Block are sent to its controller together
+
+        Args:
+            params (dict): {mri: {method: params}} of the methods to call
+
+        Returns:
+            BatchFuture: A single Future which will resolve when all the Posts
+                complete, raising a ResponseError listing any that failed
+        """
+        requests = []
+        for mri, method_params in params.items():
+            for method, method_param in method_params.items():
+                path = [mri, method]
+                requests.append(Post(self._get_next_id(), path, method_param))
+        future = self._dispatch_batch(requests)
+        return future
+
     def subscribe(self, path, callback, *args):
         """Subscribe to changes in a given attribute and call
         ``callback(future, value, *args)`` when it changes
@@ -178,7 +280,6 @@ class Context:
             Future: A single Future which will resolve to the result
         """
         request = Subscribe(self._get_next_id(), path, delta=False)
-        request.set_callback(self._q.put)
         # If self is in args, then make weak version of it
         saved_args = []
         for arg in args:
@@ -298,14 +399,21 @@ class Context:
             else:
                 futures = []
 
-        filtered_futures = []
+        # Use a dict as an ordered set so concluded futures can be removed
+        # cheaply. The value is the BatchFuture it is part of, if any
+        filtered_futures: Dict[Future, Optional[BatchFuture]] = {}
 
         for f in futures:
-            if f.done():
+            if isinstance(f, BatchFuture):
+                # Wait for all of the batch, it will raise errors at the end
+                for child in f.futures.values():
+                    if not child.done():
+                        filtered_futures[child] = f
+            elif f.done():
                 if f.exception() is not None:
                     raise f.exception()
             else:
-                filtered_futures.append(f)
+                filtered_futures[f] = None
 
         until: Union[float, None]
         while filtered_futures:
@@ -317,6 +425,10 @@ class Context:
                 until = end
             self._service_futures(filtered_futures, until)
 
+        for f in futures:
+            if isinstance(f, BatchFuture) and f.exception() is not None:
+                raise f.exception()
+
     def sleep(self, seconds):
         """Services all futures while waiting
 
@@ -326,7 +438,7 @@ class Context:
         until = time.time() + seconds
         try:
             while True:
-                self._service_futures([], until)
+                self._service_futures({}, until)
         except TimeoutError:
             return
 
@@ -367,7 +479,8 @@ class Context:
 
     def _service_futures(self, futures, until=None):
         """Args:
-            futures (list): The futures to service
+            futures (dict): {Future: BatchFuture or None} of the futures to
+                service, any that conclude will be removed from it
             until (float): Timestamp to wait until
         """
         if until is None:
@@ -394,33 +507,30 @@ class Context:
             # This is an update for a subscription
             if response.id in self._subscriptions:
                 func, args = self._subscriptions[response.id]
+                concluded_count = self._concluded_count
                 func(response.value, *args)
-            # func() may call wait_for_futures() which may call set_result on
-            # some futures that aren't known to it. This means that some of
-            # our futures list are now concluded, so filter them out. If we
-            # didn't do this we would hang forever
-            for future in futures:
-                if future not in self._requests:
-                    futures.remove(future)
+                # func() may call wait_for_futures() which may call set_result
+                # on some futures that aren't known to it. This means that
+                # some of our futures are now concluded, so filter them out.
+                # If we didn't do this we would hang forever
+                if concluded_count != self._concluded_count:
+                    for future in [f for f in futures if f.done()]:
+                        del futures[future]
         elif isinstance(response, Return):
             future = self._futures.pop(response.id)
             del self._requests[future]
             self._pending_unsubscribes.pop(future, None)
             result = response.value
             future.set_result(result)
-            try:
-                futures.remove(future)
-            except ValueError:
-                pass
+            self._concluded_count += 1
+            futures.pop(future, None)
         elif isinstance(response, Error):
             future = self._futures.pop(response.id)
             del self._requests[future]
             future.set_exception(response.message)
-            try:
-                futures.remove(future)
-            except ValueError:
-                pass
-            else:
+            self._concluded_count += 1
+            if future in futures and futures.pop(future) is None:
+                # Not part of a batch, so raise now
                 raise response.message
 
 
@@ -1,5 +1,15 @@
 from contextlib import contextmanager
-from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from annotypes import Anno, stringify_error
 
@@ -13,7 +23,7 @@ from .errors import FieldError, NotWriteableError, UnexpectedError
 from .hook import Hook, Hookable, start_hooks, wait_hooks
 from .info import Info
 from .models import AttributeModel, BlockModel, MethodLog, MethodModel, Model
-from .notifier import Notifier, freeze
+from .notifier import Notifier
 from .part import FieldRegistry, InfoRegistry, Part, PartRegistrar
 from .request import Get, Post, Put, Request, Subscribe, Unsubscribe
 from .response import Response
@@ -30,6 +40,9 @@ if TYPE_CHECKING:
 # below, and is imported in a number of other Controller subclasses
 DEFAULT_TIMEOUT = 10.0
 
+# Maximum number of Gets, Subscribes and Unsubscribes to handle in one batch
+REQUEST_BATCH_SIZE = 100
+
 
 with Anno("The Malcolm Resource Identifier for the Block produced"):
     AMri = str
@@ -37,6 +50,36 @@ with Anno("Description of the Block produced by the controller"):
     ADescription = str
 
 
+def get_endpoint(data: Any, path: List[str]) -> Any:
+    """Walk down path within a frozen snapshot of a Block
+
+    Args:
+        data: The frozen Block, as returned from Notifier.get_snapshot()
+        path: The path to get, where path[0] is the mri of the Block
+
+    Returns:
+        object: The frozen data at that path
+
+    Raises:
+        UnexpectedError: If the path does not exist
+    """
+    for i, endpoint in enumerate(path[1:]):
+        try:
+            data = data[endpoint]
+        except KeyError:
+            if isinstance(data, dict):
+                typ = data.get("typeid", type(data))
+            elif hasattr(data, "typeid"):
+                typ = data.typeid
+            else:
+                typ = type(data)
+            raise UnexpectedError(
+                "Object '%s' of type %r has no attribute '%s'"
+                % (".".join(path[: i + 1]), typ, endpoint)
+            )
+    return data
+
+
 class Controller(Hookable):
     process = None
 
@@ -55,6 +98,9 @@ class Controller(Hookable):
         self._write_functions: Dict[str, Callable[..., Any]] = {}
         self.field_registry = FieldRegistry()
         self.info_registry = InfoRegistry()
+        # Requests waiting to be handled in the next batch, and its Spawned
+        self._request_batch: List[Request] = []
+        self._request_batch_spawned: Optional[Spawned] = None
 
     def setup(self, process: "Process") -> None:
         self.process = process
@@ -122,56 +168,100 @@ class Controller(Hookable):
         return child_view
 
     def handle_request(self, request: Request) -> Spawned:
-        """Spawn a new thread that handles Request"""
+        """Handle Request in another thread, returning a Spawned that will be
+        ready when it completes.
+
+        Puts and Posts release the lock while they run, so each gets its own
+        thread. Other Requests are added to a batch that is handled in a
+        single thread with a single take of the lock, so the Spawned returned
+        may be shared with other Requests.
+        """
         assert self.process, "No process to handle request"
-        return self.process.spawn(self._handle_request, request)
+        if isinstance(request, (Put, Post)):
+            # Start a new batch after this so Requests are handled in order
+            self._request_batch_spawned = None
+            return self.process.spawn(self._handle_request, request)
+        if self._request_batch_spawned is None:
+            self._request_batch = []
+            self._request_batch_spawned = self.process.spawn(
+                self._handle_request_batch, self._request_batch
+            )
+        spawned = self._request_batch_spawned
+        self._request_batch.append(request)
+        if len(self._request_batch) >= REQUEST_BATCH_SIZE:
+            # This batch is full, so start a new one next time
+            self._request_batch_spawned = None
+        return spawned
+
+    def _handle_request_batch(self, requests: List[Request]) -> None:
+        if requests is self._request_batch:
+            # Stop any more Requests being added to this batch
+            self._request_batch_spawned = None
+        responses = []
+        i = 0
+        while i < len(requests):
+            if isinstance(requests[i], Get):
+                # Served from the published snapshot so don't need the lock
+                responses += self._dispatch_request(requests[i])
+                i += 1
+            else:
+                # Take the lock once for this run of Subscribes and Unsubscribes
+                with self._lock:
+                    while i < len(requests) and not isinstance(requests[i], Get):
+                        responses += self._dispatch_request(requests[i])
+                        i += 1
+        self._notify_responses(responses)
 
     def _handle_request(self, request: Request) -> None:
-        responses = []
         with self._lock:
-            if isinstance(request, Get):
-                handler = self._handle_get
-            elif isinstance(request, Put):
-                handler = self._handle_put
-            elif isinstance(request, Post):
-                handler = self._handle_post
-            elif isinstance(request, Subscribe):
-                handler = self._notifier.handle_subscribe
-            elif isinstance(request, Unsubscribe):
-                handler = self._notifier.handle_unsubscribe
-            else:
-                raise UnexpectedError("Unexpected request %s", request)
-            try:
-                responses += handler(request)
-            except Exception as e:
-                responses.append(request.error_response(e))
+            responses = self._dispatch_request(request)
+        self._notify_responses(responses)
+
+    def _notify_responses(self, responses: CallbackResponses) -> None:
+        """Call back with each response, then raise the first exception any of
+        the callbacks raised, so everyone gets their response"""
+        exception = None
         for cb, response in responses:
             try:
                 cb(response)
-            except Exception:
+            except Exception as e:
                 self.log.exception(f"Exception notifying {response}")
-                raise
+                if exception is None:
+                    exception = e
+        if exception is not None:
+            raise exception
+
+    def _dispatch_request(self, request: Request) -> CallbackResponses:
+        """Call the handler for the request, returning the responses. Called
+        with the lock taken for all Requests except Gets"""
+        handler: Callable[[Any], CallbackResponses]
+        if isinstance(request, Get):
+            handler = self._handle_get
+        elif isinstance(request, Put):
+            handler = self._handle_put
+        elif isinstance(request, Post):
+            handler = self._handle_post
+        elif isinstance(request, Subscribe):
+            handler = self._notifier.handle_subscribe
+        elif isinstance(request, Unsubscribe):
+            handler = self._notifier.handle_unsubscribe
+        else:
+            return [
+                request.error_response(
+                    UnexpectedError("Unexpected request %s" % request)
+                )
+            ]
+        try:
+            responses = handler(request)
+        except Exception as e:
+            responses = [request.error_response(e)]
+        return responses
 
     def _handle_get(self, request: Get) -> CallbackResponses:
-        """Called with the lock taken"""
-        data = self._block
-
-        for i, endpoint in enumerate(request.path[1:]):
-            try:
-                data = data[endpoint]
-            except KeyError:
-                if hasattr(data, "typeid"):
-                    typ = data.typeid
-                else:
-                    typ = type(data)
-                path = ".".join(request.path[: i + 1])
-                raise UnexpectedError(
-                    "Object '%s' of type %r has no attribute '%s'"
-                    % (path, typ, endpoint)
-                )
-        # Important to freeze now with the lock so we get a consistent set
-        serialized = freeze(data)
-        ret = [request.return_response(serialized)]
+        """Called without the lock taken, as it reads from a published
+        snapshot of the Block that will not change"""
+        data = get_endpoint(self._notifier.get_snapshot(), request.path)
+        ret = [request.return_response(data)]
         return ret
 
     def check_field_writeable(self, field):
@@ -1,3 +1,8 @@
+from annotypes import stringify_error
+
+from .errors import ResponseError
+
+
 class Future:
     """Represents the result of an asynchronous computation.
     This class has a similar API to concurrent.futures.Future but this
@@ -86,3 +91,45 @@ class Future:
         assert isinstance(exception, Exception), "%r should be an Exception" % exception
         self._exception = exception
         self._state = self.FINISHED
+
+
+class BatchFuture(Future):
+    """A Future that concludes when a batch of Futures have all concluded.
+    It resolves to a dict of their results, or raises a ResponseError listing
+    every one that failed"""
+
+    def __init__(self, context, futures):
+        """
+        Args:
+            context (Context): The context to run under
+            futures (dict): {path: Future} of the Futures in the batch
+        """
+        super().__init__(context)
+        self.futures = futures
+
+    def done(self):
+        """Return True if all the futures in the batch finished executing."""
+        if self._state == self.RUNNING and all(f.done() for f in self.futures.values()):
+            errors = [
+                "%s: %s" % (path, stringify_error(f.exception()))
+                for path, f in self.futures.items()
+                if f.exception() is not None
+            ]
+            if errors:
+                self.set_exception(
+                    ResponseError(
+                        "%d of %d requests failed: %s"
+                        % (len(errors), len(self.futures), ", ".join(errors))
+                    )
+                )
+            else:
+                self.set_result({path: f.result() for path, f in self.futures.items()})
+        return self._state == self.FINISHED
+
+    def result(self, timeout=None):
+        self.done()
+        return super().result(timeout)
+
+    def exception(self, timeout=None):
+        self.done()
+        return super().exception(timeout)
@@ -689,7 +689,10 @@ class NumberMeta(VMeta):
 
     def validate(self, value: Any) -> np.number:
         """Check if the value is valid returns it"""
-        if value is None:
+        if value.__class__ is self._np_type:
+            # Already the right type, and numpy scalars are immutable
+            return value
+        elif value is None:
             value = 0
         cast = self._np_type(value)
         return cast
@@ -745,19 +748,39 @@ class VArrayMeta(VMeta):
     __slots__: List[str] = []
 
 
+def wrap_array(typ, seq: Any) -> Array:
+    """Wrap an already validated sequence in an Array. This is equivalent to
+    Array[typ](seq), but without the stack walk that Array.__init__ does to find
+    typ"""
+    array = Array.__new__(Array)
+    array.seq = seq
+    array.typ = typ
+    return array
+
+
 def to_np_array(dtype, value: Any) -> Any:
     # Give the Array the shorthand version
     if dtype == np.float64:
         dtype = float
     elif dtype == np.int64:
         dtype = int
-    if value.__class__ is Array and getattr(value.seq, "dtype", None) == dtype:
-        # If Array wraps a numpy array of the correct type we are done
-        return value
+    if value.__class__ is Array:
+        if getattr(value.seq, "dtype", None) == dtype:
+            # If Array wraps a numpy array of the correct type we are done
+            return value
+        # Unwrap it so numpy can convert the underlying sequence directly
+        value = value.seq
+    if isinstance(value, np.ndarray):
+        assert value.dtype == dtype, (
+            "Expected numpy array with dtype %s, got %r with dtype %s"
+            % (dtype, value, value.dtype)
+        )
+        # A numpy array of the correct type can be shared without a copy
+        return wrap_array(dtype, value)
+    elif isinstance(value, Sequence):
+        # Cast to numpy array
+        return wrap_array(dtype, np.array(value, dtype=dtype))
     else:
-        if isinstance(value, Sequence):
-            # Cast to numpy array
-            value = np.array(value, dtype=dtype)
         return to_array(Array[dtype], value)
 
 
@@ -790,28 +813,31 @@ class ChoiceArrayMeta(ChoiceMeta, VArrayMeta):
         if value is None:
             return Array[self.enum_cls]()
         else:
-            ret = []
             if isinstance(value, str):
                 value = [value]
-            # If we have an Array of the right type, start off assuming it's the
-            # same
-            is_same = value.__class__ is Array and value.typ is self.enum_cls
-            for i, choice in enumerate(value):
-                # Our lookup table contains all the possible values
-                try:
-                    new_choice = self.choices_lookup[choice]
-                except KeyError:
-                    raise ValueError(
-                        "%s is not a valid value in %s for element %s"
-                        % (value, self.choices, i)
-                    )
-                else:
-                    is_same &= choice == new_choice
-                    ret.append(new_choice)
-            if is_same:
+            seq = value.seq if value.__class__ is Array else value
+            # Look up each distinct element once rather than every element
+            try:
+                lookup = {choice: self.choices_lookup[choice] for choice in set(seq)}
+            except KeyError:
+                for i, choice in enumerate(seq):
+                    if choice not in self.choices_lookup:
+                        raise ValueError(
+                            "%s is not a valid value in %s for element %s"
+                            % (value, self.choices, i)
+                        )
+                raise
+            # If we have an Array of the right type, and every element is
+            # already a choice, it is the same
+            if (
+                value.__class__ is Array
+                and value.typ is self.enum_cls
+                and all(k == v for k, v in lookup.items())
+            ):
                 return value
             else:
-                return to_array(Array[self.enum_cls], ret)
+                ret = list(map(lookup.__getitem__, seq))
+                return wrap_array(self.enum_cls, ret)
 
     def doc_type_string(self) -> str:
         return "[%s]" % super().doc_type_string()
@@ -838,8 +864,9 @@ class StringArrayMeta(VArrayMeta):
     def validate(self, value: Any) -> Array:
         """Check if the value is valid returns it"""
         cast = to_array(Array[str], value)
-        for v in cast:
-            assert isinstance(v, str), "Expected Array[str], got %r" % (value,)
+        # Check the type of each distinct element type rather than each element
+        for typ in set(map(type, cast.seq)):
+            assert issubclass(typ, str), "Expected Array[str], got %r" % (value,)
         return cast
 
     def doc_type_string(self) -> str:
@@ -918,6 +945,13 @@ class TableMeta(VMeta):
         if value is None:
             # Create an empty table
             value = {k: None for k in self.elements}
+        elif value.__class__ is self.table_cls:
+            args = {k: meta.validate(value[k]) for k, meta in self.elements.items()}
+            if all(args[k] is value[k] for k in args):
+                # Every column is already valid, so we can use the table as is
+                value.validate_column_lengths()
+                return value
+            value = args
         elif isinstance(value, Table):
             # Serialize a single level so we can type check it
             value = {k: value[k] for k in value.call_types}
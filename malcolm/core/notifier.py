@@ -1,12 +1,15 @@
+import time
 from contextlib import contextmanager
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 
+import cothread
 from annotypes import Array, FrozenOrderedDict
 
 from .concurrency import RLock
 from .loggable import Loggable
 from .request import Subscribe, Unsubscribe
 from .response import Response
+from .serializers import serialize_fields
 
 if TYPE_CHECKING:
     from .models import BlockModel
@@ -33,10 +36,7 @@ def freeze(o):
     # Cheaper than a subclass check, will find Models for us and freeze them
     # into dicts
     if hasattr(o, "notifier"):
-        o = FrozenOrderedDict(
-            (("typeid", o.typeid),)
-            + tuple((k, freeze(getattr(o, k))) for k in o.call_types)
-        )
+        o = FrozenOrderedDict([(k, freeze(v)) for k, v in serialize_fields(o)])
     elif isinstance(o, dict):
         # Recurse down in case there are any models down there
         o = FrozenOrderedDict(tuple((k, freeze(v)) for k, v in o.items()))
@@ -46,6 +46,36 @@ def freeze(o):
     return o
 
 
+def squash_changes(changes: List[List]) -> List[List]:
+    """Remove any changes that are superseded by a later change
+
+    A change is superseded if a later change (or delete) is made to the same
+    path, or to a path that is a parent of it. The surviving changes keep
+    their original order, so applying them gives the same result as applying
+    the whole list
+
+    Args:
+        changes (list): [[path, optional data]] in the order they were made
+
+    Returns:
+        list: [[path, optional data]] with superseded changes removed
+    """
+    if len(changes) < 2:
+        return changes
+    squashed = []
+    seen = set()
+    # Walk backwards so the latest change to each path is found first
+    for change in reversed(changes):
+        path = tuple(change[0])
+        # If we have seen this path or any of its parents then it is stale
+        if any(path[:i] in seen for i in range(len(path) + 1)):
+            continue
+        seen.add(path)
+        squashed.append(change)
+    squashed.reverse()
+    return squashed
+
+
 class Notifier(Loggable):
     """Object that can service callbacks on given endpoints"""
 
@@ -57,10 +87,16 @@ class Notifier(Loggable):
         self._squashed_count = 0
         self._squashed_changes: List[List] = []
         self._subscription_keys: SubscriptionKeys = {}
+        # The last published frozen copy of the block
+        self._snapshot: Any = self._tree.get_frozen()
 
     def handle_subscribe(self, request: Subscribe) -> "CallbackResponses":
         """Handle a Subscribe request from outside. Called with lock taken"""
-        ret = self._tree.handle_subscribe(request, request.path[1:])
+        if request.period:
+            throttle = Throttle(request, self._lock, self._callback_responses)
+        else:
+            throttle = None
+        ret = self._tree.handle_subscribe(request, request.path[1:], throttle)
         self._subscription_keys[request.generate_key()] = request
         return ret
 
@@ -70,6 +106,16 @@ class Notifier(Loggable):
         ret = self._tree.handle_unsubscribe(subscribe, subscribe.path[1:])
         return ret
 
+    def get_snapshot(self) -> Any:
+        """Return the last published frozen copy of the Block. This doesn't
+        take the lock, as a new copy is published each time a set of squashed
+        changes is notified
+
+        Returns:
+            FrozenOrderedDict: The frozen Block
+        """
+        return self._snapshot
+
     @property
     def changes_squashed(self) -> "Notifier":
         """Context manager to allow multiple calls to notify_change() to be
@@ -111,10 +157,13 @@ class Notifier(Loggable):
         try:
             self._squashed_count -= 1
             if self._squashed_count == 0:
-                changes = self._squashed_changes
+                changes = squash_changes(self._squashed_changes)
                 self._squashed_changes = []
-                # TODO: squash intermediate deltas here?
                 responses += self._tree.notify_changes(changes)
+                if changes:
+                    # Publish a new copy, reusing unchanged frozen data from
+                    # the tree
+                    self._snapshot = self._tree.get_frozen()
         finally:
             self._lock.release()
             self._callback_responses(responses)
@@ -128,10 +177,106 @@ class Notifier(Loggable):
                 raise
 
 
+class Throttle:
+    """Limits the rate of responses to a Subscribe with a period, merging any
+    changes that happen within the period into a single response"""
+
+    __slots__ = [
+        "request",
+        "lock",
+        "callback_responses",
+        "node",
+        "next_time",
+        "changes",
+        "pending",
+        "timer",
+    ]
+
+    def __init__(
+        self,
+        request: Subscribe,
+        lock: RLock,
+        callback_responses: Callable[["CallbackResponses"], None],
+    ) -> None:
+        self.request = request
+        self.lock = lock
+        self.callback_responses = callback_responses
+        # The NotifierNode that request is subscribed to
+        self.node: Optional[NotifierNode] = None
+        # The earliest time the next response can be sent
+        self.next_time = 0.0
+        # Delta changes that have been made since the last response
+        self.changes: List[List] = []
+        # Whether there is anything new to send
+        self.pending = False
+        self.timer: Optional[cothread.Timer] = None
+
+    def start(self, node: "NotifierNode") -> None:
+        """Called with the lock taken when the initial response has been made"""
+        self.node = node
+        self.next_time = time.time() + self.request.period
+
+    def handle_changes(self, changes: List[List]) -> "CallbackResponses":
+        """Called with the lock taken when there are new changes. Return the
+        response now if outside the period, otherwise schedule it for later"""
+        if self.request.delta:
+            self.changes += changes
+        self.pending = True
+        now = time.time()
+        if now >= self.next_time:
+            return self.pending_responses(now)
+        elif self.timer is None:
+            self.timer = cothread.Timer(self.next_time - now, self.flush)
+        return []
+
+    def pending_responses(self, now: float) -> "CallbackResponses":
+        """Called with the lock taken to merge any pending changes into a
+        single response"""
+        ret = []
+        if self.pending:
+            if self.request.delta:
+                changes = squash_changes(self.changes)
+                self.changes = []
+                ret.append(self.request.delta_response(changes))
+            else:
+                assert self.node, "Not started"
+                ret.append(self.request.update_response(self.node.get_frozen()))
+            self.pending = False
+            self.next_time = now + self.request.period
+        return ret
+
+    def flush(self) -> None:
+        """Called from the timer when the period has expired"""
+        with self.lock:
+            self.timer = None
+            responses = self.pending_responses(time.time())
+        self.callback_responses(responses)
+
+    def cancel(self) -> None:
+        """Called with the lock taken to drop anything that hasn't been sent"""
+        self.pending = False
+        self.changes = []
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+
+
 class NotifierNode:
 
     # Define slots so it uses less resources to make these
-    __slots__ = ["delta_requests", "update_requests", "children", "parent", "data"]
+    __slots__ = [
+        "delta_requests",
+        "update_requests",
+        "children",
+        "parent",
+        "data",
+        "frozen",
+        "frozen_children",
+        "throttles",
+    ]
+
+    # Sentinel for frozen, as None is a valid frozen value
+    NOT_FROZEN = object()
 
     def __init__(self, data: Any, parent: "NotifierNode" = None) -> None:
         self.delta_requests: List[Subscribe] = []
@@ -139,6 +284,49 @@ class NotifierNode:
         self.children: Dict[str, NotifierNode] = {}
         self.parent = parent
         self.data = data
+        # The cached result of freeze(self.data)
+        self.frozen: Any = self.NOT_FROZEN
+        # The cached result of freeze(child) for children without nodes
+        self.frozen_children: Dict[str, Any] = {}
+        # Rate limiters for any requests that have a period
+        self.throttles: Dict[Subscribe, Throttle] = {}
+
+    def get_frozen(self) -> Any:
+        """Return a frozen copy of our data, reusing any frozen children that
+        haven't changed since last time
+
+        Returns:
+            object: The frozen data
+        """
+        if self.frozen is self.NOT_FROZEN:
+            self.frozen = self._freeze_data()
+        return self.frozen
+
+    def _freeze_data(self) -> Any:
+        data = self.data
+        if hasattr(data, "notifier"):
+            # A Model, so use our child nodes if we have them
+            return FrozenOrderedDict(
+                [
+                    (k, self._freeze_child(k, v, self.children.get(k)))
+                    for k, v in serialize_fields(data)
+                ]
+            )
+        elif isinstance(data, dict):
+            return FrozenOrderedDict(
+                tuple((k, self._freeze_child(k, v)) for k, v in data.items())
+            )
+        else:
+            return freeze(data)
+
+    def _freeze_child(self, name: str, data: Any, child: "NotifierNode" = None) -> Any:
+        if child is not None:
+            return child.get_frozen()
+        try:
+            frozen = self.frozen_children[name]
+        except KeyError:
+            frozen = self.frozen_children[name] = freeze(data)
+        return frozen
 
     def notify_changes(self, changes: List[List]) -> "CallbackResponses":
         """Set our data and notify anyone listening
@@ -156,23 +344,35 @@ class NotifierNode:
         for change in changes:
             # Add any changes that our children need to know about
             self._add_child_change(change, child_changes)
+        self.frozen = self.NOT_FROZEN
+
+        # Notify our children first, so any frozen data they produce is up to
+        # date for us to reuse
+        child_ret = []
+        for name, changes_for_child in child_changes.items():
+            child_ret += self.children[name].notify_changes(changes_for_child)
 
         # If we have update subscribers, freeze at this level
-        if self.update_requests:
-            frozen = freeze(self.data)
-            for request in self.update_requests:
-                ret.append(request.update_response(frozen))
+        for request in self.update_requests:
+            throttle = self.throttles.get(request, None)
+            if throttle:
+                ret += throttle.handle_changes(changes)
+            else:
+                ret.append(request.update_response(self.get_frozen()))
 
         # If we have delta subscribers, freeze the change value
         if self.delta_requests:
             for change in changes:
                 change[-1] = freeze(change[-1])
             for request in self.delta_requests:
-                ret.append(request.delta_response(changes))
+                throttle = self.throttles.get(request, None)
+                if throttle:
+                    ret += throttle.handle_changes(changes)
+                else:
+                    ret.append(request.delta_response(changes))
 
-        # Now notify our children
-        for name, changes in child_changes.items():
-            ret += self.children[name].notify_changes(changes)
+        # Our responses go before our children's
+        ret += child_ret
         return ret
 
     def _add_child_change(self, change: List, child_changes: Dict[str, List]) -> None:
@@ -180,6 +380,7 @@ class NotifierNode:
         if path:
             # This is for one of our children
             name = path[0]
+            self.frozen_children.pop(name, None)
             if name in self.children:
                 if len(change) == 2:
                     child_change = [path[1:], change[1]]
@@ -206,6 +407,7 @@ class NotifierNode:
                 that needs to be passed to a child as a result of this
         """
         self.data = data
+        self.frozen_children.clear()
         child_change_dict: Dict[str, List] = {}
         # Reflect change of data to children
         for name in self.children:
@@ -219,7 +421,7 @@ class NotifierNode:
         return child_change_dict
 
     def handle_subscribe(
-        self, request: Subscribe, path: List[str]
+        self, request: Subscribe, path: List[str], throttle: Throttle = None
     ) -> "CallbackResponses":
         """Add to the list of request to notify, and notify the initial value of
         the data held
@@ -227,6 +429,7 @@ class NotifierNode:
         Args:
             request (Subscribe): The subscribe request
             path (list): The relative path from ourself
+            throttle (Throttle): If given, limit the rate of responses with it
 
         Returns:
             list: [(callback, Response)] that need to be called
@@ -237,16 +440,19 @@ class NotifierNode:
             name = path[0]
             if name not in self.children:
                 self.children[name] = NotifierNode(getattr(self.data, name, None), self)
-            ret += self.children[name].handle_subscribe(request, path[1:])
+            ret += self.children[name].handle_subscribe(request, path[1:], throttle)
         else:
             # This is for us
-            frozen = freeze(self.data)
+            frozen = self.get_frozen()
             if request.delta:
                 self.delta_requests.append(request)
                 ret.append(request.delta_response([[[], frozen]]))
             else:
                 self.update_requests.append(request)
                 ret.append(request.update_response(frozen))
+            if throttle:
+                throttle.start(self)
+                self.throttles[request] = throttle
         return ret
 
     def handle_unsubscribe(
@@ -279,5 +485,8 @@ class NotifierNode:
                 self.update_requests.remove(request)
             else:
                 self.delta_requests.remove(request)
+            throttle = self.throttles.pop(request, None)
+            if throttle:
+                throttle.cancel()
             ret.append(request.return_response())
         return ret
@@ -0,0 +1,128 @@
+import json
+from enum import Enum
+from operator import attrgetter
+from typing import Any, Callable, List, Tuple, Type
+from weakref import WeakKeyDictionary
+
+from annotypes import Array, Serializable, stringify_error
+
+from .response import Delta
+
+# {cls: (keys, getter)} where getter(o) returns the values of keys as a tuple
+_field_getters: "WeakKeyDictionary[type, Tuple[Tuple[str, ...], Callable]]"
+_field_getters = WeakKeyDictionary()
+
+
+def _make_field_getter(cls: Type[Serializable]) -> Tuple[Tuple[str, ...], Callable]:
+    keys = tuple(cls.call_types)
+    if len(keys) == 0:
+
+        def getter(o):
+            return ()
+
+    elif len(keys) == 1:
+        # attrgetter with a single name returns the value rather than a tuple
+        single = attrgetter(keys[0])
+
+        def getter(o):
+            return (single(o),)
+
+    else:
+        getter = attrgetter(*keys)
+    if cls.typeid:
+        typeid = cls.typeid
+        fields = getter
+
+        def getter(o):
+            return (typeid,) + fields(o)
+
+        keys = ("typeid",) + keys
+    return keys, getter
+
+
+def serialize_fields(o: Serializable) -> List[Tuple[str, Any]]:
+    """Return the [(key, value)] pairs that o.to_dict() would serialize,
+    without serializing the values. The attribute names are worked out once per
+    class rather than on every call
+
+    Args:
+        o: The Serializable instance
+
+    Returns:
+        list: [(key, value)] including typeid if the class has one
+    """
+    cls = o.__class__
+    if o.call_types is not cls.call_types:
+        # Instances like BlockModel have their own call_types that can change
+        fields = [(k, getattr(o, k)) for k in o.call_types]
+        if cls.typeid:
+            fields.insert(0, ("typeid", cls.typeid))
+        return fields
+    try:
+        keys, getter = _field_getters[cls]
+    except KeyError:
+        keys, getter = _field_getters[cls] = _make_field_getter(cls)
+    return list(zip(keys, getter(o)))
+
+
+def _has_custom_to_dict(cls: Type[Serializable]) -> bool:
+    # Delta only overrides to_dict so it recurses into its changes, which json
+    # will do for us
+    return cls.to_dict is not Serializable.to_dict and not issubclass(cls, Delta)
+
+
+# {cls: True if it overrides to_dict}
+_custom_to_dicts: "WeakKeyDictionary[type, bool]" = WeakKeyDictionary()
+
+
+def serialize_hook(o: Any) -> Any:
+    """Serialize a single level of o for json.dumps. Unlike serialize_object it
+    does not recurse, json.dumps will call it again for any children it cannot
+    encode itself, so already frozen dicts are not copied
+
+    Args:
+        o: The object json.dumps could not encode
+
+    Returns:
+        object: Something json.dumps can encode
+    """
+    if o.__class__ is Array:
+        o = o.seq
+        if isinstance(o, (list, tuple)):
+            return o
+    if isinstance(o, Serializable):
+        cls = o.__class__
+        try:
+            custom = _custom_to_dicts[cls]
+        except KeyError:
+            custom = _custom_to_dicts[cls] = _has_custom_to_dict(cls)
+        if custom:
+            return o.to_dict()
+        else:
+            return dict(serialize_fields(o))
+    elif hasattr(o, "tolist"):
+        # Numpy bools, numbers and arrays all have a tolist function
+        return o.tolist()
+    elif isinstance(o, Exception):
+        # Exceptions should be stringified
+        return stringify_error(o)
+    elif isinstance(o, Enum):
+        # Return value of enums
+        return o.value
+    else:
+        raise TypeError("Object of type %s is not JSON serializable" % type(o))
+
+
+def json_encode(o: Any, indent: int = None) -> str:
+    """Encode o as JSON. Equivalent to annotypes.json_encode, but uses
+    serialize_hook so the encoding of each Serializable class is worked out
+    once, and frozen data is encoded in place rather than copied first
+
+    Args:
+        o: The object to encode
+        indent: If given, pretty print with this indent
+
+    Returns:
+        str: The JSON string
+    """
+    return json.dumps(o, default=serialize_hook, indent=indent)
@@ -1,6 +1,17 @@
+import numpy as np
 from annotypes import Serializable
 
 
+def column_dtype(typ) -> np.dtype:
+    """Return the numpy dtype that a Table column of typ is stored in within a
+    structured array. Columns of numpy types can be shared as views, everything
+    else is stored as objects"""
+    if isinstance(typ, type) and issubclass(typ, np.generic):
+        return np.dtype(typ)
+    else:
+        return np.dtype(object)
+
+
 @Serializable.register_subclass("malcolm:core/Table:1.0")
 class Table(Serializable):
     # real data stored as attributes
@@ -12,6 +23,15 @@ class Table(Serializable):
         )
 
     def __getitem__(self, item):
+        if isinstance(item, slice):
+            # Make a Table of a range of rows, numpy columns will be views
+            self.validate_column_lengths()
+            return self.__class__(
+                **{
+                    a: anno(getattr(self, a)[item])
+                    for a, anno in self.call_types.items()
+                }
+            )
         try:
             return super().__getitem__(item)
         except KeyError:
@@ -23,29 +43,71 @@ class Table(Serializable):
                 raise
 
     @classmethod
-    def from_rows(cls, rows):
-        attrs = {k: [] for k in cls.call_types}
-        for row in rows:
-            for key, data in zip(cls.call_types, row):
-                attrs[key].append(data)
-        attrs = {k: cls.call_types[k](v) for k, v in attrs.items()}
+    def structured_dtype(cls) -> np.dtype:
+        """Return the dtype of a numpy structured array that can hold a row of
+        this Table in each element"""
+        return np.dtype(
+            [(k, column_dtype(anno.typ)) for k, anno in cls.call_types.items()]
+        )
+
+    @classmethod
+    def from_structured_array(cls, data):
+        """Make a Table from a numpy structured array with a field for each
+        column. Columns of numpy types will be views of data without a copy
+
+        Args:
+            data (np.ndarray): Array with a dtype like cls.structured_dtype()
+        """
+        attrs = {}
+        for k, anno in cls.call_types.items():
+            column = data[k]
+            if column.dtype != anno.typ:
+                # Not a numpy type, so give it a list of Python objects
+                column = column.tolist()
+            attrs[k] = anno(column)
         return cls(**attrs)
 
+    def to_structured_array(self):
+        """Copy the Table into a numpy structured array with a field for each
+        column"""
+        data = np.empty(self.row_count(), dtype=self.structured_dtype())
+        for k in self.call_types:
+            data[k] = getattr(self, k).seq
+        return data
+
+    @classmethod
+    def from_rows(cls, rows):
+        # Let numpy transpose the rows into columns
+        data = np.array([tuple(row) for row in rows], dtype=cls.structured_dtype())
+        return cls.from_structured_array(data)
+
     def rows(self):
         self.validate_column_lengths()
         data = [getattr(self, a) for a in self.call_types]
         for row in zip(*data):
             yield list(row)
 
+    def row_count(self) -> int:
+        for k in self.call_types:
+            self.validate_column_lengths()
+            return len(getattr(self, k))
+        return 0
+
     def __eq__(self, other: object) -> bool:
         return not self != other
 
     def __ne__(self, other):
+        if self is other:
+            return False
         if not isinstance(other, Table):
             return True
         if list(self.call_types) != list(other.call_types):
             return True
         for k in self.call_types:
-            if self[k] != other[k]:
+            mine, theirs = self[k], other[k]
+            if mine is theirs:
+                continue
+            # Each column compare is vectorized by numpy if possible
+            if len(mine) != len(theirs) or mine != theirs:
                 return True
         return False
@@ -252,6 +252,9 @@ def main():
         def handle_request(self, controller, request):
             cothread.CallbackResult(super().handle_request, controller, request)
 
+        def handle_each_request(self, controller, requests):
+            cothread.CallbackResult(super().handle_each_request, controller, requests)
+
     self = UserContext(process)
 
     header = """Welcome to iMalcolm.
@@ -1,6 +1,7 @@
 import time
-from typing import Any, Callable, Optional, Sequence, Type, Union
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
 
+import cothread
 from annotypes import Anno, Array
 
 from malcolm.core import (
@@ -12,9 +13,10 @@ from malcolm.core import (
     Hook,
     Loggable,
     PartRegistrar,
+    Queue,
+    Spawned,
     TimeStamp,
     VMeta,
-    sleep,
 )
 from malcolm.modules import builtin
 
@@ -42,6 +44,99 @@ class CatoolsDeferred:
 
 catools = CatoolsDeferred()
 
+# How long to wait for other cagets to join a batch when some are already in
+# flight. Controllers' InitHooks are spawned in different scheduler rounds as a
+# Process starts, so a single Yield would only merge the parts of one Controller
+CAGET_BATCH_PERIOD = 0.05
+
+
+class CAGetBatcher:
+    """Batches up the initial cagets of all the parts of a Process.
+
+    The InitHooks of every part of every Controller are spawned within a few
+    scheduler rounds when a Process starts. A caget made when none are in
+    flight is sent on the next scheduler round, along with any made in the
+    same round. If others are in flight, it waits CAGET_BATCH_PERIOD for the
+    rest of the Process to join in. Each PV is got once per batch in its own
+    cothread, so a part only waits for its own PVs and one missing PV doesn't
+    hold up everyone else
+    """
+
+    def __init__(self) -> None:
+        # [(pvs, format, datatype, queue)]
+        self._requests: List[Tuple[List[str], Any, Any, Queue]] = []
+        self._flush_spawned = False
+        # {(pv, format, datatype): Spawned caget of that PV}
+        self._in_flight: Dict[Tuple[str, Any, Any], Spawned] = {}
+
+    def caget(
+        self, pvs: Sequence[str], format: Any, datatype: Any = None, throw=True
+    ) -> List:
+        """Do a caget of pvs along with any other cagets made at about the same
+        time
+
+        Args:
+            pvs: The PVs to get
+            format: The catools format to get them with
+            datatype: The catools datatype to get them with
+            throw: If True, raise the error of the first PV that failed
+
+        Returns:
+            list: The augmented values of pvs from catools
+        """
+        queue = Queue()
+        self._requests.append((list(pvs), format, datatype, queue))
+        if not self._flush_spawned:
+            self._flush_spawned = True
+            cothread.Spawn(self._flush)
+        values = [spawned.get()[0] for spawned in queue.get()]
+        if throw:
+            for value in values:
+                if not value.ok:
+                    # This is the ca_nothing that catools would have raised
+                    raise value
+        return values
+
+    def _flush(self) -> None:
+        if self._in_flight:
+            # We are probably part of a Process starting, so let anything else
+            # that is starting at the same time join the batch
+            cothread.Sleep(CAGET_BATCH_PERIOD)
+        requests, self._requests = self._requests, []
+        self._flush_spawned = False
+        for pvs, format, datatype, queue in requests:
+            queue.put([self._spawn_caget(pv, format, datatype) for pv in pvs])
+
+    def _spawn_caget(self, pv: str, format: Any, datatype: Any) -> Spawned:
+        # PVs may be asked for by more than one part, only get them once
+        key = (pv, format, datatype)
+        spawned = self._in_flight.get(key, None)
+        if spawned is None:
+            spawned = Spawned(self._caget, (key,), {})
+            self._in_flight[key] = spawned
+        return spawned
+
+    def _caget(self, key: Tuple[str, Any, Any]) -> List:
+        pv, format, datatype = key
+        try:
+            # Get a list of one, so a ca_nothing is returned by Spawned.get
+            # rather than raised
+            return catools.caget([pv], format=format, datatype=datatype, throw=False)
+        finally:
+            del self._in_flight[key]
+
+
+_caget_batcher = CAGetBatcher()
+
+
+def batched_caget(
+    pvs: Sequence[str], format: Any, datatype: Any = None, throw=True
+) -> List:
+    """Do a caget of pvs, batched with any other parts that are doing the same.
+    See `CAGetBatcher.caget`"""
+    return _caget_batcher.caget(pvs, format, datatype, throw)
+
+
 with Anno("Full pv of demand and default for rbv"):
     APv = str
 with Anno("Override for rbv"):
@@ -91,11 +186,19 @@ class CABase(Loggable):
         self.attr = meta.create_attribute_model()
         # Camonitor subscription
         self.monitor = None
-        self._update_after = 0
+        # The earliest time the next monitor update can be applied
+        self._update_after = 0.0
+        # The newest monitor update that hasn't been applied yet
+        self._pending_value: Any = None
+        self._timer: Optional[cothread.Timer] = None
         self._local_value: Optional[CATable] = None
         self._user_callback = callback
 
     def disconnect(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending_value = None
         if self.monitor is not None:
             if hasattr(self.monitor, "__len__"):
                 for monitor in self.monitor:
@@ -153,28 +256,33 @@ class CABase(Loggable):
         )
 
     def _monitor_callback(self, value, value_index=None):
-        now = time.time()
-        delta = now - self._update_after
         if value_index is not None and hasattr(self, "name_list"):
             value_key = self.name_list[value_index]
             self._local_value[value_key] = value
             self._local_value.raw_stamp = getattr(value, "raw_stamp", (None, None))
             self._local_value.ok = self._local_value.ok or value.ok
             self._local_value.severity = max(self._local_value.severity, value.severity)
-            self._update_value(self._local_value)
-        else:
-            self._update_value(value)
-        # See how long to sleep for to make sure we don't get more than one
-        # update at < min_delta interval
-        if delta > self.min_delta:
-            # If we were more than min_delta late then reset next update time
-            self._update_after = now + self.min_delta
-        elif delta < 0:
-            # If delta is less than zero sleep for a bit
-            sleep(-delta)
-        else:
-            # If we were within the delta window just increment next update
-            self._update_after += self.min_delta
+            value = self._local_value
+        self._pending_value = value
+        now = time.time()
+        if now >= self._update_after:
+            self._apply_pending_value(now)
+        elif self._timer is None:
+            # Within min_delta of the last update, so hold on to it and only
+            # apply the newest value when the window expires
+            self._timer = cothread.Timer(self._update_after - now, self._flush)
+
+    def _apply_pending_value(self, now: float) -> None:
+        value = self._pending_value
+        self._pending_value = None
+        self._update_after = now + self.min_delta
+        self._update_value(value)
+
+    def _flush(self) -> None:
+        """Called from the timer when min_delta has expired"""
+        self._timer = None
+        if self._pending_value is not None:
+            self._apply_pending_value(time.time())
 
 
 class CAAttribute(CABase):
@@ -232,14 +340,8 @@ class CAAttribute(CABase):
         pvs = [self.rbv]
         if self.pv and self.pv != self.rbv:
             pvs.append(self.pv)
-        ca_values = assert_connected(
-            catools.caget(
-                pvs,
-                format=catools.FORMAT_CTRL,
-                datatype=self.datatype,
-                throw=self.throw,
-            ),
-            self.throw,
+        ca_values = batched_caget(
+            pvs, format=catools.FORMAT_CTRL, datatype=self.datatype, throw=self.throw
         )
 
         if self.on_connect:
@@ -327,21 +429,17 @@ class WaveformTableAttribute(CABase):
         self._local_value = CATable()
         for name in name_list:
             self._local_value[name] = []
-        self._update_after = 0
         self.limits_from_pv = limits_from_pv
 
     def reconnect(self):
         # release old monitor
         self.disconnect()
         # make the connection in cothread's thread, use caget for initial
-        ca_values = assert_connected(
-            catools.caget(
-                self.pv_list,
-                format=catools.FORMAT_CTRL,
-                datatype=self.datatype,
-                throw=self.throw,
-            ),
-            self.throw,
+        ca_values = batched_caget(
+            self.pv_list,
+            format=catools.FORMAT_CTRL,
+            datatype=self.datatype,
+            throw=self.throw,
         )
 
         for ind, value in enumerate(ca_values):
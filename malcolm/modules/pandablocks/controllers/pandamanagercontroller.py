@@ -4,7 +4,15 @@ from typing import Any, Dict, Sequence, Set, Tuple
 from annotypes import Anno
 from cothread.cosocket import socket
 
-from malcolm.core import Display, NumberMeta, Queue, TimeoutError, TimeStamp, Widget
+from malcolm.core import (
+    Display,
+    Event,
+    NumberMeta,
+    Queue,
+    TimeoutError,
+    TimeStamp,
+    Widget,
+)
 from malcolm.modules import builtin
 
 from ..pandablocksclient import PandABlocksClient
@@ -69,7 +77,7 @@ class PandAManagerController(builtin.controllers.ManagerController):
         # The child controllers we have created
         self._child_controllers: Dict[str, PandABlockController] = {}
         # The PandABlock client that does the comms
-        self._client = PandABlocksClient(hostname, port, Queue)
+        self._client = PandABlocksClient(hostname, port, Queue, Event)
         # Filled in on reset
         self._stop_queue = None
         self._poll_spawned = None
@@ -1,6 +1,9 @@
+import base64
 import logging
 from collections import OrderedDict, namedtuple
 
+import numpy as np
+
 # Create a module level logger
 log = logging.getLogger(__name__)
 
@@ -11,6 +14,10 @@ TableFieldData = namedtuple(
     "TableFieldData", "bits_hi,bits_lo,description,labels,signed"
 )
 
+# How many uint32 values to send per line of a base64 table write. A multiple
+# of 3 so that only the last line needs padding
+TABLE_WORDS_PER_LINE = 192
+
 
 def strip_ok(resp):
     assert resp.startswith("OK ="), "Expected 'OK =val', got %r" % resp
@@ -18,11 +25,72 @@ def strip_ok(resp):
     return value
 
 
+def encode_table(int_values):
+    """Encode table data as the lines of a base64 table write
+
+    Args:
+        int_values (list or np.ndarray): The uint32 values of the table
+
+    Returns:
+        list: Lines of base64 encoded little endian uint32 values
+    """
+    data = np.asarray(int_values).astype("<u4", copy=False).tobytes()
+    nbytes = TABLE_WORDS_PER_LINE * 4
+    return [
+        base64.b64encode(data[i : i + nbytes]).decode()
+        for i in range(0, len(data), nbytes)
+    ]
+
+
+def decode_table(lines):
+    """Decode the lines of a base64 table read
+
+    Args:
+        lines (list): Lines of base64 encoded little endian uint32 values
+
+    Returns:
+        np.ndarray: The uint32 values of the table
+    """
+    data = b"".join(base64.b64decode(line) for line in lines)
+    return np.frombuffer(data, dtype="<u4").astype(np.uint32, copy=False)
+
+
+class ResponseBatch:
+    """The responses to a batch of messages that were sent together. A single
+    event is set when they have all arrived"""
+
+    def __init__(self, n_responses, event):
+        self.responses = [None] * n_responses
+        self.n_received = 0
+        self._event = event
+
+    @property
+    def done(self):
+        return self._event.is_set()
+
+    def add_response(self, response):
+        """Called from the recv loop with the next response. Returns True when
+        all the responses are in"""
+        self.responses[self.n_received] = response
+        self.n_received += 1
+        if self.n_received == len(self.responses):
+            self._event.set()
+            return True
+        return False
+
+    def wait(self, timeout):
+        if not self._event.wait(timeout):
+            raise TimeoutError("Timed out waiting for responses")
+
+
 class PandABlocksClient:
     # Sentinel that tells the send_loop and recv_loop to stop
     STOP = object()
 
-    def __init__(self, hostname="localhost", port=8888, queue_cls=None):
+    def __init__(self, hostname="localhost", port=8888, queue_cls=None, event_cls=None):
+        # By default we run in threads. To run in cothreads, pass a queue_cls
+        # and event_cls that work in cothread, with the same interface as the
+        # ones in the queue and threading modules
         if queue_cls is None:
             try:
                 # Python 2
@@ -30,7 +98,10 @@ class PandABlocksClient:
             except ImportError:
                 # Python 3
                 from queue import Queue as queue_cls
+        if event_cls is None:
+            from threading import Event as event_cls
         self.queue_cls = queue_cls
+        self.event_cls = event_cls
         self.hostname = hostname
         self.port = port
         # Completed lines for a response in progress
@@ -44,7 +115,9 @@ class PandABlocksClient:
         self._send_spawned = None
         self._send_queue = None
         self._recv_spawned = None
-        self._response_queues = None
+        self._response_batches = None
+        # The ResponseBatch we are currently receiving responses for
+        self._response_batch = None
         self._thread_pool = None
 
     def start(self, spawn=None, socket_cls=None):
@@ -56,10 +129,11 @@ class PandABlocksClient:
         if socket_cls is None:
             from socket import socket as socket_cls
         assert not self.started, "Send and recv threads already started"
-        # Holds (message, response_queue) to send next
+        # Holds (messages, response_batch) to send next
         self._send_queue = self.queue_cls()
-        # Holds response_queue to send next
-        self._response_queues = self.queue_cls()
+        # Holds the ResponseBatches that have been sent, in order
+        self._response_batches = self.queue_cls()
+        self._response_batch = None
         self._socket = socket_cls()
         self._socket.connect((self.hostname, self.port))
         self._send_spawned = spawn(self._send_loop)
@@ -86,12 +160,46 @@ class PandABlocksClient:
             self._thread_pool = None
 
     def send(self, message):
-        response_queue = self.queue_cls()
-        self._send_queue.put((message, response_queue))
-        return response_queue
+        """Send a message to a PandABox without waiting for the response
+
+        Args:
+            message (str): The message to send
+
+        Returns:
+            tuple: (response_batch, index) to pass to recv
+        """
+        return self.send_batch([message])[0]
+
+    def send_batch(self, messages):
+        """Send a list of messages to a PandABox in a single write, without
+        waiting for the responses
+
+        Args:
+            messages (list): The messages to send
+
+        Returns:
+            list: [(response_batch, index)] to pass to recv for each message
+        """
+        if not messages:
+            # Nothing to send, and an empty batch would steal the next response
+            return []
+        response_batch = ResponseBatch(len(messages), self.event_cls())
+        self._send_queue.put(("".join(messages), response_batch))
+        return [(response_batch, i) for i in range(len(messages))]
 
-    def recv(self, response_queue, timeout=10.0):
-        response = response_queue.get(timeout=timeout)
+    def recv(self, response, timeout=10.0):
+        """Wait for the response to a message
+
+        Args:
+            response (tuple): The (response_batch, index) returned from send
+            timeout (float): How long to wait before raising TimeoutError
+
+        Returns:
+            str or list: The response, a list of lines if multiline
+        """
+        response_batch, index = response
+        response_batch.wait(timeout)
+        response = response_batch.responses[index]
         if isinstance(response, Exception):
             raise response
         else:
@@ -102,23 +210,21 @@ class PandABlocksClient:
 
         Args:
             message (str): The message to send
-            timeout (float): How long to wait before raising queue.Empty
+            timeout (float): How long to wait before raising TimeoutError
 
         Returns:
             str: The response
         """
-        response_queue = self.send(message)
-        response = self.recv(response_queue, timeout)
-        return response
+        return self.recv(self.send(message), timeout)
 
     def _send_loop(self):
         """Service self._send_queue, sending requests to server"""
         while True:
-            message, response_queue = self._send_queue.get()
+            message, response_batch = self._send_queue.get()
             if message is self.STOP:
                 break
             try:
-                self._response_queues.put(response_queue)
+                self._response_batches.put(response_batch)
                 self._socket.sendall(message.encode("utf-8"))
             except Exception:  # pylint:disable=broad-except
                 log.exception("Exception sending message %s", message)
@@ -127,19 +233,20 @@ class PandABlocksClient:
         buf = ""
         while True:
             lines = buf.split("\n")
-            for line in lines[:-1]:
-                yield line
+            yield from lines[:-1]
             buf = lines[-1]
             # Get something new from the socket
-            rx = self._socket.recv(4096).decode("utf-8")
+            rx = self._socket.recv(65536).decode("utf-8")
             if not rx:
                 break
             buf += rx
 
     def _respond(self, resp):
         """Respond to the person waiting"""
-        response_queue = self._response_queues.get(timeout=0.1)
-        response_queue.put(resp)
+        if self._response_batch is None:
+            self._response_batch = self._response_batches.get(timeout=0.1)
+        if self._response_batch.add_response(resp):
+            self._response_batch = None
         self._completed_response_lines = []
         self._is_multiline = None
 
@@ -189,12 +296,10 @@ class PandABlocksClient:
                 ["TTLIN", "TTLOUT"]
 
         Returns:
-            dict: {parameter: response_queue}
+            dict: {parameter: response} to pass to recv
         """
-        response_queues = OrderedDict()
-        for parameter in parameter_list:
-            response_queues[parameter] = self.send(request % parameter)
-        return response_queues
+        responses = self.send_batch([request % p for p in parameter_list])
+        return OrderedDict(zip(parameter_list, responses))
 
     def get_blocks_data(self):
         blocks = OrderedDict()
@@ -207,15 +312,12 @@ class PandABlocksClient:
         desc_queues = self.parameterized_send("*DESC.%s?\n", block_names)
         field_queues = self.parameterized_send("%s.*?\n", block_names)
 
-        # Create BlockData for each block
+        # Parse the field list of every block, so we can ask about all their
+        # fields in one go
         # TODO: we sort here while server gives these in hash table order
+        field_infos = OrderedDict()
+        messages = []
         for block_name in sorted(block_names):
-            number = block_numbers[block_name]
-            description = strip_ok(self.recv(desc_queues[block_name]))
-            fields = OrderedDict()
-            blocks[block_name] = BlockData(number, description, fields)
-
-            # Parse the field list
             unsorted_fields = {}
             for line in self.recv(field_queues[block_name]):
                 split = line.split()
@@ -235,29 +337,43 @@ class PandABlocksClient:
             field_names = sorted(unsorted_fields, key=get_field_index)
 
             # Request description for each field
-            field_desc_queues = self.parameterized_send(
-                "*DESC.%s.%%s?\n" % block_name, field_names
-            )
+            for field_name in field_names:
+                messages.append("*DESC.%s.%s?\n" % (block_name, field_name))
 
             # Request enum labels for fields that are enums
-            enum_fields = []
+            enum_fields = {}
             for field_name in field_names:
                 _, field_type, field_subtype = unsorted_fields[field_name]
                 if field_type in ("bit_mux", "pos_mux") or field_subtype == "enum":
-                    enum_fields.append(field_name)
+                    enum_fields[field_name] = field_name
                 elif field_type == "ext_out":
-                    enum_fields.append(field_name + ".CAPTURE")
-            enum_queues = self.parameterized_send(
-                "*ENUMS.%s.%%s?\n" % block_name, enum_fields
-            )
+                    enum_fields[field_name] = field_name + ".CAPTURE"
+            for enum_field in enum_fields.values():
+                messages.append("*ENUMS.%s.%s?\n" % (block_name, enum_field))
+
+            field_infos[block_name] = (unsorted_fields, field_names, enum_fields)
+
+        responses = iter(self.send_batch(messages))
+
+        # Create BlockData for each block
+        for (
+            block_name,
+            (unsorted_fields, field_names, enum_fields),
+        ) in field_infos.items():
+            number = block_numbers[block_name]
+            description = strip_ok(self.recv(desc_queues[block_name]))
+            fields = OrderedDict()
+            blocks[block_name] = BlockData(number, description, fields)
+
+            # Responses are in the order we asked for them
+            field_desc_queues = OrderedDict(zip(field_names, responses))
+            enum_queues = OrderedDict(zip(enum_fields, responses))
 
             # Get desc and enum data for each field
             for field_name in field_names:
                 _, field_type, field_subtype = unsorted_fields[field_name]
                 if field_name in enum_queues:
                     labels = self.recv(enum_queues[field_name])
-                elif field_name + ".CAPTURE" in enum_queues:
-                    labels = self.recv(enum_queues[field_name + ".CAPTURE"])
                 else:
                     labels = []
                 description = strip_ok(self.recv(field_desc_queues[field_name]))
@@ -283,8 +399,22 @@ class PandABlocksClient:
             bits[k + ".CAPTURE"] = self.recv(queue)
         return bits
 
+    def get_capture_fields(self):
+        # [(field_name, capture)]
+        # E.g. [("COUNTER1.OUT", "Min"), ("COUNTER1.OUT", "Max"), ...]
+        captures = []
+        for line in self.send_recv("*CAPTURE?\n"):
+            split = line.split()
+            if len(split) > 1:
+                # Like COUNTER1.OUT Min Max
+                captures += [(split[0], capture) for capture in split[1:]]
+            else:
+                # Like COUNTER1.OUT.Min
+                captures.append(tuple(line.rsplit(".", 1)))
+        return captures
+
     def get_changes(self, include_errors=False):
-        table_queues = {}
+        table_fields = []
         for line in self.send_recv("*CHANGES?\n"):
             if "=" in line:
                 field, val = line.split("=", 1)
@@ -292,7 +422,7 @@ class PandABlocksClient:
                 # table
                 field = line[:-1]
                 val = None
-                table_queues[field] = self.send("%s?\n" % field)
+                table_fields.append(field)
             elif line.endswith("(error)"):
                 if include_errors:
                     field = line.split(" ", 1)[0]
@@ -303,12 +433,13 @@ class PandABlocksClient:
                 log.warning("Can't parse line %r of changes", line)
                 continue
             yield field, val
+        table_queues = self.parameterized_send("%s.B?\n", table_fields)
         for field, q in table_queues.items():
-            yield field, self.recv(q)
+            yield field, decode_table(self.recv(q))
 
     def get_table_fields(self, block, field):
         fields = OrderedDict()
-        enum_queues = {}
+        enum_names = []
         for line in self.send_recv("%s.%s.FIELDS?\n" % (block, field)):
             split = line.split()
             name = split[1].strip()
@@ -316,17 +447,20 @@ class PandABlocksClient:
             if len(split) > 2:
                 # Field is an enum, get its values
                 if split[2] == "enum":
-                    enum_queues[name] = self.send(
-                        "*ENUMS.%s.%s[].%s?\n" % (block, field, name)
-                    )
+                    enum_names.append(name)
                 elif split[2] == "int":
                     signed = True
             fields[name] = (split[0], signed)
 
-        # Request description for each field
-        desc_queues = self.parameterized_send(
-            "*DESC.%s.%s[].%%s?\n" % (block, field), list(fields)
+        # Request values for each enum, and description for each field
+        responses = iter(
+            self.send_batch(
+                ["*ENUMS.%s.%s[].%s?\n" % (block, field, name) for name in enum_names]
+                + ["*DESC.%s.%s[].%s?\n" % (block, field, name) for name in fields]
+            )
         )
+        enum_queues = OrderedDict(zip(enum_names, responses))
+        desc_queues = OrderedDict(zip(fields, responses))
         for name, (bits_str, signed) in fields.items():
             bits_hi, bits_lo = [int(x) for x in bits_str.split(":")]
             description = strip_ok(self.recv(desc_queues[name]))
@@ -349,11 +483,11 @@ class PandABlocksClient:
         self.set_fields({"%s.%s" % (block, field): value})
 
     def set_fields(self, field_values):
-        queues = OrderedDict()
-        for field, value in field_values.items():
-            message = "%s=%s\n" % (field, value)
-            queues[(field, value)] = self.send(message)
-        for (field, value), queue in queues.items():
+        items = list(field_values.items())
+        responses = self.send_batch(
+            ["%s=%s\n" % (field, value) for field, value in items]
+        )
+        for (field, value), queue in zip(items, responses):
             try:
                 resp = self.recv(queue)
             except ValueError as e:
@@ -362,8 +496,8 @@ class PandABlocksClient:
                 assert resp == "OK", "Expected OK, got %r" % resp
 
     def set_table(self, block, field, int_values):
-        lines = ["%s.%s<\n" % (block, field)]
-        lines += ["%s\n" % int_value for int_value in int_values]
+        lines = ["%s.%s<B\n" % (block, field)]
+        lines += ["%s\n" % line for line in encode_table(int_values)]
         lines += ["\n"]
         resp = self.send_recv("".join(lines))
         assert resp == "OK", "Expected OK, got %r" % resp
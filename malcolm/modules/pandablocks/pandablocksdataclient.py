@@ -0,0 +1,218 @@
+import struct
+from collections import namedtuple
+from xml.etree import cElementTree as ET
+
+import numpy as np
+
+CaptureField = namedtuple("CaptureField", "name,type,capture,scale,offset,units")
+CaptureStart = namedtuple("CaptureStart", "fields,missed,process,format,dtype")
+CaptureEnd = namedtuple("CaptureEnd", "samples,reason")
+
+
+def capture_dtype(fields, sample_bytes):
+    """Make the numpy structured dtype of a single sample, with a column for
+    each captured field named like COUNTER1.OUT.Min
+
+    Args:
+        fields (list): The CaptureFields in the order they are sent
+        sample_bytes (int): The size of a sample, which may include padding
+    """
+    names = ["%s.%s" % (f.name, f.capture) for f in fields]
+    formats = [f.type for f in fields]
+    return np.dtype(dict(names=names, formats=formats, itemsize=sample_bytes))
+
+
+class CaptureParser:
+    """Incrementally parse the stream sent by the data port of a PandA when it
+    has been asked for XML FRAMED SCALED data. Bytes can be fed in in whatever
+    chunks they arrive in, and it will produce a CaptureStart for the header
+    of each acquisition, numpy structured arrays of whole samples as they
+    arrive, then a CaptureEnd when the acquisition finishes"""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._handler = self._handle_connected
+        self._header = b""
+        self._dtype = None
+        # Bytes of a sample that was split across frames
+        self._partial = b""
+
+    def feed(self, data):
+        """Add some bytes from the data port, yielding any events they complete
+
+        Args:
+            data (bytes): The bytes received from the socket
+        """
+        self._buf += data
+        while True:
+            # Each handler returns None if it needs more data, otherwise a
+            # list of events and sets the next handler
+            events = self._handler()
+            if events is None:
+                break
+            yield from events
+
+    def _read_line(self):
+        index = self._buf.find(b"\n")
+        if index < 0:
+            return None
+        line = bytes(self._buf[:index])
+        del self._buf[: index + 1]
+        return line
+
+    def _handle_connected(self):
+        line = self._read_line()
+        if line is None:
+            return None
+        assert line == b"OK", "Expected OK, got %r" % line
+        self._handler = self._handle_header_start
+        return []
+
+    def _handle_header_start(self):
+        line = self._read_line()
+        if line is None:
+            return None
+        # Discard anything until the start of the header
+        if line == b"<header>":
+            self._header = line
+            self._handler = self._handle_header_body
+        return []
+
+    def _handle_header_body(self):
+        line = self._read_line()
+        if line is None:
+            return None
+        self._header += line
+        if line != b"</header>":
+            return []
+        root = ET.fromstring(self._header)
+        fields = []
+        for field in root.find("fields"):
+            fields.append(
+                CaptureField(
+                    name=field.get("name"),
+                    type=np.dtype(field.get("type")),
+                    capture=field.get("capture"),
+                    scale=float(field.get("scale", 1)),
+                    offset=float(field.get("offset", 0)),
+                    units=field.get("units", ""),
+                )
+            )
+        data = root.find("data")
+        self._dtype = capture_dtype(fields, int(data.get("sample_bytes")))
+        self._partial = b""
+        # Header is followed by a blank line
+        self._handler = self._handle_header_end
+        start = CaptureStart(
+            fields=fields,
+            missed=int(data.get("missed")),
+            process=data.get("process"),
+            format=data.get("format"),
+            dtype=self._dtype,
+        )
+        return [start]
+
+    def _handle_header_end(self):
+        line = self._read_line()
+        if line is None:
+            return None
+        assert line == b"", "Expected blank line after header, got %r" % line
+        self._handler = self._handle_data_start
+        return []
+
+    def _handle_data_start(self):
+        if len(self._buf) < 4:
+            return None
+        start = bytes(self._buf[:4])
+        if start == b"BIN ":
+            self._handler = self._handle_data_frame
+        elif start == b"END ":
+            self._handler = self._handle_data_end
+        else:
+            raise ValueError("Expected BIN or END, got %r" % start)
+        return []
+
+    def _handle_data_frame(self):
+        if len(self._buf) < 8:
+            return None
+        # Length includes the "BIN " and the length itself
+        (length,) = struct.unpack_from("<I", self._buf, 4)
+        if len(self._buf) < length:
+            return None
+        data = self._partial + bytes(self._buf[8:length])
+        del self._buf[:length]
+        self._handler = self._handle_data_start
+        # Only return whole samples, keeping the rest for the next frame
+        n_samples = len(data) // self._dtype.itemsize
+        n_bytes = n_samples * self._dtype.itemsize
+        self._partial = data[n_bytes:]
+        if n_samples:
+            return [np.frombuffer(data, self._dtype, n_samples)]
+        else:
+            return []
+
+    def _handle_data_end(self):
+        line = self._read_line()
+        if line is None:
+            return None
+        # Like END 200 Ok
+        _, samples, reason = line.decode().split(" ", 2)
+        # Go back to waiting for the next acquisition
+        self._handler = self._handle_header_start
+        return [CaptureEnd(int(samples), reason)]
+
+
+class PandABlocksDataClient:
+    """Connects to the data port of a PandA and parses the captured data that
+    it sends each time PCAP is armed"""
+
+    def __init__(self, hostname="localhost", port=8889):
+        self.hostname = hostname
+        self.port = port
+        # Filled in on connect
+        self._socket = None
+        self._parser = None
+
+    def connect(self, socket_cls=None):
+        if socket_cls is None:
+            from socket import socket as socket_cls
+        self._parser = CaptureParser()
+        self._socket = socket_cls()
+        self._socket.connect((self.hostname, self.port))
+        self._socket.sendall(b"XML FRAMED SCALED\n")
+
+    def close(self):
+        import socket
+
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except Exception:
+            # Socket may already be closed
+            pass
+        self._socket.close()
+        self._socket = None
+
+    def iter_events(self, timeout=None):
+        """Receive from the socket until it is closed, yielding the
+        CaptureStart, np.ndarray and CaptureEnd events that the parser
+        produces
+
+        Args:
+            timeout (float): If given, yield None each time nothing has been
+                received for this long, so the caller can check whether it
+                should stop
+        """
+        import socket
+
+        # Anything left over from last time comes first
+        yield from self._parser.feed(b"")
+        self._socket.settimeout(timeout)
+        while self._socket is not None:
+            try:
+                rx = self._socket.recv(65536)
+            except socket.timeout:
+                yield None
+                continue
+            if not rx:
+                break
+            yield from self._parser.feed(rx)
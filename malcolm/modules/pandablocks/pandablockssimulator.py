@@ -0,0 +1,451 @@
+import argparse
+import json
+import logging
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from .pandablocksclient import PandABlocksClient, decode_table, encode_table
+
+# Create a module level logger
+log = logging.getLogger(__name__)
+
+
+def capture_layout(client):
+    """Capture the blocks, current values and tables of a real PandA so a
+    PandABlocksSimulator can pretend to be it
+
+    Args:
+        client (PandABlocksClient): A started client connected to the PandA
+
+    Returns:
+        OrderedDict: The layout, that can be saved with json.dump
+    """
+    blocks = OrderedDict()
+    for block_name, block_data in client.get_blocks_data().items():
+        fields = OrderedDict()
+        for field_name, field_data in block_data.fields.items():
+            field = OrderedDict(
+                type=field_data.field_type,
+                subtype=field_data.field_subtype,
+                description=field_data.description,
+                labels=list(field_data.labels),
+            )
+            if field_data.field_type == "table":
+                # Table layout is the same for every instance
+                if block_data.number > 1:
+                    instance_name = block_name + "1"
+                else:
+                    instance_name = block_name
+                table_fields = client.get_table_fields(instance_name, field_name)
+                field["table_fields"] = OrderedDict(
+                    (name, t._asdict()) for name, t in table_fields.items()
+                )
+            fields[field_name] = field
+        blocks[block_name] = OrderedDict(
+            number=block_data.number, description=block_data.description, fields=fields,
+        )
+    values = OrderedDict()
+    tables = OrderedDict()
+    for field, value in client.get_changes():
+        if isinstance(value, np.ndarray):
+            tables[field] = value.tolist()
+        elif value is not None:
+            values[field] = value
+    pcap_bits = OrderedDict(
+        (field[: -len(".CAPTURE")], names)
+        for field, names in client.get_pcap_bits_fields().items()
+    )
+    return OrderedDict(blocks=blocks, values=values, tables=tables, pcap_bits=pcap_bits)
+
+
+def load_layout(path):
+    """Load a layout saved from capture_layout"""
+    with open(path) as f:
+        return json.load(f, object_pairs_hook=OrderedDict)
+
+
+def ok(value=None):
+    if value is None:
+        return "OK\n"
+    else:
+        return "OK =%s\n" % value
+
+
+def multiline(lines):
+    return "".join("!%s\n" % line for line in lines) + ".\n"
+
+
+class SimulatorConnection:
+    """The state the simulator keeps for each client connection"""
+
+    def __init__(self):
+        # The change number this connection has seen up to with *CHANGES?
+        self.last_seen = 0
+        # (field, append, binary, lines) while receiving a table
+        self.table = None
+
+
+class SimulatorHandler(socketserver.StreamRequestHandler):
+    """Passes each line a client sends to the simulator"""
+
+    def handle(self):
+        connection = SimulatorConnection()
+        for line in self.rfile:
+            response = self.server.simulator.handle_line(connection, line.decode()[:-1])
+            if response:
+                self.wfile.write(response.encode())
+
+
+class SimulatorServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, simulator):
+        super().__init__(address, SimulatorHandler)
+        self.simulator = simulator
+
+
+class PandABlocksSimulator:
+    """Pretends to be the control port of a PandA TCP server, using a layout
+    from capture_layout
+
+    Args:
+        layout (dict): The blocks, values, tables and pcap_bits of the PandA
+        latency (float): Seconds to wait before responding to each command
+        change_rate (float): How many changes per second to make to the
+            bit_out and pos_out fields, to be reported by *CHANGES?
+    """
+
+    def __init__(self, layout, latency=0.0, change_rate=0.0):
+        self.blocks = layout["blocks"]
+        self.values = OrderedDict(layout["values"])
+        self.tables = OrderedDict(
+            (k, np.array(v, dtype=np.uint32)) for k, v in layout["tables"].items()
+        )
+        self.pcap_bits = layout["pcap_bits"]
+        self.latency = latency
+        self.change_rate = change_rate
+        self.armed = False
+        # {instance_name: block_name}
+        self._instances = OrderedDict()
+        # The bit_out and pos_out fields that change_rate will change
+        self._outputs = []
+        for block_name, block in self.blocks.items():
+            if block["number"] == 1:
+                instance_names = [block_name]
+            else:
+                instance_names = [
+                    "%s%d" % (block_name, i + 1) for i in range(block["number"])
+                ]
+            for instance_name in instance_names:
+                self._instances[instance_name] = block_name
+                for field_name, field in block["fields"].items():
+                    key = "%s.%s" % (instance_name, field_name)
+                    if field["type"] in ("bit_out", "pos_out") and key in self.values:
+                        self._outputs.append(key)
+        self._lock = threading.RLock()
+        # {field: change number it was last changed at}
+        self._change_number = 1
+        self._changed = OrderedDict.fromkeys(list(self.values) + list(self.tables), 1)
+        # Change injection
+        self._next_output = 0
+        self._last_inject = time.time()
+        self._inject_remainder = 0.0
+        # Filled in on start
+        self.port = None
+        self._server = None
+        self._thread = None
+
+    def start(self, hostname="localhost", port=0):
+        """Start serving in a background thread. If port is 0 then a free port
+        is chosen and stored in self.port"""
+        self._server = SimulatorServer((hostname, port), self)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def handle_line(self, connection, line):
+        """Handle a line sent by a client
+
+        Args:
+            connection (SimulatorConnection): The state of the client
+            line (str): The line without its newline
+
+        Returns:
+            str: The response to send, or None if none is needed yet
+        """
+        try:
+            if connection.table is not None:
+                return self._handle_table_line(connection, line)
+            if self.latency:
+                time.sleep(self.latency)
+            with self._lock:
+                return self._handle_command(connection, line)
+        except ValueError as e:
+            return "ERR %s\n" % e
+
+    def _handle_command(self, connection, line):
+        if line.startswith("*"):
+            return self._handle_star_command(connection, line[1:])
+        elif "<" in line:
+            field, op = line.split("<", 1)
+            self._get_table(field)
+            append = op.startswith("<")
+            binary = op.endswith("B")
+            connection.table = (field, append, binary, [])
+            return None
+        elif line.endswith("?"):
+            return self._handle_get(line[:-1])
+        elif "=" in line:
+            field, value = line.split("=", 1)
+            self._set_value(field, value)
+            return ok()
+        else:
+            raise ValueError("Unknown command %r" % line)
+
+    def _handle_star_command(self, connection, command):
+        if command == "IDN?":
+            return ok("PandA SW: simulator")
+        elif command == "BLOCKS?":
+            return multiline(
+                "%s %d" % (name, block["number"]) for name, block in self.blocks.items()
+            )
+        elif command.startswith("DESC.") and command.endswith("?"):
+            return ok(self._get_description(command[5:-1]))
+        elif command.startswith("ENUMS.") and command.endswith("?"):
+            return multiline(self._get_labels(command[6:-1]))
+        elif command == "CHANGES?":
+            return multiline(self._get_changes(connection))
+        elif command == "CHANGES=":
+            connection.last_seen = self._change_number
+            return ok()
+        elif command == "CAPTURE?":
+            return multiline(self._get_captures())
+        elif command == "CAPTURE=":
+            for field in self.values:
+                if field.endswith(".CAPTURE"):
+                    self._set_value(field, "No")
+            return ok()
+        elif command == "PCAP.ARM=":
+            if self.armed:
+                raise ValueError("Capture already in progress")
+            self.armed = True
+            return ok()
+        elif command == "PCAP.DISARM=":
+            self.armed = False
+            return ok()
+        elif command == "PCAP.STATUS?":
+            return ok("Busy" if self.armed else "Idle")
+        else:
+            raise ValueError("Unknown command *%s" % command)
+
+    def _get_block(self, name):
+        # Name may be a block name like TTLIN or an instance name like TTLIN1
+        block_name = self._instances.get(name, name)
+        try:
+            return self.blocks[block_name]
+        except KeyError:
+            raise ValueError("No such block %s" % name)
+
+    def _get_field(self, block_name, field_name):
+        # Field name may be like TABLE[].REPEATS for a table column, or like
+        # OUT.CAPTURE for a subfield
+        field_name, _, column_name = field_name.partition("[].")
+        field_name = field_name.split(".")[0]
+        try:
+            field = self._get_block(block_name)["fields"][field_name]
+        except KeyError:
+            raise ValueError("No such field %s.%s" % (block_name, field_name))
+        if column_name:
+            try:
+                field = field["table_fields"][column_name]
+            except KeyError:
+                raise ValueError("No such table field %s" % column_name)
+        return field
+
+    def _get_description(self, path):
+        block_name, _, field_name = path.partition(".")
+        if field_name:
+            return self._get_field(block_name, field_name)["description"]
+        else:
+            return self._get_block(block_name)["description"]
+
+    def _get_labels(self, path):
+        block_name, _, field_name = path.partition(".")
+        return self._get_field(block_name, field_name)["labels"] or []
+
+    def _get_table(self, field):
+        try:
+            return self.tables[field]
+        except KeyError:
+            raise ValueError("No such table %s" % field)
+
+    def _handle_get(self, path):
+        if path.endswith(".*"):
+            block = self._get_block(path[:-2])
+            return multiline(
+                ("%s %d %s %s" % (name, i, field["type"], field["subtype"])).strip()
+                for i, (name, field) in enumerate(block["fields"].items())
+            )
+        elif path.endswith(".FIELDS"):
+            block_name, field_name, _ = path.split(".")
+            field = self._get_field(block_name, field_name)
+            lines = []
+            for name, t in field.get("table_fields", {}).items():
+                if t["labels"]:
+                    subtype = "enum"
+                elif t["signed"]:
+                    subtype = "int"
+                else:
+                    subtype = "uint"
+                lines.append(
+                    "%d:%d %s %s" % (t["bits_hi"], t["bits_lo"], name, subtype)
+                )
+            return multiline(lines)
+        elif path.endswith(".BITS") and path[:-5] in self.pcap_bits:
+            return multiline(self.pcap_bits[path[:-5]])
+        elif path.endswith(".B") and path[:-2] in self.tables:
+            return multiline(encode_table(self.tables[path[:-2]]))
+        elif path in self.tables:
+            return multiline(str(x) for x in self.tables[path])
+        elif path in self.values:
+            return ok(self.values[path])
+        else:
+            raise ValueError("No such field %s" % path)
+
+    def _set_value(self, field, value):
+        if field not in self.values:
+            raise ValueError("No such field %s" % field)
+        block_name, field_name = field.split(".", 1)
+        field_name, _, subfield_name = field_name.partition(".")
+        field_data = self._get_field(block_name, field_name)
+        # bit_mux, pos_mux and enum fields have labels for the field itself,
+        # ext_outs have them for their CAPTURE subfield
+        if field_data["type"] == "ext_out":
+            has_labels = subfield_name == "CAPTURE"
+        else:
+            has_labels = not subfield_name
+        labels = field_data["labels"]
+        if has_labels and labels and value not in labels:
+            raise ValueError("Invalid enum value %r" % value)
+        self.values[field] = value
+        self._mark_changed(field)
+
+    def _handle_table_line(self, connection, line):
+        field, append, binary, lines = connection.table
+        if line:
+            lines.append(line)
+            return None
+        connection.table = None
+        if self.latency:
+            time.sleep(self.latency)
+        if binary:
+            int_values = decode_table(lines)
+        else:
+            int_values = np.array([int(x) & 0xFFFFFFFF for x in lines], np.uint32)
+        with self._lock:
+            if append:
+                int_values = np.concatenate((self.tables[field], int_values))
+            self.tables[field] = int_values
+            self._mark_changed(field)
+        return ok()
+
+    def _mark_changed(self, field):
+        self._change_number += 1
+        self._changed[field] = self._change_number
+
+    def _inject_changes(self):
+        now = time.time()
+        n_changes = (now - self._last_inject) * self.change_rate
+        n_changes += self._inject_remainder
+        self._last_inject = now
+        if not self._outputs:
+            return
+        self._inject_remainder = n_changes % 1
+        for _ in range(int(n_changes)):
+            field = self._outputs[self._next_output % len(self._outputs)]
+            self._next_output += 1
+            value = self.values[field]
+            block_name, field_name = field.split(".")
+            if self._get_field(block_name, field_name)["type"] == "bit_out":
+                self.values[field] = "0" if value == "1" else "1"
+            else:
+                self.values[field] = str(int(float(value)) + 1)
+            self._mark_changed(field)
+
+    def _get_changes(self, connection):
+        if self.change_rate:
+            self._inject_changes()
+        lines = []
+        for field, change_number in self._changed.items():
+            if change_number > connection.last_seen:
+                if field in self.tables:
+                    lines.append("%s<" % field)
+                else:
+                    lines.append("%s=%s" % (field, self.values[field]))
+        connection.last_seen = self._change_number
+        return lines
+
+    def _get_captures(self):
+        for field, value in self.values.items():
+            if field.endswith(".CAPTURE") and value != "No":
+                yield "%s %s" % (field[: -len(".CAPTURE")], value)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Pretend to be the control port of a PandA"
+    )
+    parser.add_argument("layout", help="JSON file of the PandA layout")
+    parser.add_argument(
+        "--capture",
+        metavar="HOSTNAME",
+        help="Capture the layout of the PandA at HOSTNAME into the layout file "
+        "rather than serving it",
+    )
+    parser.add_argument("--port", type=int, default=8888, help="Port to serve on")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds to wait per command"
+    )
+    parser.add_argument(
+        "--change-rate", type=float, default=0.0, help="Output changes per second"
+    )
+    parsed = parser.parse_args(args)
+    logging.basicConfig(level=logging.INFO)
+    if parsed.capture:
+        client = PandABlocksClient(parsed.capture, parsed.port)
+        client.start()
+        try:
+            layout = capture_layout(client)
+        finally:
+            client.stop()
+        with open(parsed.layout, "w") as f:
+            json.dump(layout, f, indent=2)
+        log.info("Captured layout of %s to %s", parsed.capture, parsed.layout)
+    else:
+        simulator = PandABlocksSimulator(
+            load_layout(parsed.layout), parsed.latency, parsed.change_rate
+        )
+        simulator.start("", parsed.port)
+        log.info("Serving simulated PandA on port %d", simulator.port)
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
-# nothing should be instantiated from YAML but pandabussespart is imported
-# from ADPandaBlocks
+# Most parts are made by the PandABox assembly rather than instantiated from
+# YAML, but pandabussespart is imported from ADPandABlocks
 from .pandabussespart import PandABussesPart
+from .pandacapturepart import PandACapturePart
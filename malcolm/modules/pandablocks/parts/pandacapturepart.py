@@ -0,0 +1,352 @@
+import os
+import time
+from multiprocessing.pool import AsyncResult, ThreadPool
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import cothread
+import h5py
+import numpy as np
+from annotypes import Anno, add_call_types
+from cothread.cosocket import socket
+
+from malcolm.core import APartName, Event, Part, PartRegistrar, Queue, Spawned
+from malcolm.modules import builtin, scanning
+
+from ..pandablocksclient import PandABlocksClient
+from ..pandablocksdataclient import CaptureEnd, CaptureStart, PandABlocksDataClient
+
+with Anno("Hostname of the box"):
+    AHostname = str
+with Anno("Port number of the TCP server control port"):
+    APort = int
+with Anno("Port number of the TCP server data port"):
+    ADataPort = int
+with Anno("Maximum number of samples to write to file in one go"):
+    AChunkSamples = int
+
+# Pull re-used annotypes into our namespace in case we are subclassed
+APartName = APartName
+
+# Datasets where we will write our data, like /entry/COUNTER1.OUT.Min
+DATA_PATH = "/entry/%s"
+UID_PATH = "/entry/uid"
+
+# How often we flush in seconds
+FLUSH_PERIOD = 1
+# How long to wait for a chunk to be written to file
+WRITE_TIMEOUT = 60
+# How long to wait for data before checking if we have been aborted
+RECV_TIMEOUT = 0.1
+
+
+def spawn(function, *args, **kwargs):
+    return Spawned(function, args, kwargs)
+
+
+def capture_dataset_type(field_name: str, capture: str) -> scanning.util.DatasetType:
+    if capture in ("Min", "Max"):
+        return scanning.util.DatasetType["POSITION_%s" % capture.upper()]
+    elif field_name.startswith("INENC"):
+        return scanning.util.DatasetType.POSITION_VALUE
+    else:
+        return scanning.util.DatasetType.MONITOR
+
+
+def iter_step_slices(
+    shape: Sequence[int], start: int, stop: int
+) -> Iterator[Tuple[tuple, int, int]]:
+    """Split the steps [start, stop) of a scan of the given shape into pieces
+    that are contiguous in the fastest moving dimension
+
+    Yields:
+        (index, start, stop): where index selects the piece from an array of
+        the given shape
+    """
+    row_length = shape[-1]
+    while start < stop:
+        row, column = divmod(start, row_length)
+        end = min(stop, start + row_length - column)
+        outer = tuple(int(i) for i in np.unravel_index(row, shape[:-1]))
+        yield outer + (slice(column, column + end - start),), start, end
+        start = end
+
+
+class PandACapturePart(Part):
+    """Part that reads the data captured by PCAP from the data port of a PandA
+    and writes it to an HDF file. Samples are gathered in one buffer while the
+    other is written to file in a worker thread"""
+
+    def __init__(
+        self,
+        name: APartName,
+        hostname: AHostname = "localhost",
+        port: APort = 8888,
+        data_port: ADataPort = 8889,
+        chunk_samples: AChunkSamples = 65536,
+    ) -> None:
+        super().__init__(name)
+        self._hostname = hostname
+        self._port = port
+        self._data_port = data_port
+        self._chunk_samples = chunk_samples
+        # Filled in on configure
+        self._data_client: Optional[PandABlocksDataClient] = None
+        self._hdf: h5py.File = None
+        self._columns: List[str] = []
+        self._generator: scanning.hooks.AGenerator = None
+        self._completed_steps = 0
+        self._steps_to_do = 0
+        # The buffer we are filling comes first, the one being written second
+        self._buffers: List[np.ndarray] = []
+        # How many samples are in the first buffer, and the step of the first
+        self._buffer_samples = 0
+        self._buffer_step = 0
+        # The worker thread, and the write it is doing if any
+        self._pool: Optional[ThreadPool] = None
+        self._write_result: Optional[AsyncResult] = None
+        # Gets the step written up to, or the exception raised, for each write
+        self._write_done = Queue()
+
+    def setup(self, registrar: PartRegistrar) -> None:
+        super().setup(registrar)
+        # Hooks
+        registrar.hook(scanning.hooks.ConfigureHook, self.on_configure)
+        registrar.hook(
+            (scanning.hooks.PostRunArmedHook, scanning.hooks.SeekHook), self.on_seek
+        )
+        registrar.hook(scanning.hooks.RunHook, self.on_run)
+        registrar.hook(
+            (scanning.hooks.AbortHook, builtin.hooks.ResetHook), self.on_reset
+        )
+        registrar.hook(builtin.hooks.HaltHook, self.on_halt)
+        # Tell the controller to expose some extra configure parameters
+        registrar.report(scanning.hooks.ConfigureHook.create_info(self.on_configure))
+
+    # Allow CamelCase as these parameters will be serialized
+    # noinspection PyPep8Naming
+    @add_call_types
+    def on_configure(
+        self,
+        completed_steps: scanning.hooks.ACompletedSteps,
+        steps_to_do: scanning.hooks.AStepsToDo,
+        generator: scanning.hooks.AGenerator,
+        fileDir: scanning.hooks.AFileDir,
+        formatName: scanning.hooks.AFormatName = "panda",
+        fileTemplate: scanning.hooks.AFileTemplate = "%s.h5",
+    ) -> scanning.hooks.UInfos:
+        """On `ConfigureHook` open the HDF file and connect to the data port"""
+        self._close()
+        self._completed_steps = completed_steps
+        self._steps_to_do = steps_to_do
+        self._generator = generator
+        captures = self._get_capture_fields()
+        assert captures, "No PandA fields are set to be captured"
+        self._columns = ["%s.%s" % capture for capture in captures]
+        # The datasets are made when PCAP is armed, as we need its header to
+        # tell us what types they are
+        filename = fileTemplate % formatName
+        filepath = os.path.join(fileDir, filename)
+        self._hdf = h5py.File(filepath, "w", libver="latest")
+        if self._pool is None:
+            self._pool = ThreadPool(1)
+        # Connect now so we get the header when PCAP is armed
+        self._data_client = PandABlocksDataClient(self._hostname, self._data_port)
+        self._data_client.connect(socket)
+        # Tell everyone what we're going to make
+        infos = list(self._create_infos(formatName, filename, captures))
+        return infos
+
+    @add_call_types
+    def on_run(self, context: scanning.hooks.AContext) -> None:
+        """On `RunHook` write samples from the data port until all the steps
+        are done"""
+        assert self._data_client, "Data port not connected"
+        end_step = self._completed_steps + self._steps_to_do
+        self._buffer_step = self._completed_steps
+        self._buffer_samples = 0
+        # Each run arms PCAP, so anything before the next header is left over
+        # from the acquisition of the last run
+        started = False
+        last_flush = time.time()
+        for event in self._data_client.iter_events(timeout=RECV_TIMEOUT):
+            # Raise AbortedError if we have been aborted or paused
+            context.sleep(0)
+            step = self._buffer_step + self._buffer_samples
+            if isinstance(event, CaptureStart):
+                self._start_capture(event)
+                started = True
+            elif not started:
+                continue
+            elif isinstance(event, CaptureEnd):
+                raise ValueError(
+                    "PandA capture ended with %r after %d of %d steps"
+                    % (event.reason, step, end_step)
+                )
+            elif event is not None:
+                # Ignore any samples beyond the end of the scan
+                self._add_samples(event[: end_step - step])
+                step = self._buffer_step + self._buffer_samples
+            if step >= end_step or time.time() - last_flush > FLUSH_PERIOD:
+                last_flush = time.time()
+                self._write_buffer()
+            if step >= end_step:
+                break
+        # Do one last write and then we're done
+        self._write_buffer()
+        self._wait_for_write()
+        if self._buffer_step < end_step:
+            raise ValueError(
+                "PandA data port closed after %d of %d steps"
+                % (self._buffer_step, end_step)
+            )
+
+    @add_call_types
+    def on_seek(
+        self,
+        completed_steps: scanning.hooks.ACompletedSteps,
+        steps_to_do: scanning.hooks.AStepsToDo,
+    ) -> None:
+        """On `SeekHook`, `PostRunArmedHook` record where to next take data"""
+        self._completed_steps = completed_steps
+        self._steps_to_do = steps_to_do
+
+    @add_call_types
+    def on_reset(self) -> None:
+        """On `AbortHook`, `ResetHook` close the data port and HDF file"""
+        self._close()
+
+    @add_call_types
+    def on_halt(self) -> None:
+        """On `HaltHook` close everything and stop the worker thread"""
+        self._close()
+        if self._pool:
+            self._pool.close()
+            self._pool = None
+
+    def _get_capture_fields(self) -> List[Tuple[str, str]]:
+        client = PandABlocksClient(self._hostname, self._port, Queue, Event)
+        client.start(spawn, socket)
+        try:
+            return client.get_capture_fields()
+        finally:
+            client.stop()
+
+    def _create_infos(self, format_name, filename, captures):
+        # Scalar datasets have 2 extra dims like areaDetector NDAttributes
+        rank = len(self._generator.shape) + 2
+        for field_name, capture in captures:
+            column = "%s.%s" % (field_name, capture)
+            yield scanning.infos.DatasetProducedInfo(
+                name="%s.%s" % (format_name, column),
+                filename=filename,
+                type=capture_dataset_type(field_name, capture),
+                rank=rank,
+                path=DATA_PATH % column,
+                uniqueid=UID_PATH,
+            )
+
+    def _start_capture(self, start: CaptureStart) -> None:
+        if start.missed:
+            self.log.warning("PandA missed %d samples", start.missed)
+        assert sorted(start.dtype.names) == sorted(self._columns), (
+            "PandA is capturing %s, expected %s"
+            % (list(start.dtype.names), self._columns)
+        )
+        if UID_PATH not in self._hdf:
+            self._create_datasets(start)
+        # Write anything we have already before replacing the buffers
+        self._write_buffer()
+        self._buffers = [np.empty(self._chunk_samples, start.dtype) for _ in range(2)]
+
+    def _create_datasets(self, start: CaptureStart) -> None:
+        # Make the datasets the full size of the scan up front so we never need
+        # to resize them. UID will be zero for any steps not yet written
+        shape = tuple(self._generator.shape) + (1, 1)
+        chunks = (1,) * (len(shape) - 3) + (min(shape[-3], self._chunk_samples), 1, 1)
+        for field in start.fields:
+            self._hdf.create_dataset(
+                DATA_PATH % ("%s.%s" % (field.name, field.capture)),
+                dtype=field.type,
+                shape=shape,
+                chunks=chunks,
+            )
+        self._hdf.create_dataset(UID_PATH, dtype=np.int32, shape=shape, chunks=chunks)
+        # Datasets made, we can switch to SWMR mode now
+        self._hdf.swmr_mode = True
+
+    def _add_samples(self, samples: np.ndarray) -> None:
+        while len(samples):
+            buffer = self._buffers[0]
+            n = min(len(samples), len(buffer) - self._buffer_samples)
+            buffer[self._buffer_samples : self._buffer_samples + n] = samples[:n]
+            self._buffer_samples += n
+            samples = samples[n:]
+            if self._buffer_samples == len(buffer):
+                self._write_buffer()
+
+    def _write_buffer(self) -> None:
+        if not self._buffer_samples:
+            return
+        # The other buffer can't be reused until its write has finished
+        self._wait_for_write()
+        assert self._pool, "No worker thread"
+        samples = self._buffers[0][: self._buffer_samples]
+        done = self._write_done
+
+        def callback(result):
+            # Called in a thread of the pool, so pass it back to cothread
+            cothread.Callback(done.put, result)
+
+        self._write_result = self._pool.apply_async(
+            self._write_samples,
+            (samples, self._buffer_step),
+            callback=callback,
+            error_callback=callback,
+        )
+        self._buffer_step += self._buffer_samples
+        self._buffer_samples = 0
+        self._buffers.reverse()
+
+    def _wait_for_write(self, report_progress: bool = True) -> None:
+        if self._write_result is None:
+            return
+        result = self._write_done.get(timeout=WRITE_TIMEOUT)
+        self._write_result = None
+        if isinstance(result, Exception):
+            raise result
+        if report_progress:
+            assert self.registrar, "Part has no registrar"
+            self.registrar.report(scanning.infos.RunProgressInfo(result))
+
+    def _write_samples(self, samples: np.ndarray, step: int) -> int:
+        # This runs in the worker thread
+        shape = self._generator.shape
+        end = step + len(samples)
+        uid = np.arange(step + 1, end + 1, dtype=np.int32)
+        paths = [DATA_PATH % name for name in samples.dtype.names]
+        for index, start, stop in iter_step_slices(shape, step, end):
+            index += (0, 0)
+            a, b = start - step, stop - step
+            for name, path in zip(samples.dtype.names, paths):
+                self._hdf[path][index] = samples[name][a:b]
+            self._hdf[UID_PATH][index] = uid[a:b]
+        # Note that UID comes last so anyone monitoring knows the data is there
+        for path in paths + [UID_PATH]:
+            self._hdf[path].flush()
+        return end
+
+    def _close(self) -> None:
+        if self._write_result:
+            # Let the write in progress finish before we close the file
+            try:
+                self._wait_for_write(report_progress=False)
+            except Exception:
+                self.log.exception("Writing PandA data failed")
+            self._write_result = None
+            self._write_done = Queue()
+        if self._data_client:
+            self._data_client.close()
+            self._data_client = None
+        if self._hdf:
+            self._hdf.close()
+            self._hdf = None
@@ -46,6 +46,35 @@ def get_nbits_mask(field_data):
     return nbits, mask
 
 
+class LabelLookup:
+    """Convert between the labels of an enum column and their indexes a whole
+    column at a time"""
+
+    def __init__(self, labels):
+        self.labels = np.array(labels, dtype=object)
+        # Sorted copy of the labels for searchsorted, with the index each one
+        # came from. Stable so duplicates give the first index like list.index
+        str_labels = np.array(labels, dtype=str)
+        self.sorter = np.argsort(str_labels, kind="stable")
+        self.sorted_labels = str_labels[self.sorter]
+
+    def indexes_from_labels(self, values) -> np.ndarray:
+        values = np.asarray(values, dtype=str)
+        positions = np.searchsorted(self.sorted_labels, values)
+        # Anything past the end can't be a match, point it at the last label
+        positions = np.minimum(positions, len(self.sorted_labels) - 1)
+        bad = self.sorted_labels[positions] != values
+        if bad.any():
+            raise ValueError(
+                "%r are not valid labels in %s"
+                % (sorted(set(values[bad].tolist())), self.labels.tolist())
+            )
+        return self.sorter[positions].astype(np.uint32)
+
+    def labels_from_indexes(self, indexes) -> list:
+        return self.labels.take(indexes).tolist()
+
+
 class PandATablePart(PandAFieldPart):
     """This will normally be instantiated by the PandABox assembly, not created
     in yaml"""
@@ -60,6 +89,7 @@ class PandATablePart(PandAFieldPart):
         # Fill in the meta object with the correct headers
         columns = OrderedDict()
         self.field_data = OrderedDict()
+        self.label_lookups = {}
         fields = client.get_table_fields(block_name, field_name)
         if not fields:
             # Didn't put any metadata in, make some up
@@ -68,9 +98,11 @@ class PandATablePart(PandAFieldPart):
             nbits = field_data.bits_hi - field_data.bits_lo + 1
             if nbits < 1:
                 raise ValueError("Bad bits in %s" % (field_data,))
+            column_name = snake_to_camel(column_name)
             if field_data.labels:
                 column_meta = ChoiceArrayMeta(choices=field_data.labels)
                 widget = Widget.COMBO
+                self.label_lookups[column_name] = LabelLookup(field_data.labels)
             elif nbits == 1:
                 column_meta = BooleanArrayMeta()
                 widget = Widget.CHECKBOX
@@ -78,7 +110,6 @@ class PandATablePart(PandAFieldPart):
                 dtype = get_dtype(nbits, field_data.signed)
                 column_meta = NumberArrayMeta(dtype)
                 widget = Widget.TEXTINPUT
-            column_name = snake_to_camel(column_name)
             column_meta.set_label(camel_to_title(column_name))
             column_meta.set_tags([widget.tag()])
             column_meta.set_description(field_data.description)
@@ -110,8 +141,8 @@ class PandATablePart(PandAFieldPart):
             column_value = table[column_name]
             if field_data.labels:
                 # Choice, lookup indexes of the label values
-                indexes = [field_data.labels.index(v) for v in column_value]
-                column_value = np.array(indexes, dtype=np.uint32)
+                lookup = self.label_lookups[column_name]
+                column_value = lookup.indexes_from_labels(column_value.seq)
             else:
                 # Array, unwrap to get the numpy array
                 column_value = column_value.seq
@@ -128,8 +159,8 @@ class PandATablePart(PandAFieldPart):
     def table_from_list(self, int_values):
         columns = {}
         nrows = len(int_values) // self.ints_per_row
-        # Convert to a 1D uint32 array
-        u32 = np.array([int(x) for x in int_values], dtype=np.uint32)
+        # The client decodes to uint32 already, so this won't copy
+        u32 = np.asarray(int_values, dtype=np.uint32)
         # Reshape to a 2D array
         int_matrix = u32.reshape((nrows, self.ints_per_row))
         # Create the data for each column
@@ -142,7 +173,8 @@ class PandATablePart(PandAFieldPart):
             shifted_column = (int_column >> field_data.bits_lo % 32) & mask
             # If we wanted labels, convert to values here
             if field_data.labels:
-                column_value = [field_data.labels[i] for i in shifted_column]
+                lookup = self.label_lookups[column_name]
+                column_value = lookup.labels_from_indexes(shifted_column)
             elif nbits == 1:
                 column_value = shifted_column.astype(np.bool)
             else:
@@ -1,8 +1,10 @@
+import weakref
 from enum import Enum
-from typing import Any, Dict, List, Tuple, Union
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple, TypeVar, Union
 
 import numpy as np
-from annotypes import Array
+from annotypes import Array, FrozenOrderedDict
 from p4p import Type, Value
 
 from malcolm.compat import OrderedDict
@@ -33,6 +35,65 @@ specifier_types = {v: k for k, v in type_specifiers.items()}
 # Add some aliases
 type_specifiers.update({bool: "?", int: "l", float: "d"})
 
+T = TypeVar("T")
+
+
+class IdentityCache:
+    """Cache of things calculated from a FrozenOrderedDict. These are immutable,
+    so anything made from them is valid for as long as they live, but they are
+    unhashable, so are looked up by id and dropped when they are collected.
+
+    As the Notifier only makes a new frozen dict for the parts of the Block
+    that change, the Metas of a Block will hit the cache until they change
+    """
+
+    def __init__(self) -> None:
+        # {id(d): (weakref(d), made)}
+        self._entries: Dict[int, Tuple[weakref.ref, Any]] = {}
+
+    def get(self, d: FrozenOrderedDict, make: Callable[[FrozenOrderedDict], T]) -> T:
+        key = id(d)
+        try:
+            ref, made = self._entries[key]
+        except KeyError:
+            pass
+        else:
+            if ref() is d:
+                return made
+        made = make(d)
+        ref = weakref.ref(d, partial(self._remove, key))
+        self._entries[key] = (ref, made)
+        return made
+
+    def _remove(self, key: int, ref: weakref.ref) -> None:
+        # Only remove the entry if it hasn't been replaced already
+        entry = self._entries.get(key)
+        if entry and entry[0] is ref:
+            del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# {frozen_dict: (spec, value_for_set)}
+spec_cache = IdentityCache()
+# {frozen_dict: Type}
+type_cache = IdentityCache()
+# {frozen_elements: labels}
+labels_cache = IdentityCache()
+
+
+def make_nttable_labels(elements: Dict[str, Any]) -> List[str]:
+    # Add labels for compatibility with epics normative types
+    labels = []
+    for column_name in elements:
+        column_meta = elements[column_name]
+        if column_meta["label"]:
+            labels.append(column_meta["label"])
+        else:
+            labels.append(column_name)
+    return labels
+
 
 def convert_to_type_tuple_value(value: Any) -> Tuple[Any, Any]:
     # cheaper than a subclass check
@@ -57,32 +118,11 @@ def convert_to_type_tuple_value(value: Any) -> Tuple[Any, Any]:
         # List of objects
         spec = "av"
         value_for_set = [convert_dict_to_value(v) for v in value]
+    elif value.__class__ is FrozenOrderedDict:
+        # Immutable, so we only need to work it out once
+        spec, value_for_set = spec_cache.get(value, convert_dict_to_type_tuple_value)
     elif isinstance(value, dict) or hasattr(value, "to_dict"):
-        try:
-            typeid = value["typeid"]
-        except KeyError:
-            typeid = "structure"
-        fields = []
-        value_for_set = {}
-        # Special case NTTable labels
-        if typeid == NTTable.typeid:
-            # Add labels for compatibility with epics normative types
-            labels = []
-            elements = value["meta"]["elements"]
-            for column_name in elements:
-                column_meta = elements[column_name]
-                if column_meta["label"]:
-                    labels.append(column_meta["label"])
-                else:
-                    labels.append(column_name)
-            fields.append(("labels", "as"))
-            value_for_set["labels"] = labels
-        for k in value:
-            if k != "typeid":
-                t, v_set = convert_to_type_tuple_value(value[k])
-                fields.append((k, t))
-                value_for_set[k] = v_set
-        spec = ("S", typeid, fields)
+        spec, value_for_set = convert_dict_to_type_tuple_value(value)
     elif isinstance(value, (AlarmSeverity, AlarmStatus)):
         spec = "i"
         value_for_set = value.value
@@ -98,6 +138,30 @@ def convert_to_type_tuple_value(value: Any) -> Tuple[Any, Any]:
     return spec, value_for_set
 
 
+def convert_dict_to_type_tuple_value(value: Any) -> Tuple[Any, Any]:
+    try:
+        typeid = value["typeid"]
+    except KeyError:
+        typeid = "structure"
+    fields = []
+    value_for_set = {}
+    # Special case NTTable labels
+    if typeid == NTTable.typeid:
+        elements = value["meta"]["elements"]
+        if elements.__class__ is FrozenOrderedDict:
+            labels = labels_cache.get(elements, make_nttable_labels)
+        else:
+            labels = make_nttable_labels(elements)
+        fields.append(("labels", "as"))
+        value_for_set["labels"] = labels
+    for k in value:
+        if k != "typeid":
+            t, v_set = convert_to_type_tuple_value(value[k])
+            fields.append((k, t))
+            value_for_set[k] = v_set
+    return ("S", typeid, fields), value_for_set
+
+
 def convert_from_type_spec(spec: str, val: Any) -> Any:
     if isinstance(spec, Type):
         # Structure
@@ -119,15 +183,23 @@ def convert_dict_to_value(d: Dict) -> Value:
     if d is None:
         val = EMPTY
     else:
-        (_, typeid, fields), value_for_set = convert_to_type_tuple_value(d)
-        try:
-            typ = Type(fields, typeid)
-        except RuntimeError as e:
-            raise RuntimeError("%s when doing Type(%s, %s)" % (e, fields, typeid))
+        spec, value_for_set = convert_to_type_tuple_value(d)
+        if d.__class__ is FrozenOrderedDict:
+            typ = type_cache.get(d, lambda _: make_type(spec))
+        else:
+            typ = make_type(spec)
         val = Value(typ, value_for_set)
     return val
 
 
+def make_type(spec: Tuple[str, str, List]) -> Type:
+    _, typeid, fields = spec
+    try:
+        return Type(fields, typeid)
+    except RuntimeError as e:
+        raise RuntimeError("%s when doing Type(%s, %s)" % (e, fields, typeid))
+
+
 def convert_value_to_dict(v: Value) -> Dict:
     d = OrderedDict()
     # Fill in typeid if set
@@ -144,7 +216,31 @@ def convert_value_to_dict(v: Value) -> Dict:
 
 
 def update_path(value: Value, path: List[str], update: Any) -> None:
+    """Update value at path, only marking the fields that have actually
+    changed, so a monitor only sends those to the client"""
     for p in path[:-1]:
         value = value[p]
     _, update = convert_to_type_tuple_value(update)
-    value[path[-1]] = update
+    set_if_changed(value, path[-1], update)
+
+
+def set_if_changed(value: Value, name: str, update: Any) -> None:
+    current = value[name]
+    if isinstance(update, dict) and isinstance(current, Value):
+        # Recurse into the structure rather than setting it, as that would
+        # mark every field within it as changed
+        for k, v in update.items():
+            set_if_changed(current, k, v)
+    elif not values_equal(current, update):
+        value[name] = update
+
+
+def values_equal(current: Any, update: Any) -> bool:
+    try:
+        if isinstance(current, np.ndarray):
+            return np.array_equal(current, update)
+        else:
+            return bool(current == update)
+    except Exception:
+        # Can't compare them, so assume they are different
+        return False
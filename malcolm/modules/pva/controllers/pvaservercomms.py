@@ -227,9 +227,10 @@ class BlockHandler(Handler):
             # Path will have at least one element
             path, update = change
             update_path(self.value, path, update)
-        # No type change, post the updated value
+        # No type change, post the updated value if any fields are marked
         assert self.pv, "No pv"
-        self.pv.post(self.value)
+        if self.value.changed():
+            self.pv.post(self.value)
 
     # Need camelCase as called by p4p Server
     # noinspection PyPep8Naming
@@ -1,12 +1,18 @@
-from typing import Callable, Dict, Optional, Tuple
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
 
-from annotypes import Anno, deserialize_object, json_decode, json_encode
+from annotypes import Anno, deserialize_object, json_decode
 from cothread import cothread
 from tornado import gen
-from tornado.websocket import WebSocketClientConnection, websocket_connect
+from tornado.websocket import (
+    WebSocketClientConnection,
+    WebSocketClosedError,
+    websocket_connect,
+)
 
 from malcolm.core import (
     DEFAULT_TIMEOUT,
+    Alarm,
     BlockMeta,
     BlockModel,
     Delta,
@@ -22,19 +28,43 @@ from malcolm.core import (
     Subscribe,
     TableMeta,
     Update,
+    json_encode,
 )
 from malcolm.modules import builtin
 
-from ..util import BlockTable, IOLoopHelper
+from ..util import (
+    BINARY_SUBPROTOCOL,
+    BlockTable,
+    IOLoopHelper,
+    binary_decode,
+    binary_encode,
+)
 
 Key = Tuple[Callable[[Response], None], int]
 
+# Time to wait before the first reconnect attempt, doubled on each failure
+INITIAL_RECONNECT_DELAY = 0.1
+# Longest time to wait between reconnect attempts
+MAX_RECONNECT_DELAY = 10.0
+
 with Anno("Hostname of malcolm websocket server"):
     AHostname = str
 with Anno("Port number to run up under"):
     APort = int
 with Anno("Time to wait for connection"):
     AConnectTimeout = float
+with Anno(
+    "If True, ask the server to send numpy arrays as raw binary buffers rather "
+    "than JSON lists"
+):
+    ABinary = bool
+with Anno("If True, ask the server to compress the messages it sends"):
+    ACompression = bool
+with Anno(
+    "If True, reconnect to the server if the connection drops, resubscribing "
+    "to everything that was subscribed to"
+):
+    AReconnect = bool
 
 
 class WebsocketClientComms(builtin.controllers.ClientComms):
@@ -46,16 +76,27 @@ class WebsocketClientComms(builtin.controllers.ClientComms):
         hostname: AHostname = "localhost",
         port: APort = 8008,
         connect_timeout: AConnectTimeout = DEFAULT_TIMEOUT,
+        binary: ABinary = True,
+        compression: ACompression = True,
+        reconnect: AReconnect = True,
     ) -> None:
         super().__init__(mri)
         self.hostname = hostname
         self.port = port
         self.connect_timeout = connect_timeout
+        self.binary = binary
+        self.compression = compression
+        self.reconnect = reconnect
         self._connected_queue = Queue()
         # {new_id: request}
         self._request_lookup: Dict[int, Request] = {}
         self._next_id = 1
         self._conn: Optional[WebSocketClientConnection] = None
+        # Incremented to tell any running recv_loop to stop reconnecting
+        self._generation = 0
+        # Requests from cothread waiting to be sent by tornado
+        self._outbound: Deque[Request] = deque()
+        self._flush_scheduled = False
         # Create read-only attribute for the remotely reachable blocks
         self.remote_blocks = TableMeta.from_table(
             BlockTable, "Remotely reachable blocks"
@@ -69,38 +110,111 @@ class WebsocketClientComms(builtin.controllers.ClientComms):
     def _start_client(self):
         # Called from cothread
         if self._conn is None:
-            IOLoopHelper.call(self.recv_loop)
+            self._generation += 1
+            IOLoopHelper.call(self.recv_loop, self._generation)
             self._connected_queue.get(timeout=self.connect_timeout)
             root_subscribe = Subscribe(path=[".", "blocks", "value"])
             root_subscribe.set_callback(self._update_remote_blocks)
-            IOLoopHelper.call(self._send_request, root_subscribe)
+            self._queue_request(root_subscribe)
 
     @gen.coroutine
-    def recv_loop(self):
-        # Called from tornado
-        url = "ws://%s:%d/ws" % (self.hostname, self.port)
-        self._conn = yield websocket_connect(
-            url, connect_timeout=self.connect_timeout - 0.5
-        )
-        cothread.Callback(self._connected_queue.put, None)
+    def recv_loop(self, generation):
+        # Called from tornado. Only touches self._conn and the request lookup
+        # while generation is current, so a stale loop can't disturb the
+        # connection or requests of a newer one
+        delay = INITIAL_RECONNECT_DELAY
+        reconnecting = False
+        conn = yield self._connect()
         while True:
-            message = yield self._conn.read_message()
-            if message is None:
-                self._conn = None
+            if generation != self._generation:
+                # Disabled while we were connecting
+                conn.close()
+                return
+            # Anything in the lookup is a Subscribe to replay or a Request
+            # queued before we connected, so send them in order. This happens
+            # before the connection is published to _flush_requests, so none
+            # of them are sent twice
+            for id in sorted(self._request_lookup):
+                self._write_request(conn, self._request_lookup[id])
+            self._conn = conn
+            if reconnecting:
+                self.log.info("Reconnected to server, resubscribing")
+                cothread.Callback(
+                    self.update_health, self, builtin.infos.HealthInfo(Alarm.ok)
+                )
+            else:
+                cothread.Callback(self._connected_queue.put, None)
+            while True:
+                message = yield conn.read_message()
+                if message is None:
+                    break
+                self.on_message(message)
+            if generation != self._generation:
+                # _stop_client closed the connection and cleans up after us
+                cothread.Callback(self._connected_queue.put, None)
+                return
+            self._conn = None
+            if not self.reconnect:
+                self._fail_requests()
                 cothread.Callback(self._report_fault)
                 return
-            self.on_message(message)
+            self._fail_requests(Subscribe)
+            cothread.Callback(
+                self.update_health,
+                self,
+                builtin.infos.HealthInfo(
+                    Alarm.major("Server disconnected, reconnecting")
+                ),
+            )
+            reconnecting = True
+            conn = None
+            while conn is None:
+                yield gen.sleep(delay)
+                if generation != self._generation:
+                    # Disabled while we were waiting to reconnect
+                    return
+                try:
+                    conn = yield self._connect()
+                except Exception as e:
+                    self.log.debug("Reconnect failed: %s", e)
+                    delay = min(delay * 2, MAX_RECONNECT_DELAY)
+            delay = INITIAL_RECONNECT_DELAY
+
+    @gen.coroutine
+    def _connect(self):
+        # Called from tornado
+        url = "ws://%s:%d/ws" % (self.hostname, self.port)
+        if self.binary:
+            subprotocols = [BINARY_SUBPROTOCOL]
+        else:
+            subprotocols = None
+        if self.compression:
+            # Empty options are enough to offer permessage-deflate
+            compression_options = {}
+        else:
+            compression_options = None
+        conn = yield websocket_connect(
+            url,
+            connect_timeout=self.connect_timeout - 0.5,
+            subprotocols=subprotocols,
+            compression_options=compression_options,
+        )
+        return conn
 
     def on_message(self, message):
         """Pass response from server to process receive queue
 
         Args:
-            message(str): Received message
+            message(str or bytes): Received message, bytes if the server
+                agreed to send binary messages
         """
         # Called in tornado loop
         try:
             self.log.debug("Got message %s", message)
-            d = json_decode(message)
+            if isinstance(message, bytes):
+                d = binary_decode(message)
+            else:
+                d = json_decode(message)
             response = deserialize_object(d, Response)
             if isinstance(response, (Return, Error)):
                 request = self._request_lookup.pop(response.id)
@@ -116,29 +230,43 @@ class WebsocketClientComms(builtin.controllers.ClientComms):
             # error messages about 'HTTPRequest' object has no attribute 'path'
             self.log.exception("on_message(%r) failed", message)
 
+    def _fail_requests(self, keep_type=()):
+        # Called in tornado thread
+        for id in list(self._request_lookup):
+            request = self._request_lookup[id]
+            if not isinstance(request, keep_type):
+                # We can't tell whether the server got it, so can't resend it
+                self._request_lookup.pop(id)
+                self._fail_request(request)
+
+    def _fail_request(self, request):
+        # Called in tornado thread
+        response = Error(id=request.id, message=ResponseError("Server disconnected"))
+        cothread.Callback(self._notify, request, response)
+
+    def _notify(self, request, response):
+        # Called in cothread thread
+        try:
+            request.callback(response)
+        except Exception:
+            # Most things will error here, not really a problem
+            self.log.debug("Callback %s raised", request.callback)
+
     def _report_fault(self):
         # Called in cothread thread
         with self._lock:
             if self.state.value != self.state_set.DISABLING:
                 self.transition(self.state_set.FAULT, "Server disconnected")
-        self._connected_queue.put(None)
-        for id in list(self._request_lookup):
-            request = self._request_lookup.pop(id)
-            response = Error(
-                id=request.id, message=ResponseError("Server disconnected")
-            )
-            try:
-                request.callback(response)
-            except Exception:
-                # Most things will error here, not really a problem
-                self.log.debug("Callback %s raised", request.callback)
 
     def _stop_client(self):
         # Called from cothread
+        self._generation += 1
         if self._conn:
             IOLoopHelper.call(self._conn.close)
             self._connected_queue.get(timeout=self.connect_timeout)
             self._conn = None
+        # The stopped recv_loop leaves the lookup alone, so fail what is in it
+        IOLoopHelper.call(self._fail_requests)
 
     def _update_remote_blocks(self, response):
         response = deserialize_object(response, Update)
@@ -174,7 +302,7 @@ class WebsocketClientComms(builtin.controllers.ClientComms):
                 cothread.Callback(self._handle_response, response, block, done_queue)
 
         subscribe.set_callback(handle_response)
-        IOLoopHelper.call(self._send_request, subscribe)
+        self._queue_request(subscribe)
         done_queue.get(timeout=DEFAULT_TIMEOUT)
 
     def _handle_response(
@@ -228,7 +356,9 @@ class WebsocketClientComms(builtin.controllers.ClientComms):
                 block.set_endpoint_data(field, value)
 
     def send_put(self, mri, attribute_name, value):
-        """Abstract method to dispatch a Put to the server
+        """Abstract method to dispatch a Put to the server. Waits for the
+        response, so a single cothread has only one request in flight. Fails
+        if the server is disconnected before it responds
 
         Args:
             mri (str): The mri of the Block
@@ -238,7 +368,7 @@ class WebsocketClientComms(builtin.controllers.ClientComms):
         q = Queue()
         request = Put(path=[mri, attribute_name, "value"], value=value)
         request.set_callback(q.put)
-        IOLoopHelper.call(self._send_request, request)
+        self._queue_request(request)
         response = q.get()
         if isinstance(response, Error):
             raise response.message
@@ -246,7 +376,9 @@ class WebsocketClientComms(builtin.controllers.ClientComms):
             return response.value
 
     def send_post(self, mri, method_name, **params):
-        """Abstract method to dispatch a Post to the server
+        """Abstract method to dispatch a Post to the server. Waits for the
+        response, so a single cothread has only one request in flight. Fails
+        if the server is disconnected before it responds
 
         Args:
             mri (str): The mri of the Block
@@ -259,18 +391,52 @@ class WebsocketClientComms(builtin.controllers.ClientComms):
         q = Queue()
         request = Post(path=[mri, method_name], parameters=params)
         request.set_callback(q.put)
-        IOLoopHelper.call(self._send_request, request)
+        self._queue_request(request)
         response = q.get()
         if isinstance(response, Error):
             raise response.message
         else:
             return response.value
 
+    def _queue_request(self, request):
+        # Called in cothread thread. Requests made by any cothreads before
+        # tornado gets round to sending them are written back to back in one
+        # go, saving a trip to tornado for each
+        self._outbound.append(request)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            IOLoopHelper.call(self._flush_requests)
+
+    def _flush_requests(self):
+        # Called in tornado thread
+        self._flush_scheduled = False
+        while self._outbound:
+            self._send_request(self._outbound.popleft())
+
     def _send_request(self, request):
         # Called in tornado thread
         request.id = self._next_id
         self._next_id += 1
-        self._request_lookup[request.id] = request
-        message = json_encode(request)
+        if self._conn:
+            self._request_lookup[request.id] = request
+            self._write_request(self._conn, request)
+        elif isinstance(request, Subscribe):
+            # It will be sent when we reconnect
+            self._request_lookup[request.id] = request
+        else:
+            # We may never reconnect, so don't leave the caller waiting
+            self._fail_request(request)
+
+    def _write_request(self, conn, request):
+        # Called in tornado thread
+        binary = conn.selected_subprotocol == BINARY_SUBPROTOCOL
+        if binary:
+            message = binary_encode(request)
+        else:
+            message = json_encode(request)
         self.log.debug("Sending message %s", message)
-        self._conn.write_message(message)
+        try:
+            conn.write_message(message, binary=binary)
+        except WebSocketClosedError:
+            # recv_loop will find out soon, and fail or resend the request
+            self.log.debug("Connection closed before sending %s", request)
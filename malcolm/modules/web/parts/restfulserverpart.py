@@ -1,9 +1,23 @@
-from annotypes import Anno, add_call_types, json_decode, json_encode
+import hashlib
+from typing import Any, List, Optional
+
+from annotypes import Anno, add_call_types, json_decode
 from tornado import gen
 from tornado.queues import Queue
 from tornado.web import RequestHandler
 
-from malcolm.core import Error, Get, Part, PartRegistrar, Post, Return
+from malcolm.compat import OrderedDict
+from malcolm.core import (
+    Error,
+    Get,
+    Part,
+    PartRegistrar,
+    Post,
+    Return,
+    TimeStamp,
+    get_endpoint,
+    json_encode,
+)
 from malcolm.modules import builtin
 
 from ..hooks import ReportHandlersHook, UHandlerInfos
@@ -16,19 +30,56 @@ from ..util import IOLoopHelper
 class RestfulHandler(RequestHandler):
     _registrar = None
     _queue = None
+    _etag = None
 
     def initialize(self, registrar=None):
         self._registrar: PartRegistrar = registrar
         self._queue = Queue()
 
+    # curl http://localhost:8008/rest/HELLO/greeting/value
+    # curl "http://localhost:8008/rest/?path=HELLO/greeting&path=COUNTER/counter"
     @gen.coroutine
     def get(self, endpoint_str):
         # called from tornado thread
-        path = endpoint_str.split("/")
-        request = Get(path=path)
-        self.report_request(request)
-        response = yield self._queue.get()
-        self.handle_response(response)
+        path_strs = self.get_query_arguments("path")
+        bulk = not endpoint_str and path_strs
+        if not bulk:
+            path_strs = [endpoint_str]
+        paths = [path_str.split("/") for path_str in path_strs]
+        # Get each Block once, so every path within it comes from the same
+        # published snapshot
+        mris = list(OrderedDict.fromkeys(path[0] for path in paths))
+        for i, mri in enumerate(mris):
+            self.report_request(Get(id=i, path=[mri]))
+        snapshots = {}
+        for _ in mris:
+            response = yield self._queue.get()
+            if not isinstance(response, Return):
+                self.handle_response(response)
+                return
+            snapshots[mris[response.id]] = response.value
+        values = []
+        timestamps = []
+        for path in paths:
+            try:
+                values.append(get_endpoint(snapshots[path[0]], path))
+            except Exception as e:
+                self.handle_response(Error(message=e))
+                return
+            timestamps.append(self.find_timestamp(snapshots[path[0]], path))
+        if None not in timestamps:
+            self._etag = self.make_etag(path_strs, timestamps)
+            self.set_etag_header()
+            if self.check_etag_header():
+                # Nothing has changed, so don't bother serializing
+                self.set_status(304)
+                self.finish()
+                return
+        if bulk:
+            value = OrderedDict(zip(path_strs, values))
+        else:
+            value = values[0]
+        self.handle_response(Return(value=value))
 
     # curl -d '{"name": "me"}' http://localhost:8008/rest/HELLO/greet
     @gen.coroutine
@@ -41,6 +92,36 @@ class RestfulHandler(RequestHandler):
         response = yield self._queue.get()
         self.handle_response(response)
 
+    @staticmethod
+    def find_timestamp(data: Any, path: List[str]) -> Optional[TimeStamp]:
+        """Return the timeStamp of the Attribute if path is to its value, or
+        within its value, otherwise None. Only the value is guaranteed to
+        update the timeStamp when it changes, alarm and meta changes do not"""
+        for endpoint in path[1:]:
+            if endpoint == "value" and isinstance(data, dict) and "timeStamp" in data:
+                return data["timeStamp"]
+            data = data[endpoint]
+        return None
+
+    @staticmethod
+    def make_etag(path_strs: List[str], timestamps: List[Any]) -> str:
+        h = hashlib.sha1()
+        for path_str, ts in zip(path_strs, timestamps):
+            h.update(
+                (
+                    "%s %d %d %d;"
+                    % (path_str, ts.secondsPastEpoch, ts.nanoseconds, ts.userTag)
+                ).encode()
+            )
+        return '"%s"' % h.hexdigest()
+
+    def compute_etag(self) -> Optional[str]:
+        # Use the ETag made from the timeStamps, otherwise tornado will hash the
+        # body as usual
+        if self._etag:
+            return self._etag
+        return super().compute_etag()
+
     def report_request(self, request):
         # called from tornado thread
         request.set_callback(self.queue_response)
@@ -3,10 +3,11 @@ import logging
 import os
 import socket
 import struct
-from typing import Dict, Optional
+from collections import deque
+from typing import Deque, Dict, Union
 
-import cothread
-from annotypes import Anno, add_call_types, deserialize_object, json_decode, json_encode
+from annotypes import Anno, add_call_types, deserialize_object, json_decode
+from tornado import gen
 from tornado.websocket import WebSocketError, WebSocketHandler
 
 from malcolm.core import (
@@ -17,18 +18,19 @@ from malcolm.core import (
     PartRegistrar,
     Post,
     Put,
-    Queue,
     Request,
     Response,
     Subscribe,
     Unsubscribe,
     Update,
+    json_encode,
+    squash_changes,
 )
 from malcolm.modules import builtin
 
 from ..hooks import ReportHandlersHook, UHandlerInfos
 from ..infos import HandlerInfo
-from ..util import IOLoopHelper
+from ..util import BINARY_SUBPROTOCOL, IOLoopHelper, binary_decode, binary_encode
 
 # Create a module level logger
 log = logging.getLogger(__name__)
@@ -40,6 +42,14 @@ SIOCGIFNETMASK = 0x891B
 # Where we get info about interfaces on Linux
 SYSNET = "/sys/class/net"
 
+# When this many responses are waiting to be written to a websocket, merge any
+# new Delta or Update into the one waiting for the same subscription
+OUTBOUND_HIGH_WATER = 100
+
+# If this many responses are waiting to be written to a websocket, the client
+# is not reading them, so close the connection rather than queue any more
+OUTBOUND_LIMIT = 1000
+
 
 def get_if_info(s, sig, ifname):
     # Use an ioctl to get interface address or netmask
@@ -66,16 +76,24 @@ class MalcWebSocketHandler(WebSocketHandler):
     _id_to_mri: Dict[int, str]
     _validators = None
     _writeable = None
-    _queue: Optional[Queue] = None
-    _counter = None
+    _outbound: Deque[Response]
+    _coalescable: Dict[int, Response]
+    _writing = False
+    _dropped = False
 
-    def initialize(self, registrar=None, validators=()):
+    def initialize(
+        self, registrar=None, validators=(), compression_level=0,
+    ):
         self._registrar = registrar
         # {id: mri}
         self._id_to_mri = {}
         self._validators = validators
-        self._queue = Queue()
-        self._counter = 0
+        self._compression_level = compression_level
+        # Responses waiting to be written to the websocket
+        self._outbound = deque()
+        # {id: Delta or Update} of the latest subscription response in
+        # _outbound, so later ones can be merged into it
+        self._coalescable = {}
 
     def on_message(self, message):
         # called in tornado's thread
@@ -99,7 +117,10 @@ class MalcWebSocketHandler(WebSocketHandler):
 
         msg_id = -1
         try:
-            d = json_decode(message)
+            if isinstance(message, bytes):
+                d = binary_decode(message)
+            else:
+                d = json_decode(message)
             try:
                 msg_id = d["id"]
             except KeyError:
@@ -122,24 +143,84 @@ class MalcWebSocketHandler(WebSocketHandler):
             self._registrar.report(builtin.infos.RequestInfo(request, mri))
         except Exception as e:
             log.exception("Error handling message:\n%s", message)
-            error = Error(msg_id, e)
-            error_message = error.to_dict()
-            self.write_message(json_encode(error_message))
+            self._on_response(Error(msg_id, e))
 
     def on_response(self, response):
-        # called from cothread
+        # called from cothread, never blocks so a slow client can't hold up
+        # responses to anyone else
         IOLoopHelper.call(self._on_response, response)
-        # Wait for completion once every 10 message
-        self._counter += 1
-        if self._counter % 10 == 0:
-            for _ in range(10):
-                self._queue.get()
 
     def _on_response(self, response: Response) -> None:
         # called from tornado thread
-        message = json_encode(response)
+        if self._dropped:
+            # Connection has been closed for falling too far behind
+            return
+        if len(self._outbound) >= OUTBOUND_HIGH_WATER:
+            # Client is falling behind, so merge into any pending response for
+            # the same subscription
+            pending = self._coalescable.get(response.id, None)
+            if isinstance(response, Delta) and isinstance(pending, Delta):
+                pending.changes = squash_changes(pending.changes + response.changes)
+                return
+            elif isinstance(response, Update) and isinstance(pending, Update):
+                pending.value = response.value
+                return
+        if isinstance(response, (Delta, Update)):
+            self._coalescable[response.id] = response
+        else:
+            # Return or Error, so nothing should be merged past it
+            self._coalescable.pop(response.id, None)
+        if len(self._outbound) >= OUTBOUND_LIMIT:
+            self._drop_connection()
+            return
+        self._outbound.append(response)
+        if not self._writing:
+            self._writing = True
+            self._write_outbound()
+
+    def _drop_connection(self):
+        # called from tornado thread
+        log.error(
+            "%d responses waiting for %s, closing connection",
+            len(self._outbound),
+            self.request.remote_ip,
+        )
+        self._dropped = True
+        self._outbound.clear()
+        self._coalescable.clear()
+        # Unsubscribe everything so the local controllers stop responding
+        for msg_id, mri in self._id_to_mri.items():
+            unsubscribe = Unsubscribe(msg_id)
+            unsubscribe.set_callback(self.on_response)
+            if self._registrar:
+                self._registrar.report(builtin.infos.RequestInfo(unsubscribe, mri))
+        self._id_to_mri.clear()
+        self.close(1008, "Too many responses waiting to be sent")
+
+    @gen.coroutine
+    def _write_outbound(self):
+        # called from tornado thread
         try:
-            self.write_message(message)
+            while self._outbound:
+                response = self._outbound.popleft()
+                if self._coalescable.get(response.id, None) is response:
+                    del self._coalescable[response.id]
+                yield self._write_response(response)
+        finally:
+            self._writing = False
+
+    @gen.coroutine
+    def _write_response(self, response: Response):
+        # called from tornado thread
+        binary = self.selected_subprotocol == BINARY_SUBPROTOCOL
+        message: Union[bytes, str]
+        if binary:
+            message = binary_encode(response)
+        else:
+            message = json_encode(response)
+        try:
+            # Wait until it is written before sending the next one
+            yield self.write_message(message, binary=binary)
         except WebSocketError:
             # The websocket is dead. If the response was a Delta or Update, then
             # unsubscribe so the local controller doesn't keep on trying to
@@ -157,9 +238,20 @@ class MalcWebSocketHandler(WebSocketHandler):
                         self._registrar.report(
                             builtin.infos.RequestInfo(unsubscribe, mri)
                         )
-        finally:
-            assert self._queue, "No queue"
-            cothread.Callback(self._queue.put, None)
+
+    def get_compression_options(self):
+        # Offer permessage-deflate if compression is enabled
+        if self._compression_level:
+            return dict(compression_level=self._compression_level)
+        else:
+            return None
+
+    def select_subprotocol(self, subprotocols):
+        # Send binary messages to clients that ask for them
+        if BINARY_SUBPROTOCOL in subprotocols:
+            return BINARY_SUBPROTOCOL
+        else:
+            return None
 
     # http://stackoverflow.com/q/24851207
     # TODO: remove this when the web gui is hosted from the box
@@ -171,14 +263,20 @@ with Anno("Part name and subdomain name to host websocket on"):
     AName = str
 with Anno("If True, check any client is in the same subnet as the host"):
     ASubnetValidation = bool
+with Anno("zlib level 1-9 to compress messages to clients that support it, 0=off"):
+    ACompressionLevel = int
 
 
 class WebsocketServerPart(Part):
     def __init__(
-        self, name: AName = "ws", subnet_validation: ASubnetValidation = True
+        self,
+        name: AName = "ws",
+        subnet_validation: ASubnetValidation = True,
+        compression_level: ACompressionLevel = 0,
     ) -> None:
         super().__init__(name)
         self.subnet_validation = subnet_validation
+        self.compression_level = compression_level
 
     def setup(self, registrar: PartRegistrar) -> None:
         super().setup(registrar)
@@ -201,5 +299,6 @@ class WebsocketServerPart(Part):
             MalcWebSocketHandler,
             registrar=self.registrar,
             validators=validators,
+            compression_level=self.compression_level,
         )
         return info
@@ -1,12 +1,27 @@
 import asyncio
 import atexit
+import json
+import struct
 from threading import Thread
-from typing import Optional, Union
+from typing import Any, List, Optional, Union
 
-from annotypes import Anno, Array
+import numpy as np
+from annotypes import Anno, Array, FrozenOrderedDict
 from tornado.ioloop import IOLoop
 
-from malcolm.core import Table
+from malcolm.core import Table, serialize_hook
+
+# The websocket subprotocol that a client asks for to get binary messages
+BINARY_SUBPROTOCOL = "malcolm-binary"
+
+# The key of the placeholder dict that replaces a numpy array in the header
+_NDARRAY_KEY = "__ndarray__"
+
+# Numpy dtype kinds that are sent as raw buffers: bool, int, uint, float
+_BUFFER_KINDS = "biuf"
+
+# Buffers are aligned to this many bytes from the start of the message
+_ALIGNMENT = 8
 
 
 class IOLoopHelper:
@@ -57,3 +72,77 @@ class BlockTable(Table):
     def __init__(self, mri: AMris, label: ALabels) -> None:
         self.mri = mri
         self.label = label
+
+
+def binary_encode(o: Any) -> bytes:
+    """Encode o as a binary websocket message. This is the JSON that
+    json_encode would produce, except that numeric numpy arrays are replaced by
+    {"__ndarray__": [dtype, offset, shape]} and sent as raw little-endian
+    buffers after it. The message is laid out as:
+
+    - uint32 little-endian length of the JSON header
+    - JSON header, padded with spaces so the buffers are aligned
+    - Each buffer in turn, padded so the next one is aligned
+
+    Args:
+        o: The object to encode
+
+    Returns:
+        bytes: The binary message
+    """
+    buffers: List[Any] = []
+    offset = 0
+
+    def default(o):
+        nonlocal offset
+        if o.__class__ is Array:
+            o = o.seq
+            if isinstance(o, (list, tuple)):
+                return o
+        if isinstance(o, np.ndarray) and o.dtype.kind in _BUFFER_KINDS:
+            dtype = o.dtype.newbyteorder("<")
+            data = memoryview(np.ascontiguousarray(o, dtype=dtype)).cast("B")
+            placeholder = {_NDARRAY_KEY: [dtype.str, offset, list(o.shape)]}
+            buffers.append(data)
+            offset += len(data)
+            padding = -offset % _ALIGNMENT
+            if padding:
+                buffers.append(b"\0" * padding)
+                offset += padding
+            return placeholder
+        return serialize_hook(o)
+
+    header = json.dumps(o, default=default).encode()
+    # Pad so the buffers are aligned from the start of the message
+    header += b" " * (-(4 + len(header)) % _ALIGNMENT)
+    return b"".join([struct.pack("<I", len(header)), header] + buffers)
+
+
+def binary_decode(message: bytes) -> FrozenOrderedDict:
+    """Decode a message made by binary_encode. Numpy arrays are read-only views
+    of the message rather than copies
+
+    Args:
+        message: The binary message
+
+    Returns:
+        FrozenOrderedDict: The decoded object, like json_decode would produce
+    """
+    try:
+        (length,) = struct.unpack_from("<I", message)
+        start = 4 + length
+        buffers = memoryview(message)[start:]
+
+        def object_pairs_hook(pairs):
+            if len(pairs) == 1 and pairs[0][0] == _NDARRAY_KEY:
+                dtype, offset, shape = pairs[0][1]
+                count = int(np.prod(shape))
+                array = np.frombuffer(buffers, dtype, count, offset)
+                return array.reshape(shape)
+            return FrozenOrderedDict(pairs)
+
+        o = json.loads(bytes(message[4:start]), object_pairs_hook=object_pairs_hook)
+        assert isinstance(o, FrozenOrderedDict), "didn't return FrozenOrderedDict"
+        return o
+    except Exception as e:
+        raise ValueError("Error decoding binary message (%s)" % str(e))
@@ -7,7 +7,7 @@ from mock import ANY, MagicMock
 from malcolm.core import Process
 from malcolm.core.context import Context
 from malcolm.core.errors import AbortedError, BadValueError, ResponseError, TimeoutError
-from malcolm.core.future import Future
+from malcolm.core.future import BatchFuture, Future
 from malcolm.core.request import Post, Put, Subscribe, Unsubscribe
 from malcolm.core.response import Error, Return, Update
 
@@ -67,6 +67,58 @@ class TestContext(unittest.TestCase):
             self.o.post(["block", "method"], dict(b=32))
         assert str(cm.exception) == "Test Exception"
 
+    def test_put_values(self):
+        controller2 = MagicMock(mri="block2")
+        self.process.add_controller(controller2)
+        self.o._q.put(Return(2, None))
+        self.o._q.put(Return(1, 33))
+        self.o._q.put(Return(3, 34))
+        ret = self.o.put_values(dict(block=dict(attr=32, attr2=33), block2=dict(a=34)))
+        self.assert_handle_request_called_with(
+            Put(1, ["block", "attr", "value"], 32),
+            Put(2, ["block", "attr2", "value"], 33),
+        )
+        actual = controller2.handle_request.call_args[0][0]
+        assert actual.to_dict() == Put(3, ["block2", "a", "value"], 34).to_dict()
+        assert ret == {
+            "block.attr.value": 33,
+            "block.attr2.value": None,
+            "block2.a.value": 34,
+        }
+
+    def test_put_values_unknown_mri(self):
+        with self.assertRaises(ValueError):
+            self.o.put_values(dict(block=dict(attr=1), nothing=dict(a=2)))
+        # Nothing was sent, and no futures are left waiting
+        self.controller.handle_request.assert_not_called()
+        assert not self.o._futures
+        assert not self.o._requests
+
+    def test_put_values_failure(self):
+        self.o._q.put(Error(1, ResponseError("Bad attr")))
+        self.o._q.put(Return(2, None))
+        self.o._q.put(Error(3, ResponseError("Bad attr3")))
+        f = self.o.put_values_async(dict(block=dict(attr=1, attr2=2, attr3=3)))
+        assert isinstance(f, BatchFuture)
+        # All the Puts are waited for, then the errors are raised together
+        with self.assertRaises(ResponseError) as cm:
+            self.o.wait_all_futures(f)
+        assert str(cm.exception) == (
+            "2 of 3 requests failed: block.attr.value: ResponseError: Bad attr, "
+            "block.attr3.value: ResponseError: Bad attr3"
+        )
+        assert f.futures["block.attr2.value"].result() is None
+        assert not self.o._futures
+
+    def test_post_methods(self):
+        self.o._q.put(Return(2, dict(c=3)))
+        self.o._q.put(Return(1, dict(a=2)))
+        ret = self.o.post_methods(dict(block=dict(method=dict(b=32), method2={})))
+        self.assert_handle_request_called_with(
+            Post(1, ["block", "method"], dict(b=32)), Post(2, ["block", "method2"], {})
+        )
+        assert ret == {"block.method": dict(a=2), "block.method2": dict(c=3)}
+
     def test_subscribe(self):
         cb = MagicMock()
         f = self.o.subscribe(["block", "attr", "value"], cb, self.o, "arg2")
@@ -146,6 +198,13 @@ class TestContext(unittest.TestCase):
         self.o.wait_all_futures(fs, 0.01)
         assert [f.done() for f in fs] == [True, True]
 
+    def test_many_puts_returned_in_reverse(self):
+        fs = [self.o.put_async(["block", "attr", "value"], i) for i in range(200)]
+        for i in reversed(range(200)):
+            self.o._q.put(Return(i + 1, i))
+        self.o.wait_all_futures(fs, 0.1)
+        assert [f.result() for f in fs] == list(range(200))
+
     def test_sleep(self):
         start = time.time()
         self.o.sleep(0.05)
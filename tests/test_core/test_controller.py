@@ -1,6 +1,7 @@
 import unittest
 
 from annotypes import Anno, add_call_types
+from mock import Mock
 
 from malcolm import __version__
 from malcolm.core import (
@@ -144,3 +145,112 @@ class TestController(unittest.TestCase):
         response = q.get(timeout=0.1)
         self.assertIsInstance(response, Return)
         assert response.id == 44
+
+    def get_block(self, q):
+        request = Get(id=45, path=["mri"])
+        request.set_callback(q.put)
+        self.o.handle_request(request)
+        response = q.get(timeout=0.1)
+        self.assertIsInstance(response, Return)
+        return response.value
+
+    def test_get_reuses_unchanged_frozen_fields(self):
+        q = Queue()
+        first = self.get_block(q)
+        assert first["myAttribute"]["value"] == "hello_block"
+        # Nothing changed, so we get the same frozen object back
+        assert self.get_block(q) is first
+        self.part.my_attribute.set_value("changed")
+        second = self.get_block(q)
+        assert second is not first
+        assert second["myAttribute"]["value"] == "changed"
+        # The fields that didn't change are reused
+        assert second["method"] is first["method"]
+        assert second["meta"] is first["meta"]
+
+    def test_requests_batched_in_order(self):
+        q = Queue()
+        requests = [
+            Get(id=51, path=["mri", "myAttribute", "value"]),
+            Subscribe(id=52, path=["mri", "myAttribute", "value"]),
+            Put(id=53, path=["mri", "myAttribute"], value="put_value"),
+            Get(id=54, path=["mri", "myAttribute", "value"]),
+            Get(id=55, path=["mri", "myAttribute", "value"]),
+        ]
+        spawned = []
+        for request in requests:
+            request.set_callback(q.put)
+            spawned.append(self.o.handle_request(request))
+        # The Gets and Subscribe either side of the Put share a batch
+        assert spawned[0] is spawned[1]
+        assert spawned[2] is not spawned[1]
+        assert spawned[3] is spawned[4]
+        assert spawned[3] is not spawned[0]
+        for s in spawned:
+            s.wait(timeout=1)
+        responses = [q.get(timeout=0.1) for _ in range(6)]
+        assert [(type(r), r.id) for r in responses] == [
+            (Return, 51),
+            (Update, 52),
+            (Update, 52),
+            (Return, 53),
+            (Return, 54),
+            (Return, 55),
+        ]
+        assert responses[0].value == "hello_block"
+        assert responses[4].value == "put_value"
+
+    def test_batch_responses_in_request_order(self):
+        q = Queue()
+        requests = [
+            Subscribe(id=61, path=["mri", "myAttribute", "value"]),
+            Get(id=62, path=["mri", "myAttribute", "value"]),
+            Unsubscribe(id=61),
+            Get(id=63, path=["mri", "myAttribute", "value"]),
+        ]
+        for request in requests:
+            request.set_callback(q.put)
+            spawned = self.o.handle_request(request)
+        spawned.wait(timeout=1)
+        responses = [q.get(timeout=0.1) for _ in range(4)]
+        assert [(type(r), r.id) for r in responses] == [
+            (Update, 61),
+            (Return, 62),
+            (Return, 61),
+            (Return, 63),
+        ]
+
+    def test_batch_callback_exception_raised(self):
+        q = Queue()
+        bad = Get(id=71, path=["mri", "myAttribute", "value"])
+        bad.set_callback(Mock(side_effect=ValueError("Bad callback")))
+        good = Get(id=72, path=["mri", "myAttribute", "value"])
+        good.set_callback(q.put)
+        self.o.handle_request(bad)
+        spawned = self.o.handle_request(good)
+        # The other Requests in the batch still get their responses, but the
+        # exception is raised like it would be for a single Request
+        with self.assertRaises(ValueError):
+            spawned.get(timeout=1)
+        assert q.get(timeout=0.1).id == 72
+
+    def test_get_does_not_take_lock(self):
+        q = Queue()
+        with self.o._lock:
+            request = Get(id=46, path=["mri", "myAttribute", "value"])
+            request.set_callback(q.put)
+            self.o.handle_request(request).wait(timeout=1)
+            self.part.my_attribute.set_value("changed")
+        response = q.get(timeout=0.1)
+        assert response.value == "hello_block"
+        assert self.get_block(q)["myAttribute"]["value"] == "changed"
+
+    def test_change_publishes_snapshot(self):
+        q = Queue()
+        first = self.get_block(q)
+        self.part.my_attribute.set_value("changed")
+        # The writer published the new snapshot, so Gets never need the lock
+        snapshot = self.o._notifier._snapshot
+        assert snapshot["myAttribute"]["value"] == "changed"
+        assert snapshot["method"] is first["method"]
+        assert self.get_block(q) is snapshot
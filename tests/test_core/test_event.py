@@ -0,0 +1,22 @@
+import unittest
+
+import cothread
+
+from malcolm.core import Event
+
+
+class TestEvent(unittest.TestCase):
+    def test_wait_times_out(self):
+        e = Event()
+        assert e.is_set() is False
+        assert e.wait(0.01) is False
+
+    def test_all_waiters_woken(self):
+        e = Event()
+        waiters = [cothread.Spawn(e.wait, 1, raise_on_wait=True) for _ in range(3)]
+        cothread.Yield()
+        e.set()
+        assert [w.Wait(1) for w in waiters] == [True, True, True]
+        # It stays set
+        assert e.is_set() is True
+        assert e.wait(0) is True
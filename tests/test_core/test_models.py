@@ -2,7 +2,7 @@ import unittest
 from collections import OrderedDict
 
 import numpy as np
-from annotypes import Serializable
+from annotypes import Array, Serializable
 from mock import Mock
 
 from malcolm.core import (
@@ -219,6 +219,20 @@ class TestChoiceArrayMeta(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.meta.validate(["a", "x"])
 
+    def test_validate_array_returns_same(self):
+        array = self.meta.validate(["b", "a", "b"])
+        assert self.meta.validate(array) is array
+
+    def test_index_elements_map_to_choices(self):
+        response = self.meta.validate(Array[str](["b", 0, None]))
+        assert response.typ is str
+        assert list(response.seq) == ["b", "a", "a"]
+
+    def test_invalid_choice_reports_element(self):
+        with self.assertRaises(ValueError) as cm:
+            self.meta.validate(["a", "b", "x"])
+        assert str(cm.exception).endswith("for element 2")
+
 
 class TestChoiceMeta(unittest.TestCase):
     def setUp(self):
@@ -434,6 +448,26 @@ class TestNumberArrayMeta(unittest.TestCase):
         for i, value in enumerate(response):
             assert values[i] == value
 
+    def test_numpy_array_not_copied(self):
+        nm = NumberArrayMeta("int32")
+        values = np.array([1, 2, 3], dtype=np.int32)
+        values.flags.writeable = False
+        response = nm.validate(values)
+        assert response.seq is values
+        assert nm.validate(response) is response
+
+    def test_writeable_numpy_array_not_copied(self):
+        nm = NumberArrayMeta("float64")
+        values = np.array([1.0, 2.0])
+        assert nm.validate(values).seq is values
+
+    def test_array_of_wrong_type_raises(self):
+        nm = NumberArrayMeta("float64")
+        with self.assertRaises(AssertionError):
+            nm.validate(Array[np.int32](np.array([1, 2], dtype=np.int32)))
+        with self.assertRaises(AssertionError):
+            nm.validate(np.array([1, 2], dtype=np.int32))
+
     def test_numpy_array_wrong_type_raises(self):
         nm = NumberArrayMeta("float64")
         values = "[1.2, 3.4, 5.6]"
@@ -528,6 +562,11 @@ class TestNumberMeta(unittest.TestCase):
         nm = NumberMeta("int32")
         assert 123 == nm.validate(123)
 
+    def test_numpy_scalar_returned(self):
+        nm = NumberMeta("int32")
+        value = np.int32(5)
+        assert nm.validate(value) is value
+
     def test_float_to_int_truncates(self):
         nm = NumberMeta("int32")
         assert nm.validate(123.6) == 123
@@ -599,6 +638,10 @@ class TestStringArrayMeta(unittest.TestCase):
         with self.assertRaises(AssertionError):
             self.meta.validate(array)
 
+    def test_str_subclass_element_validates(self):
+        array = ["test", np.str_("test2")]
+        assert self.meta.validate(array) == array
+
 
 class TestStringMeta(unittest.TestCase):
     def setUp(self):
@@ -694,6 +737,16 @@ class TestTableMeta(unittest.TestCase):
         assert list(t) == ["c1"]
         assert t.c1 == serialized["c1"]
 
+    def test_validate_valid_table_returns_same(self):
+        tm = self.tm
+        t = tm.validate(dict(c1=["me", "me3"]))
+        assert tm.validate(t) is t
+        # A table with unvalidated columns is remade
+        t2 = tm.table_cls(c1=["me", "me3"])
+        t3 = tm.validate(t2)
+        assert t3 is not t2
+        assert t3 == t
+
 
 class TestVMeta(unittest.TestCase):
     def test_values_after_init(self):
@@ -6,7 +6,8 @@ from mock import Mock
 
 # module imports
 from malcolm.compat import OrderedDict
-from malcolm.core.notifier import Notifier
+from malcolm.core.concurrency import sleep
+from malcolm.core.notifier import Notifier, squash_changes
 from malcolm.core.request import Return, Subscribe, Unsubscribe
 from malcolm.core.response import Delta, Update
 
@@ -160,3 +161,115 @@ class TestNotifier(unittest.TestCase):
         expected["attr"]["value"] = 33
         expected["attr2"]["value"] = "tr"
         self.assert_called_with(r2.callback, Update(value=expected))
+
+    def test_delta_squashing(self):
+        # set some data
+        self.block["attr"] = Dummy()
+        self.block.attr["value"] = 32
+        r1 = Subscribe(path=["b"], delta=True)
+        r1.set_callback(Mock())
+        self.handle_subscribe(r1)
+        r1.callback.reset_mock()
+        # write the same path repeatedly, then overwrite a child with its parent
+        with self.o.changes_squashed:
+            for i in range(5):
+                self.block.attr["value"] = i
+                self.o.add_squashed_change(["b", "attr", "value"], i)
+            self.block["attr2"] = Dummy()
+            self.block.attr2["value"] = "st"
+            self.o.add_squashed_change(["b", "attr2", "value"], "st")
+            self.o.add_squashed_change(["b", "attr2"], self.block.attr2)
+        self.assert_called_with(
+            r1.callback,
+            Delta(changes=[[["attr", "value"], 4], [["attr2"], dict(value="st")]]),
+        )
+        r1.callback.reset_mock()
+        # a delete supersedes earlier changes below it
+        with self.o.changes_squashed:
+            self.o.add_squashed_change(["b", "attr", "value"], 5)
+            self.block.data.pop("attr")
+            self.o.add_squashed_delete(["b", "attr"])
+        self.assert_called_with(r1.callback, Delta(changes=[[["attr"]]]))
+
+    def test_throttled_update(self):
+        self.block["attr"] = Dummy()
+        self.block.attr["value"] = 0
+        r1 = Subscribe(path=["b", "attr", "value"], period=0.2)
+        r1.set_callback(Mock())
+        self.handle_subscribe(r1)
+        self.assert_called_with(r1.callback, Update(value=0))
+        r1.callback.reset_mock()
+        # changes inside the period are held back
+        for i in range(1, 6):
+            with self.o.changes_squashed:
+                self.block.attr["value"] = i
+                self.o.add_squashed_change(["b", "attr", "value"], i)
+        r1.callback.assert_not_called()
+        # and only the latest is sent when it expires
+        sleep(0.3)
+        self.assert_called_with(r1.callback, Update(value=5))
+        r1.callback.reset_mock()
+        # outside the period, changes are sent straight away
+        sleep(0.2)
+        with self.o.changes_squashed:
+            self.block.attr["value"] = 6
+            self.o.add_squashed_change(["b", "attr", "value"], 6)
+        self.assert_called_with(r1.callback, Update(value=6))
+
+    def test_throttled_delta(self):
+        self.block["attr"] = Dummy()
+        self.block.attr["value"] = 0
+        self.block.attr["alarm"] = "ok"
+        r1 = Subscribe(path=["b"], delta=True, period=0.2)
+        r1.set_callback(Mock())
+        self.handle_subscribe(r1)
+        r1.callback.reset_mock()
+        for i in range(1, 4):
+            with self.o.changes_squashed:
+                self.block.attr["value"] = i
+                self.o.add_squashed_change(["b", "attr", "value"], i)
+        with self.o.changes_squashed:
+            self.block.attr["alarm"] = "bad"
+            self.o.add_squashed_change(["b", "attr", "alarm"], "bad")
+        r1.callback.assert_not_called()
+        sleep(0.3)
+        self.assert_called_with(
+            r1.callback,
+            Delta(changes=[[["attr", "value"], 3], [["attr", "alarm"], "bad"]]),
+        )
+        r1.callback.reset_mock()
+        # unsubscribing drops anything pending
+        with self.o.changes_squashed:
+            self.block.attr["value"] = 4
+            self.o.add_squashed_change(["b", "attr", "value"], 4)
+        r1.callback.assert_not_called()
+        unsub = Unsubscribe()
+        unsub.set_callback(r1.callback)
+        self.handle_unsubscribe(unsub)
+        self.assert_called_with(r1.callback, Return(value=None))
+        r1.callback.reset_mock()
+        sleep(0.3)
+        r1.callback.assert_not_called()
+
+
+class TestSquashChanges(unittest.TestCase):
+    def test_keeps_order_of_latest_changes(self):
+        changes = [
+            [["a", "value"], 1],
+            [["b", "value"], 2],
+            [["a", "value"], 3],
+            [["a", "alarm"], 4],
+        ]
+        assert squash_changes(changes) == [
+            [["b", "value"], 2],
+            [["a", "value"], 3],
+            [["a", "alarm"], 4],
+        ]
+
+    def test_parent_supersedes_children(self):
+        changes = [[["a", "value"], 1], [["a"], 2], [["a", "alarm"], 3], [[], 4]]
+        assert squash_changes(changes) == [[[], 4]]
+
+    def test_child_after_parent_is_kept(self):
+        changes = [[["a"], 2], [["a", "value"], 3]]
+        assert squash_changes(changes) == changes
@@ -142,6 +142,12 @@ class TestSubscribe(unittest.TestCase):
     def test_doc(self):
         assert get_doc_json("subscribe_xspress3") == self.o.to_dict()
 
+    def test_period(self):
+        self.o.period = 0.5
+        d = self.o.to_dict()
+        assert d["period"] == 0.5
+        assert Subscribe.from_dict(d).period == 0.5
+
 
 class TestUnsubscribe(unittest.TestCase):
     def setUp(self):
@@ -0,0 +1,88 @@
+import json
+import unittest
+
+import numpy as np
+from annotypes import json_encode as annotypes_json_encode
+
+from malcolm.core import (
+    Alarm,
+    AlarmSeverity,
+    BlockModel,
+    ChoiceArrayMeta,
+    Delta,
+    Error,
+    NumberArrayMeta,
+    Process,
+    StringMeta,
+    Subscribe,
+    TableMeta,
+    TimeStamp,
+    Update,
+    json_encode,
+    serialize_fields,
+)
+from malcolm.core.notifier import freeze
+from malcolm.modules.builtin.controllers import BasicController
+from malcolm.modules.demo.parts import HelloPart
+
+
+class TestSerializers(unittest.TestCase):
+    def setUp(self):
+        self.process = Process("proc")
+        controller = BasicController("mri")
+        controller.add_part(HelloPart("hello"))
+        self.process.add_controller(controller)
+        self.process.start()
+
+    def tearDown(self):
+        self.process.stop(timeout=1)
+
+    def assert_same_json(self, o):
+        assert json.loads(json_encode(o)) == json.loads(annotypes_json_encode(o))
+
+    def test_serialize_fields(self):
+        alarm = Alarm(AlarmSeverity.MINOR_ALARM, message="bad")
+        expected = [
+            ("typeid", "alarm_t"),
+            ("severity", AlarmSeverity.MINOR_ALARM),
+            ("status", alarm.status),
+            ("message", "bad"),
+        ]
+        assert serialize_fields(alarm) == expected
+        # Second time round uses the cached getter
+        assert serialize_fields(alarm) == expected
+
+    def test_serialize_fields_block_model(self):
+        model = BlockModel()
+        model.set_endpoint_data("attr", StringMeta().create_attribute_model())
+        assert [k for k, _ in serialize_fields(model)] == [
+            "typeid",
+            "meta",
+            "attr",
+        ]
+        model.set_endpoint_data("attr2", StringMeta().create_attribute_model())
+        assert [k for k, _ in serialize_fields(model)][-1] == "attr2"
+
+    def test_json_encode_matches_annotypes(self):
+        frozen = freeze(self.process.get_controller("mri")._block)
+        self.assert_same_json(frozen)
+        self.assert_same_json(Update(1, frozen))
+        self.assert_same_json(Delta(2, [[["health"], frozen["health"]], [["meta"]]]))
+        self.assert_same_json(Error(3, ValueError("bad")))
+        self.assert_same_json(Subscribe(4, ["mri", "health"]))
+        self.assert_same_json(Subscribe(5, ["mri", "health"], period=0.5))
+        self.assert_same_json([Alarm.ok, TimeStamp(), np.arange(3)])
+
+    def test_json_encode_table_and_enums(self):
+        meta = TableMeta(
+            elements=dict(
+                a=NumberArrayMeta("int32"), b=ChoiceArrayMeta(choices=["x", "y"])
+            )
+        )
+        table = meta.validate(dict(a=[1, 2], b=["y", "x"]))
+        self.assert_same_json(table)
+        self.assert_same_json(AlarmSeverity.MAJOR_ALARM)
+
+    def test_json_encode_unknown_raises(self):
+        with self.assertRaises(TypeError):
+            json_encode(object())
@@ -1,7 +1,7 @@
 import unittest
 
-from malcolm.core import Queue, Spawned
-from malcolm.core.errors import UnexpectedError
+from malcolm.core import Queue, Spawned, sleep
+from malcolm.core.errors import TimeoutError, UnexpectedError
 
 
 def do_div(a, b, q, throw_me=None):
@@ -36,3 +36,23 @@ class TestSpawned(unittest.TestCase):
         assert self.q.get(1) == UnexpectedError
         with self.assertRaises(UnexpectedError):
             s.get()
+
+    def test_multiple_waiters(self):
+        gate = Queue()
+        s = Spawned(gate.get, (1,), {})
+        waiters = [Spawned(s.get, (1,), {}) for _ in range(3)]
+        # Let the waiters start waiting before the result is ready
+        sleep(0.1)
+        gate.put(20)
+        for w in waiters:
+            assert w.get(1) == 20
+
+    def test_waiter_timeout_does_not_take_result(self):
+        gate = Queue()
+        s = Spawned(gate.get, (1,), {})
+        with self.assertRaises(TimeoutError):
+            s.wait(timeout=0.01)
+        gate.put(30)
+        # Both of these see the result, however many waits have happened
+        assert s.get(1) == 30
+        assert s.get(1) == 30
@@ -11,6 +11,8 @@ with Anno("Row A"):
     AA = Union[Array[str]]
 with Anno("Row B"):
     AB = Union[Array[int]]
+with Anno("Row C"):
+    AC = Union[Array[numpy.int32]]
 
 
 class MyTable(Table):
@@ -19,6 +21,12 @@ class MyTable(Table):
         self.b = b
 
 
+class MyNumpyTable(Table):
+    def __init__(self, a: AA, c: AC) -> None:
+        self.a = AA(a)
+        self.c = AC(c)
+
+
 class TestTable(unittest.TestCase):
     def setUp(self):
         self.t = MyTable(AA(["x", "y", "z"]), AB([1, 2, 3]))
@@ -51,3 +59,29 @@ class TestTable(unittest.TestCase):
     def test_not_equal(self):
         t2 = MyTable(AA(["x", "y", "z"]), AB(numpy.arange(3)))
         assert self.t != t2
+
+    def test_not_equal_length(self):
+        t2 = MyTable(AA(["x", "y"]), AB([1, 2]))
+        assert self.t != t2
+
+    def test_slice(self):
+        t = MyNumpyTable(["x", "y", "z"], numpy.arange(3, dtype=numpy.int32))
+        t2 = t[1:]
+        assert list(t2.rows()) == [["y", 1], ["z", 2]]
+        # Numpy columns are views rather than copies
+        assert t2.c.seq.base is t.c.seq
+
+    def test_from_rows_numpy(self):
+        t = MyNumpyTable.from_rows([["x", 1], ["y", 2]])
+        assert t.a.seq == ["x", "y"]
+        assert t.c.seq.dtype == numpy.int32
+        assert list(t.c) == [1, 2]
+
+    def test_structured_array(self):
+        t = MyNumpyTable(["x", "y", "z"], numpy.arange(3, dtype=numpy.int32))
+        data = t.to_structured_array()
+        assert data.dtype == MyNumpyTable.structured_dtype()
+        t2 = MyNumpyTable.from_structured_array(data)
+        assert t2 == t
+        # Numpy columns are views of the structured array
+        assert t2.c.seq.base is data
@@ -1,7 +1,8 @@
 import unittest
 
+import cothread
 import numpy as np
-from mock import ANY, patch
+from mock import ANY, call, patch
 
 from malcolm.core import AlarmSeverity, Process, Table, Widget
 from malcolm.modules.builtin.controllers import StatefulController
@@ -30,19 +31,19 @@ class TestCAParts(unittest.TestCase):
             ok = True
             severity = 0
 
-        catools.caget.side_effect = [[Initial(0), Initial(0)]]
+        catools.caget.side_effect = [[Initial(0)], [Initial(0)]]
         b = self.create_block(
             CABooleanPart(name="attrname", description="desc", pv="pv", rbv_suffix="2")
         )
         assert b.attrname.value is False
         assert b.attrname.meta.description == "desc"
         assert b.attrname.meta.writeable
-        catools.caget.assert_called_once_with(
-            ["pv2", "pv"],
-            datatype=catools.DBR_LONG,
-            format=catools.FORMAT_CTRL,
-            throw=True,
-        )
+        assert catools.caget.call_args_list == [
+            call(
+                [pv], datatype=catools.DBR_LONG, format=catools.FORMAT_CTRL, throw=False
+            )
+            for pv in ("pv2", "pv")
+        ]
         catools.caget.reset_mock()
 
         class Update(int):
@@ -79,7 +80,7 @@ class TestCAParts(unittest.TestCase):
             ["pvr"],
             datatype=catools.DBR_CHAR_STR,
             format=catools.FORMAT_CTRL,
-            throw=True,
+            throw=False,
         )
 
     def test_cachoice(self, catools):
@@ -90,19 +91,19 @@ class TestCAParts(unittest.TestCase):
             severity = 0
             enums = ["a", "b", "c"]
 
-        catools.caget.side_effect = [[Initial(1), Initial(2)]]
+        catools.caget.side_effect = [[Initial(1)], [Initial(2)]]
         b = self.create_block(
             CAChoicePart(name="attrname", description="desc", pv="pv", rbv="rbv")
         )
         assert b.attrname.value == "b"
         assert b.attrname.meta.description == "desc"
         assert b.attrname.meta.writeable
-        catools.caget.assert_called_once_with(
-            ["rbv", "pv"],
-            datatype=catools.DBR_ENUM,
-            format=catools.FORMAT_CTRL,
-            throw=True,
-        )
+        assert catools.caget.call_args_list == [
+            call(
+                [pv], datatype=catools.DBR_ENUM, format=catools.FORMAT_CTRL, throw=False
+            )
+            for pv in ("rbv", "pv")
+        ]
         catools.caget.reset_mock()
 
         class Update(int):
@@ -157,7 +158,7 @@ class TestCAParts(unittest.TestCase):
         assert b.attrname.meta.display.limitHigh == 10.0
         assert b.attrname.meta.display.precision == 5
         catools.caget.assert_called_once_with(
-            ["pv"], datatype=catools.DBR_DOUBLE, format=catools.FORMAT_CTRL, throw=True
+            ["pv"], datatype=catools.DBR_DOUBLE, format=catools.FORMAT_CTRL, throw=False
         )
         catools.caget.reset_mock()
 
@@ -229,12 +230,15 @@ class TestCAParts(unittest.TestCase):
         assert c.attrname.meta.elements["xData"].display.limitHigh == np.pi
         assert c.attrname.meta.elements["xData"].display.units == "s"
 
-        catools.caget.assert_called_with(
-            ("yPv", "xPv"),
-            datatype=catools.DBR_DOUBLE,
-            format=catools.FORMAT_CTRL,
-            throw=True,
-        )
+        assert catools.caget.call_args_list == [
+            call(
+                [pv],
+                datatype=catools.DBR_DOUBLE,
+                format=catools.FORMAT_CTRL,
+                throw=False,
+            )
+            for pv in ("yPv", "xPv")
+        ]
 
         catools.caget.reset_mock()
 
@@ -266,7 +270,7 @@ class TestCAParts(unittest.TestCase):
         assert b.attrname.meta.display.units == ""
 
         catools.caget.assert_called_once_with(
-            ["pv"], datatype=catools.DBR_DOUBLE, format=catools.FORMAT_CTRL, throw=True
+            ["pv"], datatype=catools.DBR_DOUBLE, format=catools.FORMAT_CTRL, throw=False
         )
 
         li = []
@@ -278,11 +282,13 @@ class TestCAParts(unittest.TestCase):
         callback = catools.camonitor.call_args[0][1]
         callback(Initial(8.7))
         callback(Initial(8.8))
-        assert b.attrname.value == 8.8
+        # The second update is within min_delta, so is held until it expires
+        assert b.attrname.value == 8.7
 
         # TODO: why does this seg fault on travis VMs when cothread is
         # stack sharing?
         b._context.sleep(0.1)
+        assert b.attrname.value == 8.8
         assert li == [5.2, 8.7, 8.8]
 
         c = self.create_block(
@@ -315,7 +321,7 @@ class TestCAParts(unittest.TestCase):
         assert b.attrname.meta.tags == ["widget:textinput", "config:1"]
         assert b.attrname.meta.writeable
         catools.caget.assert_called_once_with(
-            ["pv"], datatype=catools.DBR_LONG, format=catools.FORMAT_CTRL, throw=True
+            ["pv"], datatype=catools.DBR_LONG, format=catools.FORMAT_CTRL, throw=False
         )
         catools.caget.reset_mock()
 
@@ -351,7 +357,7 @@ class TestCAParts(unittest.TestCase):
         assert b.attrname.meta.description == "desc"
         assert b.attrname.meta.writeable
         catools.caget.assert_called_once_with(
-            ["pv"], datatype=catools.DBR_LONG, format=catools.FORMAT_CTRL, throw=True
+            ["pv"], datatype=catools.DBR_LONG, format=catools.FORMAT_CTRL, throw=False
         )
 
     def test_castring(self, catools):
@@ -369,7 +375,7 @@ class TestCAParts(unittest.TestCase):
         assert b.attrname.meta.description == "desc"
         assert not b.attrname.meta.writeable
         catools.caget.assert_called_once_with(
-            ["pv"], datatype=catools.DBR_STRING, format=catools.FORMAT_CTRL, throw=True
+            ["pv"], datatype=catools.DBR_STRING, format=catools.FORMAT_CTRL, throw=False
         )
 
     def test_init_no_pv_no_rbv(self, catools):
@@ -378,3 +384,45 @@ class TestCAParts(unittest.TestCase):
         # create test for no pv or rbv
         with self.assertRaises(ValueError):
             CABooleanPart(name="attrname", description="desc")
+
+
+@patch("malcolm.modules.ca.util.catools")
+class TestCAPartsBatched(unittest.TestCase):
+    def test_controllers_share_caget(self, catools):
+        from malcolm.modules.ca.parts import CALongPart
+
+        class Initial(int):
+            ok = True
+            severity = 0
+
+        def caget(pvs, **kwargs):
+            # Like connecting to a real PV
+            cothread.Sleep(0.2)
+            return [Initial(1) for _ in pvs]
+
+        catools.caget.side_effect = caget
+
+        class SlowController(StatefulController):
+            def do_init(self):
+                # Like a Controller with more to do before its InitHooks
+                cothread.Sleep(0.01)
+                super().do_init()
+
+        process = Process("proc")
+        for i, cls in ((1, StatefulController), (2, SlowController)):
+            c = cls("mri%d" % i)
+            c.add_part(CALongPart(name="attrname", description="desc", pv="pv"))
+            process.add_controller(c)
+        process.start()
+        try:
+            assert process.block_view("mri1").attrname.value == 1
+            assert process.block_view("mri2").attrname.value == 1
+            # The PV is only got once
+            catools.caget.assert_called_once_with(
+                ["pv"],
+                datatype=catools.DBR_LONG,
+                format=catools.FORMAT_CTRL,
+                throw=False,
+            )
+        finally:
+            process.stop(timeout=2)
@@ -0,0 +1,130 @@
+import unittest
+
+import cothread
+from mock import MagicMock, call, patch
+
+from malcolm.core import NumberMeta
+from malcolm.modules.ca.util import CAAttribute, CAGetBatcher
+
+
+class Update(float):
+    ok = True
+    severity = 0
+    raw_stamp = (1, 2)
+
+
+class Nothing(Exception):
+    ok = False
+
+
+@patch("malcolm.modules.ca.util.catools")
+class TestCAGetBatcher(unittest.TestCase):
+    def setUp(self):
+        self.o = CAGetBatcher()
+
+    def spawn_cagets(self, *args):
+        return [cothread.Spawn(self.o.caget, *a, raise_on_wait=True) for a in args]
+
+    def test_concurrent_cagets_merged(self, catools):
+        catools.caget.side_effect = lambda pvs, **kwargs: [Update(pv[-1]) for pv in pvs]
+        s1, s2 = self.spawn_cagets(
+            (["pv1", "pv2"], "ctrl", "double"), (["pv2", "pv3"], "ctrl", "double")
+        )
+        assert s1.Wait(1) == [1, 2]
+        assert s2.Wait(1) == [2, 3]
+        # pv2 is only got once
+        assert catools.caget.call_args_list == [
+            call([pv], format="ctrl", datatype="double", throw=False)
+            for pv in ("pv1", "pv2", "pv3")
+        ]
+
+    def test_different_datatypes_not_merged(self, catools):
+        catools.caget.side_effect = lambda pvs, **kwargs: [Update(pv[-1]) for pv in pvs]
+        s1, s2 = self.spawn_cagets((["pv1"], "ctrl", "long"), (["pv1"], "ctrl", None))
+        assert s1.Wait(1) == [1]
+        assert s2.Wait(1) == [1]
+        assert catools.caget.call_args_list == [
+            call(["pv1"], format="ctrl", datatype="long", throw=False),
+            call(["pv1"], format="ctrl", datatype=None, throw=False),
+        ]
+
+    def test_failure_only_raised_for_throw(self, catools):
+        values = dict(pv1=Update(1), pv2=Nothing("pv2 timed out"))
+        catools.caget.side_effect = lambda pvs, **kwargs: [values[pv] for pv in pvs]
+        s1, s2 = self.spawn_cagets(
+            (["pv1"], "ctrl", None, False), (["pv2"], "ctrl", None, True)
+        )
+        assert s1.Wait(1) == [1]
+        with self.assertRaises(Nothing):
+            s2.Wait(1)
+
+    def test_missing_pv_only_holds_up_its_caget(self, catools):
+        def caget(pvs, **kwargs):
+            if pvs == ["missing"]:
+                # Like a caget timing out
+                cothread.Sleep(1)
+                return [Nothing("missing timed out")]
+            return [Update(1)]
+
+        catools.caget.side_effect = caget
+        s1, s2 = self.spawn_cagets((["pv1"], "ctrl", None), (["missing"], "ctrl", None))
+        assert s1.Wait(0.5) == [1]
+        with self.assertRaises(Nothing):
+            s2.Wait(2)
+
+    @patch("malcolm.modules.ca.util.CAGET_BATCH_PERIOD", 1.0)
+    def test_window_only_when_in_flight(self, catools):
+        def caget(pvs, **kwargs):
+            if pvs == ["slow"]:
+                cothread.Sleep(0.5)
+            return [Update(1)]
+
+        catools.caget.side_effect = caget
+        # Nothing in flight, so sent straight away
+        (s1,) = self.spawn_cagets((["slow"], "ctrl", None))
+        cothread.Sleep(0.1)
+        assert catools.caget.call_count == 1
+        # slow is in flight, so this waits for others to join
+        (s2,) = self.spawn_cagets((["pv1"], "ctrl", None))
+        cothread.Sleep(0.1)
+        assert catools.caget.call_count == 1
+        assert s1.Wait(1) == [1]
+        assert s2.Wait(2) == [1]
+        assert catools.caget.call_count == 2
+
+
+class TestCABaseMonitor(unittest.TestCase):
+    def setUp(self):
+        self.callback = MagicMock()
+        self.o = CAAttribute(
+            NumberMeta("float64"),
+            None,
+            rbv="pv",
+            min_delta=0.1,
+            callback=self.callback,
+        )
+
+    def test_first_update_applied_immediately(self):
+        self.o._monitor_callback(Update(1))
+        assert self.o.attr.value == 1
+        assert self.o._timer is None
+
+    def test_updates_in_window_coalesced(self):
+        self.o._monitor_callback(Update(1))
+        # These arrive within min_delta, so are held without blocking
+        self.o._monitor_callback(Update(2))
+        self.o._monitor_callback(Update(3))
+        assert self.o.attr.value == 1
+        assert self.o._timer is not None
+        cothread.Sleep(0.15)
+        # Only the newest is applied
+        assert self.o.attr.value == 3
+        assert [c[0][0] for c in self.callback.call_args_list] == [1, 3]
+        assert self.o._timer is None
+
+    def test_disconnect_drops_pending(self):
+        self.o._monitor_callback(Update(1))
+        self.o._monitor_callback(Update(2))
+        self.o.disconnect()
+        cothread.Sleep(0.15)
+        assert self.o.attr.value == 1
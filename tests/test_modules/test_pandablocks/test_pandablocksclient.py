@@ -1,12 +1,17 @@
+import threading
 import unittest
 from collections import OrderedDict
 
+import numpy as np
 from mock import Mock, call
 
+from malcolm.core import Event, Queue, Spawned
 from malcolm.modules.pandablocks.pandablocksclient import (
     BlockData,
     FieldData,
     PandABlocksClient,
+    ResponseBatch,
+    decode_table,
 )
 
 
@@ -51,6 +56,51 @@ class PandABoxControlTest(unittest.TestCase):
             self.c.send_recv("")
         assert self.c.send_recv("") == "OK =232"
 
+    def test_send_batch(self):
+        messages = ["OK =1\nERR No such field\n!a\n!b\n.\n"]
+        self.start(messages)
+        responses = self.c.send_batch(["A?\n", "B?\n", "C?\n"])
+        assert self.c.recv(responses[2]) == ["a", "b"]
+        assert self.c.recv(responses[0]) == "OK =1"
+        with self.assertRaises(ValueError):
+            self.c.recv(responses[1])
+        self.c.stop()
+        self.socket.sendall.assert_called_once_with(b"A?\nB?\nC?\n")
+
+    def test_wait_timeout(self):
+        for event_cls in (threading.Event, Event):
+            response_batch = ResponseBatch(2, event_cls())
+            response_batch.add_response("OK")
+            with self.assertRaises(TimeoutError):
+                response_batch.wait(0.01)
+            assert response_batch.add_response("OK") is True
+            # Any number of waiters see it is done
+            response_batch.wait(0)
+            response_batch.wait(0)
+
+    def test_send_batch_cothread(self):
+        self.c = PandABlocksClient("h", "p", Queue, Event)
+        self.socket = Mock()
+        self.socket.recv.side_effect = [b"OK =1\nERR No such field\n"]
+
+        def spawn(function, *args, **kwargs):
+            return Spawned(function, args, kwargs)
+
+        self.c.start(spawn=spawn, socket_cls=lambda: self.socket)
+        responses = self.c.send_batch(["A?\n", "B?\n"])
+        assert self.c.recv(responses[0]) == "OK =1"
+        with self.assertRaises(ValueError):
+            self.c.recv(responses[1])
+        self.c.stop()
+
+    def test_send_empty_batch(self):
+        messages = ["OK =1\n"]
+        self.start(messages)
+        assert self.c.send_batch([]) == []
+        assert self.c.send_recv("A?\n") == "OK =1"
+        self.c.stop()
+        self.socket.sendall.assert_called_once_with(b"A?\n")
+
     def test_block_data(self):
         messages = [
             "!TTLIN 6\n!TTLOUT 10\n.\n",
@@ -70,16 +120,16 @@ class PandABoxControlTest(unittest.TestCase):
         self.c.stop()
         assert self.socket.sendall.call_args_list == [
             call(b"*BLOCKS?\n"),
-            call(b"*DESC.TTLIN?\n"),
-            call(b"*DESC.TTLOUT?\n"),
-            call(b"TTLIN.*?\n"),
-            call(b"TTLOUT.*?\n"),
-            call(b"*DESC.TTLIN.TERM?\n"),
-            call(b"*DESC.TTLIN.VAL?\n"),
-            call(b"*ENUMS.TTLIN.TERM?\n"),
-            call(b"*ENUMS.TTLIN.VAL.CAPTURE?\n"),
-            call(b"*DESC.TTLOUT.VAL?\n"),
-            call(b"*ENUMS.TTLOUT.VAL?\n"),
+            call(b"*DESC.TTLIN?\n*DESC.TTLOUT?\n"),
+            call(b"TTLIN.*?\nTTLOUT.*?\n"),
+            call(
+                b"*DESC.TTLIN.TERM?\n"
+                b"*DESC.TTLIN.VAL?\n"
+                b"*ENUMS.TTLIN.TERM?\n"
+                b"*ENUMS.TTLIN.VAL.CAPTURE?\n"
+                b"*DESC.TTLOUT.VAL?\n"
+                b"*ENUMS.TTLOUT.VAL?\n"
+            ),
         ]
         assert list(block_data) == ["TTLIN", "TTLOUT"]
         in_fields = OrderedDict()
@@ -109,9 +159,7 @@ class PandABoxControlTest(unittest.TestCase):
 !PULSE3.INP (error)
 .
 """,
-            """!1
-!2
-!3
+            """!AQAAAAIAAAADAAAA
 .
 """,
         ]
@@ -120,14 +168,19 @@ class PandABoxControlTest(unittest.TestCase):
         self.c.stop()
         assert self.socket.sendall.call_args_list == [
             call(b"*CHANGES?\n"),
-            call(b"SEQ1.TABLE?\n"),
+            call(b"SEQ1.TABLE.B?\n"),
         ]
         expected = OrderedDict()
         expected["PULSE0.WIDTH"] = "1.43166e+09"
         expected["PULSE1.WIDTH"] = "1.43166e+09"
         expected["PULSE2.WIDTH"] = "1.43166e+09"
         expected["PULSE3.WIDTH"] = "1.43166e+09"
-        expected["SEQ1.TABLE"] = ["1", "2", "3"]
+        # The table value comes last, once it has been read
+        field, table = changes.pop()
+        assert field == "SEQ1.TABLE"
+        assert table.dtype == np.uint32
+        assert table.tolist() == [1, 2, 3]
+        expected["SEQ1.TABLE"] = None
         expected["PULSE0.INP"] = Exception
         expected["PULSE1.INP"] = Exception
         expected["PULSE2.INP"] = Exception
@@ -152,9 +205,20 @@ class PandABoxControlTest(unittest.TestCase):
         self.c.stop()
         assert self.socket.sendall.call_args_list == [
             call(b"PCAP.*?\n"),
-            call(b"PCAP.BITS0.BITS?\n"),
-            call(b"PCAP.BITS1.BITS?\n"),
+            call(b"PCAP.BITS0.BITS?\nPCAP.BITS1.BITS?\n"),
+        ]
+
+    def test_get_capture_fields(self):
+        messages = "!COUNTER1.OUT Min Max\n!INENC1.VAL Value\n!PCAP.BITS0.Value\n.\n"
+        self.start(messages)
+        assert self.c.get_capture_fields() == [
+            ("COUNTER1.OUT", "Min"),
+            ("COUNTER1.OUT", "Max"),
+            ("INENC1.VAL", "Value"),
+            ("PCAP.BITS0", "Value"),
         ]
+        self.c.stop()
+        self.socket.sendall.assert_called_once_with(b"*CAPTURE?\n")
 
     def test_get_field(self):
         messages = "OK =32\n"
@@ -175,10 +239,7 @@ class PandABoxControlTest(unittest.TestCase):
         self.start(messages)
         self.c.set_fields({"PULSE0.WIDTH": 0, "PULSE0.DELAY": 5})
         self.c.stop()
-        assert sorted(self.socket.sendall.call_args_list) == [
-            call(b"PULSE0.DELAY=5\n"),
-            call(b"PULSE0.WIDTH=0\n"),
-        ]
+        self.socket.sendall.assert_called_once_with(b"PULSE0.WIDTH=0\nPULSE0.DELAY=5\n")
 
     def test_set_table(self):
         messages = "OK\n"
@@ -186,14 +247,26 @@ class PandABoxControlTest(unittest.TestCase):
         self.c.set_table("SEQ1", "TABLE", [1, 2, 3])
         self.c.stop()
         self.socket.sendall.assert_called_once_with(
-            b"""SEQ1.TABLE<
-1
-2
-3
+            b"""SEQ1.TABLE<B
+AQAAAAIAAAADAAAA
 
 """
         )
 
+    def test_set_table_long(self):
+        messages = "OK\n"
+        self.start(messages)
+        int_values = np.arange(400, dtype=np.uint32)
+        self.c.set_table("SEQ1", "TABLE", int_values)
+        self.c.stop()
+        lines = self.socket.sendall.call_args[0][0].decode().split("\n")
+        assert lines[0] == "SEQ1.TABLE<B"
+        assert lines[-2:] == ["", ""]
+        # Split into lines of 192 words
+        assert len(lines) == 6
+        assert [len(line) for line in lines[1:4]] == [1024, 1024, 88]
+        assert (decode_table(lines[1:4]) == int_values).all()
+
     def test_table_fields(self):
         messages = [
             """!31:0    REPEATS
@@ -217,11 +290,13 @@ class PandABoxControlTest(unittest.TestCase):
         self.c.stop()
         assert self.socket.sendall.call_args_list == [
             call(b"SEQ1.TABLE.FIELDS?\n"),
-            call(b"*ENUMS.SEQ1.TABLE[].INPB?\n"),
-            call(b"*DESC.SEQ1.TABLE[].REPEATS?\n"),
-            call(b"*DESC.SEQ1.TABLE[].USE_INPA?\n"),
-            call(b"*DESC.SEQ1.TABLE[].STUFF?\n"),
-            call(b"*DESC.SEQ1.TABLE[].INPB?\n"),
+            call(
+                b"*ENUMS.SEQ1.TABLE[].INPB?\n"
+                b"*DESC.SEQ1.TABLE[].REPEATS?\n"
+                b"*DESC.SEQ1.TABLE[].USE_INPA?\n"
+                b"*DESC.SEQ1.TABLE[].STUFF?\n"
+                b"*DESC.SEQ1.TABLE[].INPB?\n"
+            ),
         ]
         expected = OrderedDict()
         expected["REPEATS"] = (31, 0, "Repeats", None, False)
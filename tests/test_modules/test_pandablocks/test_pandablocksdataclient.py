@@ -0,0 +1,108 @@
+import struct
+import unittest
+
+import numpy as np
+from mock import Mock, call
+
+from malcolm.modules.pandablocks.pandablocksdataclient import (
+    CaptureEnd,
+    CaptureField,
+    CaptureParser,
+    CaptureStart,
+    PandABlocksDataClient,
+)
+
+HEADER = b"""<header>
+<data arm_time="2020-01-01T00:00:00Z" missed="0" process="Scaled" format="Framed" sample_bytes="12" />
+<fields>
+<field name="PCAP.BITS0" type="uint32" capture="Value" />
+<field name="COUNTER1.OUT" type="double" capture="Min" scale="0.5" offset="1" units="mm" />
+</fields>
+</header>
+
+"""  # noqa: E501
+
+SAMPLE_DTYPE = np.dtype([("PCAP.BITS0.Value", "<u4"), ("COUNTER1.OUT.Min", "<f8")])
+
+
+def make_frame(data):
+    return b"BIN " + struct.pack("<I", len(data) + 8) + data
+
+
+def make_stream(samples, frame_bytes):
+    data = samples.tobytes()
+    frames = [
+        make_frame(data[i : i + frame_bytes]) for i in range(0, len(data), frame_bytes)
+    ]
+    return b"OK\n" + HEADER + b"".join(frames) + b"END %d Ok\n" % len(samples)
+
+
+class TestCaptureParser(unittest.TestCase):
+    def setUp(self):
+        self.samples = np.zeros(5, SAMPLE_DTYPE)
+        self.samples["PCAP.BITS0.Value"] = np.arange(5)
+        self.samples["COUNTER1.OUT.Min"] = np.arange(5) * 0.5 + 1
+
+    def assert_events(self, events):
+        start = events[0]
+        assert isinstance(start, CaptureStart)
+        assert start.fields == [
+            CaptureField("PCAP.BITS0", np.dtype("uint32"), "Value", 1.0, 0.0, ""),
+            CaptureField("COUNTER1.OUT", np.dtype("double"), "Min", 0.5, 1.0, "mm"),
+        ]
+        assert start.missed == 0
+        assert start.process == "Scaled"
+        assert start.format == "Framed"
+        assert start.dtype.names == SAMPLE_DTYPE.names
+        assert events[-1] == CaptureEnd(5, "Ok")
+        data = np.concatenate(events[1:-1])
+        assert data.tolist() == self.samples.tolist()
+
+    def test_all_at_once(self):
+        parser = CaptureParser()
+        events = list(parser.feed(make_stream(self.samples, 24)))
+        # Each frame has exactly 2 samples in it
+        assert [len(e) for e in events[1:-1]] == [2, 2, 1]
+        self.assert_events(events)
+
+    def test_byte_at_a_time(self):
+        parser = CaptureParser()
+        stream = make_stream(self.samples, 17)
+        events = []
+        for i in range(len(stream)):
+            events += list(parser.feed(stream[i : i + 1]))
+        self.assert_events(events)
+
+    def test_second_acquisition(self):
+        parser = CaptureParser()
+        stream = make_stream(self.samples, 24)
+        events = list(parser.feed(stream))
+        # The next one doesn't get an OK
+        events2 = list(parser.feed(stream[3:]))
+        self.assert_events(events)
+        self.assert_events(events2)
+
+    def test_bad_options(self):
+        parser = CaptureParser()
+        with self.assertRaises(AssertionError):
+            list(parser.feed(b"ERR Unknown option\n"))
+
+
+class TestPandABlocksDataClient(unittest.TestCase):
+    def test_iter_events(self):
+        samples = np.zeros(3, SAMPLE_DTYPE)
+        stream = make_stream(samples, 12)
+        socket = Mock()
+        socket.recv.side_effect = [stream[:50], stream[50:], b""]
+        c = PandABlocksDataClient("h", 8889)
+        c.connect(Mock(return_value=socket))
+        events = list(c.iter_events())
+        assert socket.mock_calls[:2] == [
+            call.connect(("h", 8889)),
+            call.sendall(b"XML FRAMED SCALED\n"),
+        ]
+        assert len(events) == 5
+        assert isinstance(events[0], CaptureStart)
+        assert events[-1] == CaptureEnd(3, "Ok")
+        c.close()
+        socket.close.assert_called_once_with()
@@ -0,0 +1,258 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from collections import OrderedDict
+
+import numpy as np
+
+from malcolm.core import Process
+from malcolm.modules.pandablocks.controllers import PandAManagerController
+from malcolm.modules.pandablocks.pandablocksclient import (
+    BlockData,
+    FieldData,
+    PandABlocksClient,
+    TableFieldData,
+)
+from malcolm.modules.pandablocks.pandablockssimulator import (
+    PandABlocksSimulator,
+    capture_layout,
+    load_layout,
+)
+
+
+def make_field(typ, subtype="", description="", labels=(), **kwargs):
+    return OrderedDict(
+        type=typ,
+        subtype=subtype,
+        description=description,
+        labels=list(labels),
+        **kwargs
+    )
+
+
+def make_layout():
+    blocks = OrderedDict()
+    fields = OrderedDict()
+    fields["INP"] = make_field("pos_mux", description="Input", labels=["ZERO", "X"])
+    fields["START"] = make_field("param", "pos", "Start position")
+    fields["OUT"] = make_field("bit_out", description="Output")
+    blocks["PCOMP"] = OrderedDict(number=1, description="Compare", fields=fields)
+    fields = OrderedDict()
+    fields["VAL"] = make_field("bit_out", description="Value")
+    blocks["TTLIN"] = OrderedDict(number=2, description="TTL input", fields=fields)
+    fields = OrderedDict()
+    fields["OUT"] = make_field("pos_out", description="Output")
+    blocks["COUNTER"] = OrderedDict(number=1, description="Counter", fields=fields)
+    table_fields = OrderedDict()
+    table_fields["REPEATS"] = OrderedDict(
+        bits_hi=15, bits_lo=0, description="Repeats", labels=None, signed=False
+    )
+    table_fields["TRIGGER"] = OrderedDict(
+        bits_hi=19, bits_lo=16, description="Trigger", labels=["A", "B"], signed=False
+    )
+    fields = OrderedDict()
+    fields["TABLE"] = make_field("table", description="Sequencer table")
+    fields["TABLE"]["table_fields"] = table_fields
+    blocks["SEQ"] = OrderedDict(number=1, description="Sequencer", fields=fields)
+    fields = OrderedDict()
+    fields["BITS0"] = make_field("ext_out", "bits", "Bits", ["No", "Value"])
+    blocks["PCAP"] = OrderedDict(number=1, description="Capture", fields=fields)
+    values = OrderedDict()
+    values["PCOMP.INP"] = "ZERO"
+    values["PCOMP.START"] = "0"
+    values["PCOMP.OUT"] = "0"
+    values["TTLIN1.VAL"] = "0"
+    values["TTLIN2.VAL"] = "1"
+    values["COUNTER.OUT"] = "5"
+    values["COUNTER.OUT.CAPTURE"] = "Min Max"
+    values["PCAP.BITS0.CAPTURE"] = "No"
+    tables = OrderedDict()
+    tables["SEQ.TABLE"] = [1, 0x10002]
+    pcap_bits = OrderedDict()
+    pcap_bits["PCAP.BITS0"] = ["TTLIN1.VAL", "TTLIN2.VAL", "PCOMP.OUT"] + [""] * 29
+    return OrderedDict(blocks=blocks, values=values, tables=tables, pcap_bits=pcap_bits)
+
+
+class TestPandABlocksSimulator(unittest.TestCase):
+    def setUp(self):
+        self.sim = PandABlocksSimulator(make_layout())
+        self.sim.start()
+        self.c = PandABlocksClient("localhost", self.sim.port)
+        self.c.start()
+
+    def tearDown(self):
+        self.c.stop()
+        self.sim.stop()
+
+    def test_blocks_data(self):
+        blocks_data = self.c.get_blocks_data()
+        assert list(blocks_data) == ["COUNTER", "PCAP", "PCOMP", "SEQ", "TTLIN"]
+        assert blocks_data["PCOMP"] == BlockData(
+            1,
+            "Compare",
+            OrderedDict(
+                INP=FieldData("pos_mux", "", "Input", ["ZERO", "X"]),
+                START=FieldData("param", "pos", "Start position", []),
+                OUT=FieldData("bit_out", "", "Output", []),
+            ),
+        )
+        assert blocks_data["PCAP"].fields["BITS0"].labels == ["No", "Value"]
+        assert blocks_data["TTLIN"].number == 2
+
+    def test_table_fields(self):
+        fields = self.c.get_table_fields("SEQ", "TABLE")
+        assert fields == OrderedDict(
+            REPEATS=TableFieldData(15, 0, "Repeats", None, False),
+            TRIGGER=TableFieldData(19, 16, "Trigger", ["A", "B"], False),
+        )
+
+    def test_changes(self):
+        changes = list(self.c.get_changes())
+        assert changes[:-1] == [
+            ("PCOMP.INP", "ZERO"),
+            ("PCOMP.START", "0"),
+            ("PCOMP.OUT", "0"),
+            ("TTLIN1.VAL", "0"),
+            ("TTLIN2.VAL", "1"),
+            ("COUNTER.OUT", "5"),
+            ("COUNTER.OUT.CAPTURE", "Min Max"),
+            ("PCAP.BITS0.CAPTURE", "No"),
+            ("SEQ.TABLE", None),
+        ]
+        assert changes[-1][0] == "SEQ.TABLE"
+        assert changes[-1][1].tolist() == [1, 0x10002]
+        # Nothing has changed since
+        assert list(self.c.get_changes()) == []
+        self.c.set_fields({"PCOMP.INP": "X", "PCOMP.START": "3"})
+        assert list(self.c.get_changes()) == [("PCOMP.INP", "X"), ("PCOMP.START", "3")]
+        assert self.c.get_field("PCOMP", "INP") == "X"
+
+    def test_set_table(self):
+        list(self.c.get_changes())
+        int_values = np.arange(1000, dtype=np.uint32)
+        self.c.set_table("SEQ", "TABLE", int_values)
+        assert (self.sim.tables["SEQ.TABLE"] == int_values).all()
+        changes = list(self.c.get_changes())
+        assert changes[0] == ("SEQ.TABLE", None)
+        assert (changes[1][1] == int_values).all()
+        # Decimal tables still work
+        resp = self.c.send_recv("SEQ.TABLE<\n5\n6\n\n")
+        assert resp == "OK"
+        assert self.c.send_recv("SEQ.TABLE?\n") == ["5", "6"]
+
+    def test_bad_table_lines(self):
+        before = self.sim.tables["SEQ.TABLE"].tolist()
+        for message in ("SEQ.TABLE<\nfive\n\n", "SEQ.TABLE<B\nAQA\n\n"):
+            with self.assertRaises(ValueError) as cm:
+                self.c.send_recv(message)
+            assert str(cm.exception).startswith("ERR ")
+        assert self.sim.tables["SEQ.TABLE"].tolist() == before
+        # The connection is still usable
+        assert self.c.get_field("PCOMP", "INP") == "ZERO"
+
+    def test_errors(self):
+        with self.assertRaises(ValueError) as cm:
+            self.c.set_field("PCOMP", "INP", "Y")
+        assert str(cm.exception) == (
+            "Error setting PCOMP.INP to 'Y': ERR Invalid enum value 'Y'"
+        )
+        with self.assertRaises(ValueError) as cm:
+            self.c.set_field("PCAP", "BITS0.CAPTURE", "Bad")
+        assert str(cm.exception) == (
+            "Error setting PCAP.BITS0.CAPTURE to 'Bad': ERR Invalid enum value 'Bad'"
+        )
+        self.c.set_field("PCAP", "BITS0.CAPTURE", "Value")
+        assert self.sim.values["PCAP.BITS0.CAPTURE"] == "Value"
+        with self.assertRaises(ValueError) as cm:
+            self.c.get_field("PCOMP", "BAD")
+        assert str(cm.exception) == (
+            "Error getting PCOMP.BAD: ERR No such field PCOMP.BAD"
+        )
+
+    def test_capture_and_pcap(self):
+        assert self.c.get_capture_fields() == [
+            ("COUNTER.OUT", "Min"),
+            ("COUNTER.OUT", "Max"),
+        ]
+        assert self.c.get_pcap_bits_fields() == {
+            "PCAP.BITS0.CAPTURE": self.sim.pcap_bits["PCAP.BITS0"]
+        }
+        assert self.c.send_recv("*PCAP.STATUS?\n") == "OK =Idle"
+        assert self.c.send_recv("*PCAP.ARM=\n") == "OK"
+        assert self.c.send_recv("*PCAP.STATUS?\n") == "OK =Busy"
+        with self.assertRaises(ValueError):
+            self.c.send_recv("*PCAP.ARM=\n")
+        assert self.c.send_recv("*PCAP.DISARM=\n") == "OK"
+        assert self.c.send_recv("*CAPTURE=\n") == "OK"
+        assert self.c.get_capture_fields() == []
+
+    def test_change_rate(self):
+        list(self.c.get_changes())
+        self.sim.change_rate = 4
+        # Pretend a second has passed since the last injection
+        self.sim._last_inject -= 1
+        changes = list(self.c.get_changes())
+        assert changes == [
+            ("PCOMP.OUT", "1"),
+            ("TTLIN1.VAL", "1"),
+            ("TTLIN2.VAL", "0"),
+            ("COUNTER.OUT", "6"),
+        ]
+
+    def test_latency(self):
+        self.sim.latency = 0.05
+        start = time.time()
+        self.c.set_fields({"PCOMP.START": "1", "PCOMP.OUT": "1"})
+        assert time.time() - start >= 0.1
+
+    def test_capture_layout(self):
+        layout = capture_layout(self.c)
+        tmpdir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmpdir, "layout.json")
+            with open(path, "w") as f:
+                json.dump(layout, f)
+            # The client sorts the blocks, so compare without ordering
+            expected = json.loads(json.dumps(make_layout()))
+            assert json.loads(json.dumps(load_layout(path))) == expected
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestPandAManagerControllerWithSimulator(unittest.TestCase):
+    def setUp(self):
+        self.sim = PandABlocksSimulator(make_layout())
+        self.sim.start()
+        self.process = Process("proc")
+        self.config_dir = tempfile.mkdtemp()
+        self.o = PandAManagerController(
+            mri="P", config_dir=self.config_dir, port=self.sim.port, use_git=False
+        )
+        self.process.add_controller(self.o)
+        self.process.start()
+
+    def tearDown(self):
+        self.process.stop(timeout=2)
+        self.sim.stop()
+        shutil.rmtree(self.config_dir)
+
+    def test_blocks(self):
+        assert self.process.mri_list == [
+            "P",
+            "P:COUNTER",
+            "P:PCAP",
+            "P:PCOMP",
+            "P:SEQ",
+            "P:TTLIN1",
+            "P:TTLIN2",
+        ]
+        pcomp = self.process.block_view("P:PCOMP")
+        assert pcomp.inp.value == "ZERO"
+        pcomp.inp.put_value("X")
+        assert self.sim.values["PCOMP.INP"] == "X"
+        seq = self.process.block_view("P:SEQ")
+        assert seq.table.value.repeats == [1, 2]
+        assert seq.table.value.trigger == ["A", "B"]
@@ -1,11 +1,12 @@
 import unittest
 from collections import OrderedDict
 
+import numpy as np
 from mock import Mock
 
 from malcolm.core import BooleanArrayMeta, ChoiceArrayMeta, NumberArrayMeta, TableMeta
 from malcolm.modules.pandablocks.pandablocksclient import TableFieldData
-from malcolm.modules.pandablocks.parts.pandatablepart import PandATablePart
+from malcolm.modules.pandablocks.parts.pandatablepart import LabelLookup, PandATablePart
 
 
 class PandABoxTablePartTest(unittest.TestCase):
@@ -134,7 +135,7 @@ class PandABoxTablePartTest(unittest.TestCase):
             6,
             200,
         ]
-        table = self.o.table_from_list([str(x) for x in li])
+        table = self.o.table_from_list(np.array(li, dtype=np.uint32))
         assert table.nrepeats == [32, 0, 0]
         assert table.trigger == ["b", "b", "CC"]
         assert table.position == [-1, 1, 0]
@@ -143,6 +144,29 @@ class PandABoxTablePartTest(unittest.TestCase):
         assert table.time2 == [4097, 200, 200]
         assert table.outa2 == [False, True, False]
 
+    def test_round_trip(self):
+        nrows = 4096
+        rows = [
+            [i, ["A", "b", "CC"][i % 3], i - 2048, i, i % 2 == 0, i * 2, i % 2 == 1]
+            for i in range(nrows)
+        ]
+        table = self.meta.validate(self.meta.table_cls.from_rows(rows))
+        li = self.o.list_from_table(table)
+        assert len(li) == nrows * 4
+        assert self.o.table_from_list(li) == table
+
+    def test_label_lookup(self):
+        lookup = LabelLookup(["A", "b", "CC"])
+        indexes = lookup.indexes_from_labels(["CC", "A", "b", "CC"])
+        assert indexes.dtype == np.uint32
+        assert indexes.tolist() == [2, 0, 1, 2]
+        assert lookup.labels_from_indexes(indexes) == ["CC", "A", "b", "CC"]
+        with self.assertRaises(ValueError) as cm:
+            lookup.indexes_from_labels(["A", "D", "0"])
+        assert str(cm.exception) == (
+            "['0', 'D'] are not valid labels in ['A', 'b', 'CC']"
+        )
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -0,0 +1,189 @@
+import os
+import shutil
+import socket
+import struct
+import tempfile
+import unittest
+
+import cothread
+import h5py
+import numpy as np
+from mock import MagicMock, Mock, patch
+from scanpointgenerator import CompoundGenerator, LineGenerator
+
+from malcolm.core import AbortedError, Process
+from malcolm.modules.builtin.defines import tmp_dir
+from malcolm.modules.pandablocks.parts import PandACapturePart
+from malcolm.modules.pandablocks.parts.pandacapturepart import iter_step_slices
+from malcolm.modules.scanning.controllers import RunnableController
+from malcolm.modules.scanning.parts import DatasetTablePart
+from malcolm.modules.scanning.util import DatasetType
+
+HEADER = b"""<header>
+<data arm_time="2020-01-01T00:00:00Z" missed="0" process="Scaled" format="Framed" sample_bytes="16" />
+<fields>
+<field name="INENC1.VAL" type="double" capture="Value" scale="1" offset="0" units="" />
+<field name="COUNTER1.OUT" type="double" capture="Min" scale="1" offset="0" units="" />
+</fields>
+</header>
+
+"""  # noqa: E501
+
+
+def make_stream(nsamples, frame_bytes, first=0, connected=True):
+    data = np.arange(first * 2, (first + nsamples) * 2, dtype="<f8").tobytes()
+    chunks = [data[i : i + frame_bytes] for i in range(0, len(data), frame_bytes)]
+    frames = [b"BIN " + struct.pack("<I", len(c) + 8) + c for c in chunks]
+    if connected:
+        frames.insert(0, b"OK\n" + HEADER)
+    else:
+        frames.insert(0, HEADER)
+    return frames + [b"END %d Ok\n" % nsamples]
+
+
+class TestIterStepSlices(unittest.TestCase):
+    def test_2d(self):
+        assert list(iter_step_slices((3, 4), 2, 11)) == [
+            ((0, slice(2, 4)), 2, 4),
+            ((1, slice(0, 4)), 4, 8),
+            ((2, slice(0, 3)), 8, 11),
+        ]
+
+    def test_1d(self):
+        assert list(iter_step_slices((5,), 1, 4)) == [((slice(1, 4),), 1, 4)]
+
+
+class TestPandACapturePart(unittest.TestCase):
+    def setUp(self):
+        self.process = Process("proc")
+        self.tmpdir = tempfile.mkdtemp()
+        self.config_dir = tmp_dir("config_dir")
+        c = RunnableController("mri", self.config_dir.value, use_git=False)
+        # Small enough that a 6 step scan uses both buffers
+        self.o = PandACapturePart("PANDA", "pandahost", chunk_samples=4)
+        c.add_part(self.o)
+        c.add_part(DatasetTablePart("DSET"))
+        self.process.add_controller(c)
+        self.process.start()
+        self.b = self.process.block_view("mri")
+        patcher = patch(
+            "malcolm.modules.pandablocks.parts.pandacapturepart.PandABlocksClient"
+        )
+        self.client = patcher.start().return_value
+        self.client.get_capture_fields.return_value = [
+            ("INENC1.VAL", "Value"),
+            ("COUNTER1.OUT", "Min"),
+        ]
+        self.addCleanup(patcher.stop)
+        self.socket = MagicMock()
+        patcher = patch(
+            "malcolm.modules.pandablocks.parts.pandacapturepart.socket",
+            Mock(return_value=self.socket),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.process.stop(timeout=2)
+        shutil.rmtree(self.tmpdir)
+        shutil.rmtree(self.config_dir.value)
+
+    def make_generator(self):
+        linex = LineGenerator("x", "mm", 0, 2, 3)
+        liney = LineGenerator("y", "mm", 0, 1, 2)
+        return CompoundGenerator([liney, linex], [], [], 0.1)
+
+    def test_configure(self):
+        self.b.configure(self.make_generator(), self.tmpdir)
+        self.client.start.assert_called_once()
+        self.client.stop.assert_called_once_with()
+        self.socket.connect.assert_called_once_with(("pandahost", 8889))
+        self.socket.sendall.assert_called_once_with(b"XML FRAMED SCALED\n")
+        assert list(self.b.datasets.value.rows()) == [
+            [
+                "panda.INENC1.VAL.Value",
+                "panda.h5",
+                DatasetType.POSITION_VALUE,
+                4,
+                "/entry/INENC1.VAL.Value",
+                "/entry/uid",
+            ],
+            [
+                "panda.COUNTER1.OUT.Min",
+                "panda.h5",
+                DatasetType.POSITION_MIN,
+                4,
+                "/entry/COUNTER1.OUT.Min",
+                "/entry/uid",
+            ],
+        ]
+        self.b.reset()
+        self.socket.close.assert_called_once_with()
+
+    def test_run(self):
+        # Frames of 24 bytes split samples of 16 bytes in half
+        self.socket.recv.side_effect = make_stream(6, 24)
+        self.b.configure(self.make_generator(), self.tmpdir)
+        self.b.run()
+        assert self.b.completedSteps.value == 6
+        with h5py.File(os.path.join(self.tmpdir, "panda.h5"), "r") as hdf:
+            assert hdf["/entry/uid"].shape == (2, 3, 1, 1)
+            assert hdf["/entry/uid"][:, :, 0, 0].tolist() == [[1, 2, 3], [4, 5, 6]]
+            assert hdf["/entry/INENC1.VAL.Value"][:, :, 0, 0].tolist() == [
+                [0, 2, 4],
+                [6, 8, 10],
+            ]
+            assert hdf["/entry/COUNTER1.OUT.Min"][:, :, 0, 0].tolist() == [
+                [1, 3, 5],
+                [7, 9, 11],
+            ]
+
+    def test_run_ends_early(self):
+        stream = make_stream(6, 32)
+        # Only send 2 frames, then the end
+        self.socket.recv.side_effect = stream[:3] + [b"END 4 Disarmed\n"]
+        self.b.configure(self.make_generator(), self.tmpdir)
+        with self.assertRaises(ValueError) as cm:
+            self.b.run()
+        assert str(cm.exception) == (
+            "PandA capture ended with 'Disarmed' after 4 of 6 steps"
+        )
+
+    def test_abort_while_idle(self):
+        # The header and first frame, then nothing
+        chunks = iter(make_stream(6, 32)[:2])
+
+        def recv(n):
+            for chunk in chunks:
+                return chunk
+            cothread.Sleep(0.01)
+            raise socket.timeout("timed out")
+
+        self.socket.recv.side_effect = recv
+        self.b.configure(self.make_generator(), self.tmpdir)
+        f = self.b.run_async()
+        cothread.Sleep(0.2)
+        self.b.abort()
+        with self.assertRaises(AbortedError):
+            f.result(timeout=1)
+        assert self.b.state.value == "Aborted"
+        self.socket.settimeout.assert_called_with(0.1)
+
+    def test_run_twice(self):
+        # PCAP is armed for each run, so each gets its own acquisition
+        self.socket.recv.side_effect = make_stream(3, 32) + make_stream(
+            3, 32, first=3, connected=False
+        )
+        self.b.configure(self.make_generator(), self.tmpdir, axesToMove=["x"])
+        self.b.run()
+        assert self.b.completedSteps.value == 3
+        assert self.b.state.value == "Armed"
+        # The END of the first acquisition is skipped
+        self.b.run()
+        assert self.b.completedSteps.value == 6
+        with h5py.File(os.path.join(self.tmpdir, "panda.h5"), "r") as hdf:
+            assert hdf["/entry/uid"][:, :, 0, 0].tolist() == [[1, 2, 3], [4, 5, 6]]
+            assert hdf["/entry/INENC1.VAL.Value"][:, :, 0, 0].tolist() == [
+                [0, 2, 4],
+                [6, 8, 10],
+            ]
@@ -31,7 +31,7 @@ class TestCSOutlinksPart(unittest.TestCase):
             ["PV:PRE:Port"],
             datatype=self.catools.DBR_STRING,
             format=self.catools.FORMAT_CTRL,
-            throw=True,
+            throw=False,
         )
         assert list(self.b) == [
             "meta",
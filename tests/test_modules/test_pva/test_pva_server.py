@@ -695,14 +695,14 @@ class TestPVAServer(unittest.TestCase):
         self.ctxt.put("TESTCOUNTER.counter", 5, "value")
         counter = q.get(timeout=1)
         self.assertEqual(counter.value, 5)
-        self.assertEqual(
-            counter.changedSet(),
-            {
-                "value",
-                "timeStamp.userTag",
-                "timeStamp.secondsPastEpoch",
-                "timeStamp.nanoseconds",
-            },
+        # Only the fields that changed are marked, userTag is always 0 and
+        # secondsPastEpoch may not have ticked over
+        changed = counter.changedSet()
+        self.assertTrue(changed.issuperset({"value", "timeStamp.nanoseconds"}))
+        self.assertTrue(
+            changed.issubset(
+                {"value", "timeStamp.secondsPastEpoch", "timeStamp.nanoseconds"}
+            )
         )
         self.ctxt.put("TESTCOUNTER.counter", 0, "value")
         counter = q.get(timeout=1)
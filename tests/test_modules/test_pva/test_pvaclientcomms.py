@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+
+from malcolm.core import BlockModel, NumberArrayMeta, StringArrayMeta, TableMeta
+from malcolm.core.notifier import freeze
+from malcolm.modules.pva.controllers import PvaClientComms
+from malcolm.modules.pva.controllers.pvaconvert import convert_dict_to_value
+
+
+class TestPvaClientComms(unittest.TestCase):
+    def setUp(self):
+        self.o = PvaClientComms("mri")
+        self.block = BlockModel()
+        self.block.set_endpoint_data(
+            "waveform", NumberArrayMeta("float64").create_attribute_model([0.0])
+        )
+        table_meta = TableMeta(
+            elements=dict(name=StringArrayMeta(), x=NumberArrayMeta("uint16"))
+        )
+        self.block.set_endpoint_data(
+            "table", table_meta.create_attribute_model(dict(name=["a"], x=[1]))
+        )
+        self.value = convert_dict_to_value(freeze(self.block))
+        self.update_fields = {"waveform.value", "table.value"}
+
+    def test_update_array_without_copy(self):
+        self.value.unmark()
+        self.value["waveform.value"] = np.arange(1000.0)
+        self.o._update_block(self.block, self.value, self.update_fields)
+        # p4p gives us a read-only view of its buffer, and it makes it all
+        # the way into the Attribute
+        received = self.value["waveform.value"]
+        stored = self.block.waveform.value.seq
+        assert not stored.flags.writeable
+        assert np.shares_memory(stored, received)
+        assert list(stored[:3]) == [0.0, 1.0, 2.0]
+
+    def test_update_table_without_copy(self):
+        self.value.unmark()
+        self.value["table.value"] = dict(
+            name=["a", "b"], x=np.array([3, 4], dtype=np.uint16)
+        )
+        self.o._update_block(self.block, self.value, self.update_fields)
+        stored = self.block.table.value.x.seq
+        assert stored.dtype == np.uint16
+        assert np.shares_memory(stored, self.value["table.value.x"])
+        assert self.block.table.value.name == ["a", "b"]
@@ -0,0 +1,75 @@
+import gc
+import unittest
+
+from malcolm.core import NumberArrayMeta, StringArrayMeta, TableMeta
+from malcolm.core.notifier import freeze
+from malcolm.modules.pva.controllers.pvaconvert import (
+    convert_dict_to_value,
+    convert_to_type_tuple_value,
+    labels_cache,
+    spec_cache,
+    type_cache,
+    update_path,
+)
+
+
+class TestPvaConvert(unittest.TestCase):
+    def setUp(self):
+        meta = TableMeta(
+            "Positions",
+            elements=dict(
+                name=StringArrayMeta(label="Name"), x=NumberArrayMeta("float64")
+            ),
+        )
+        self.attr = meta.create_attribute_model(dict(name=["a", "b"], x=[1.0, 2.0]))
+
+    def test_nttable_labels(self):
+        value = convert_dict_to_value(freeze(self.attr))
+        assert value.getID() == "epics:nt/NTTable:1.0"
+        assert value["labels"] == ["Name", "x"]
+        assert list(value["value"]["x"]) == [1.0, 2.0]
+
+    def test_frozen_dicts_cached(self):
+        frozen = freeze(self.attr)
+        spec, value_for_set = convert_to_type_tuple_value(frozen)
+        assert convert_to_type_tuple_value(frozen) == (spec, value_for_set)
+        # The meta is cached too, so the next value doesn't recurse into it
+        meta_spec, _ = convert_to_type_tuple_value(frozen["meta"])
+        assert convert_to_type_tuple_value(frozen["meta"])[0] is meta_spec
+        convert_dict_to_value(frozen)
+        n_types = len(type_cache)
+        convert_dict_to_value(frozen)
+        assert len(type_cache) == n_types
+
+    def test_cache_dropped_when_frozen_dict_is(self):
+        gc.collect()
+        before = (len(spec_cache), len(type_cache), len(labels_cache))
+        frozen = freeze(self.attr)
+        convert_dict_to_value(frozen)
+        assert len(spec_cache) > before[0]
+        assert len(type_cache) == before[1] + 1
+        assert len(labels_cache) == before[2] + 1
+        del frozen
+        gc.collect()
+        assert (len(spec_cache), len(type_cache), len(labels_cache)) == before
+
+    def test_changed_meta_is_not_cached(self):
+        convert_dict_to_value(freeze(self.attr))
+        self.attr.meta.elements["name"].set_label("Full Name")
+        value = convert_dict_to_value(freeze(self.attr))
+        assert value["labels"] == ["Full Name", "x"]
+
+    def test_update_path_marks_only_changed(self):
+        value = convert_dict_to_value(freeze(self.attr))
+        value.unmark()
+        self.attr.set_value(dict(name=["a", "b"], x=[1.0, 3.0]))
+        update_path(value, ["value"], freeze(self.attr.value))
+        assert value.changedSet() == {"value.x"}
+        assert list(value["value"]["x"]) == [1.0, 3.0]
+        # Setting the whole attribute only marks what differs too
+        value.unmark()
+        update_path(value, ["meta"], freeze(self.attr.meta))
+        assert not value.changed()
+        self.attr.meta.set_description("New")
+        update_path(value, ["meta"], freeze(self.attr.meta))
+        assert value.changedSet() == {"meta.description"}
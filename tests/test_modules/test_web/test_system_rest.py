@@ -1,3 +1,4 @@
+import json
 import unittest
 
 import cothread
@@ -5,7 +6,8 @@ from annotypes import json_encode
 from tornado import gen
 from tornado.httpclient import AsyncHTTPClient, HTTPRequest
 
-from malcolm.core import Process, Queue
+from malcolm.core import Alarm, Process, Queue
+from malcolm.modules.builtin.infos import HealthInfo
 from malcolm.modules.demo.blocks import hello_block
 from malcolm.modules.web.blocks import web_server_block
 from malcolm.modules.web.util import IOLoopHelper
@@ -34,6 +36,14 @@ class TestSystemRest(unittest.TestCase):
         )
         cothread.Callback(self.result.put, result)
 
+    @gen.coroutine
+    def fetch(self, endpoint, **kwargs):
+        req = HTTPRequest(
+            "http://localhost:%s/rest/%s" % (self.socket, endpoint), **kwargs
+        )
+        result = yield self.http_client.fetch(req, raise_error=False)
+        cothread.Callback(self.result.put, result)
+
     @gen.coroutine
     def post(self, mri, method, args):
         req = HTTPRequest(
@@ -53,3 +63,52 @@ class TestSystemRest(unittest.TestCase):
         IOLoopHelper.call(self.post, "hello", "greet", json_encode(dict(name="me")))
         result = self.result.get(timeout=2)
         assert result.body.decode().strip() == json_encode("Hello me")
+
+    def test_get_bulk(self):
+        IOLoopHelper.call(
+            self.fetch, "?path=hello/health/value&path=hello/greet/meta/description"
+        )
+        result = self.result.get(timeout=2)
+        assert result.code == 200
+        assert json.loads(result.body.decode()) == {
+            "hello/health/value": "OK",
+            "hello/greet/meta/description": self.hello._block.greet.meta.description,
+        }
+
+    def test_get_bulk_bad_path(self):
+        IOLoopHelper.call(self.fetch, "?path=hello/health&path=hello/nothing")
+        result = self.result.get(timeout=2)
+        assert result.code == 500
+
+    def test_get_etag_not_modified(self):
+        IOLoopHelper.call(self.fetch, "hello/health/value")
+        result = self.result.get(timeout=2)
+        assert result.code == 200
+        etag = result.headers["Etag"]
+        IOLoopHelper.call(
+            self.fetch, "hello/health/value", headers={"If-None-Match": etag}
+        )
+        result = self.result.get(timeout=2)
+        assert result.code == 304
+        assert result.body == b""
+        # Changing the timeStamp changes the ETag
+        self.hello.update_health(self, HealthInfo(Alarm.ok))
+        IOLoopHelper.call(
+            self.fetch, "hello/health/value", headers={"If-None-Match": etag}
+        )
+        result = self.result.get(timeout=2)
+        assert result.code == 200
+        assert result.headers["Etag"] != etag
+
+    def test_get_etag_alarm_changed(self):
+        IOLoopHelper.call(self.fetch, "hello/health")
+        result = self.result.get(timeout=2)
+        assert result.code == 200
+        etag = result.headers["Etag"]
+        # Changing the alarm doesn't change the timeStamp, but the ETag must
+        self.hello._block.health.set_alarm(Alarm.major("Bad"))
+        IOLoopHelper.call(self.fetch, "hello/health", headers={"If-None-Match": etag})
+        result = self.result.get(timeout=2)
+        assert result.code == 200
+        assert result.headers["Etag"] != etag
+        assert json.loads(result.body.decode())["alarm"]["message"] == "Bad"
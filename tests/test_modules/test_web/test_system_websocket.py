@@ -3,7 +3,7 @@ import unittest
 from sys import version_info
 
 import cothread
-from annotypes import json_encode
+from annotypes import FrozenOrderedDict, json_encode
 from tornado import gen
 from tornado.websocket import websocket_connect
 
@@ -12,7 +12,7 @@ from malcolm.core import Post, Process, Queue, ResponseError
 from malcolm.modules.builtin.blocks import proxy_block
 from malcolm.modules.demo.blocks import counter_block, hello_block
 from malcolm.modules.web.blocks import web_server_block, websocket_client_block
-from malcolm.modules.web.util import IOLoopHelper
+from malcolm.modules.web.util import BINARY_SUBPROTOCOL, IOLoopHelper
 
 
 class TestSystemWSCommsServerOnly(unittest.TestCase):
@@ -235,7 +235,7 @@ class TestSystemWSCommsServerOnly(unittest.TestCase):
                 "UnexpectedError: Object 'hello.greet.meta.takes.elements' "
                 "of type %r has no attribute 'bad'"
             )
-            % type(OrderedDict()),
+            % FrozenOrderedDict,
         )
 
     def test_error_server_and_simple_client_bad_path_attribute(self):
@@ -275,7 +275,7 @@ class TestSystemWSCommsServerAndClient(unittest.TestCase):
         for controller in (
             hello_block(mri="hello")
             + counter_block(mri="counter")
-            + web_server_block(mri="server", port=self.socket)
+            + web_server_block(mri="server", port=self.socket, compression_level=6)
         ):
             self.process.add_controller(controller)
         self.process.start()
@@ -315,6 +315,38 @@ class TestSystemWSCommsServerAndClient(unittest.TestCase):
             "server",
         ]
 
+    def test_binary_negotiated(self):
+        client = self.process2.get_controller("client")
+        assert client._conn.selected_subprotocol == BINARY_SUBPROTOCOL
+
+    def test_compression_negotiated(self):
+        client = self.process2.get_controller("client")
+        extensions = client._conn.headers.get("Sec-WebSocket-Extensions")
+        assert extensions.startswith("permessage-deflate")
+
+    def test_reconnect(self):
+        client = self.process2.get_controller("client")
+        block1 = self.process.block_view("counter")
+        block2 = self.process2.block_view("counter")
+        conn = client._conn
+        IOLoopHelper.call(conn.close)
+        for _ in range(100):
+            cothread.Sleep(0.05)
+            if client._conn not in (None, conn) and client._block.health.alarm.is_ok():
+                break
+        assert client._conn not in (None, conn)
+        assert client.state.value == "Ready"
+        # The subscription has been replayed, so we see changes made on the server
+        block1.increment()
+        for _ in range(20):
+            if block2.counter.value == 1:
+                break
+            cothread.Sleep(0.05)
+        assert block2.counter.value == 1
+        # And we can still send requests
+        block2.zero()
+        assert block1.counter.value == 0
+
     def test_server_blocks(self):
         block = self.process.block_view("server")
         assert block.blocks.value.mri == ["hello", "counter", "server"]
@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+from annotypes import Array, json_decode
+
+from malcolm.core import NumberArrayMeta, Update, json_encode
+from malcolm.modules.web.util import binary_decode, binary_encode
+
+
+class TestBinaryCodec(unittest.TestCase):
+    def test_roundtrip_arrays(self):
+        value = dict(
+            f=Array[float](np.array([1.5, 2.5, 3.5])),
+            i=np.arange(3, dtype=np.int32),
+            b=np.array([True, False]),
+            big=np.arange(3, dtype=">u2"),
+            empty=np.array([], dtype=np.float32),
+            square=np.arange(4, dtype=np.int8).reshape((2, 2)),
+            strings=Array[str](["a", "b"]),
+            s="text",
+        )
+        message = binary_encode(Update(1, value))
+        d = binary_decode(message)
+        assert d["typeid"] == "malcolm:core/Update:1.0"
+        v = d["value"]
+        assert v["f"].dtype == np.float64
+        assert list(v["f"]) == [1.5, 2.5, 3.5]
+        assert v["i"].dtype == np.int32
+        assert list(v["i"]) == [0, 1, 2]
+        assert list(v["b"]) == [True, False]
+        assert v["big"].dtype == "<u2"
+        assert list(v["big"]) == [0, 1, 2]
+        assert len(v["empty"]) == 0
+        assert v["square"].tolist() == [[0, 1], [2, 3]]
+        assert v["strings"] == ["a", "b"]
+        assert v["s"] == "text"
+        # Arrays are aligned read-only views of the message
+        for k in ("f", "i", "b", "big", "square"):
+            assert v[k].flags.aligned
+            assert not v[k].flags.writeable
+
+    def test_same_as_json(self):
+        attr = NumberArrayMeta("float64").create_attribute_model([1.0, 2.0])
+        d = binary_decode(binary_encode(attr))
+        expected = json_decode(json_encode(attr))
+        assert list(d) == list(expected)
+        assert list(d["value"]) == expected["value"]
+        assert d["meta"] == expected["meta"]
+
+    def test_bad_message_raises(self):
+        with self.assertRaises(ValueError):
+            binary_decode(b"\x10\x00")
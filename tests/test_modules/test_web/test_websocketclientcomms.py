@@ -1,7 +1,12 @@
+import threading
 import unittest
 
-from malcolm.core import Process
+from mock import MagicMock, patch
+from tornado.concurrent import Future
+
+from malcolm.core import Error, Process, Put, ResponseError, Subscribe
 from malcolm.modules.web.controllers import WebsocketClientComms
+from malcolm.modules.web.util import IOLoopHelper
 
 
 class TestWebsocketClientComms(unittest.TestCase):
@@ -14,3 +19,118 @@ class TestWebsocketClientComms(unittest.TestCase):
         assert self.o.port == 8008
         assert self.o.connect_timeout == 10.0
         assert self.o.mri == "mri"
+        assert self.o.reconnect is True
+
+    @patch("malcolm.modules.web.controllers.websocketclientcomms.IOLoopHelper")
+    def test_queued_requests_sent_together(self, helper):
+        put1 = Put(path=["b", "a", "value"], value=1)
+        put2 = Put(path=["b", "a", "value"], value=2)
+        self.o._queue_request(put1)
+        self.o._queue_request(put2)
+        # Only one trip to tornado for both
+        helper.call.assert_called_once_with(self.o._flush_requests)
+        self.o._conn = MagicMock(selected_subprotocol=None)
+        self.o._flush_requests()
+        assert put1.id == 1
+        assert put2.id == 2
+        assert self.o._request_lookup == {1: put1, 2: put2}
+        assert self.o._conn.write_message.call_count == 2
+        self.o._queue_request(put1)
+        assert helper.call.call_count == 2
+
+    @patch("malcolm.modules.web.controllers.websocketclientcomms.cothread")
+    def test_disconnect_fails_all_but_subscribes(self, cothread):
+        put = Put(path=["b", "a", "value"], value=1)
+        subscribe = Subscribe(path=["b"])
+        self.o._conn = MagicMock(selected_subprotocol=None)
+        self.o._send_request(put)
+        self.o._send_request(subscribe)
+        self.o._fail_requests(Subscribe)
+        assert self.o._request_lookup == {2: subscribe}
+        cb, request, response = cothread.Callback.call_args[0]
+        assert cb == self.o._notify
+        assert request is put
+        assert isinstance(response, Error)
+        assert isinstance(response.message, ResponseError)
+
+    @patch("malcolm.modules.web.controllers.websocketclientcomms.cothread")
+    def test_put_while_disconnected_fails(self, cothread):
+        put = Put(path=["b", "a", "value"], value=1)
+        subscribe = Subscribe(path=["b"])
+        self.o._send_request(put)
+        self.o._send_request(subscribe)
+        # The Subscribe waits for the reconnect, the Put fails straight away
+        assert self.o._request_lookup == {2: subscribe}
+        cb, request, response = cothread.Callback.call_args[0]
+        assert cb == self.o._notify
+        assert request is put
+        assert isinstance(response, Error)
+
+    def make_conn(self, *messages):
+        conn = MagicMock(selected_subprotocol=None)
+        futures = []
+        for message in messages:
+            future = Future()
+            future.set_result(message)
+            futures.append(future)
+        conn.read_message.side_effect = futures
+        return conn
+
+    def connect_to(self, conn):
+        future = Future()
+        future.set_result(conn)
+        self.o._connect = MagicMock(return_value=future)
+
+    def run_recv_loop(self, generation):
+        # Run it in tornado's thread like the real thing, and wait for it
+        done = threading.Event()
+
+        def run():
+            self.o.recv_loop(generation).add_done_callback(lambda f: done.set())
+
+        IOLoopHelper.call(run)
+        assert done.wait(5)
+
+    @patch("malcolm.modules.web.controllers.websocketclientcomms.cothread")
+    def test_resent_before_connection_published(self, cothread):
+        subscribe = Subscribe(path=["b"])
+        self.o._send_request(subscribe)
+        conn = self.make_conn(None)
+        published = []
+        conn.write_message.side_effect = lambda *args, **kwargs: published.append(
+            self.o._conn
+        )
+        self.connect_to(conn)
+        self.o.reconnect = False
+        self.o._generation = 1
+        self.run_recv_loop(1)
+        # Written once, before _flush_requests could see the connection
+        assert published == [None]
+        cothread.Callback.assert_any_call(self.o._connected_queue.put, None)
+
+    @patch("malcolm.modules.web.controllers.websocketclientcomms.cothread")
+    def test_stale_loop_leaves_new_connection(self, cothread):
+        subscribe = Subscribe(path=["b"])
+        old_conn = self.make_conn()
+        self.connect_to(old_conn)
+        self.o._generation = 1
+
+        def stop_and_restart(*args, **kwargs):
+            # Stopped and started again while the old loop was connected
+            self.o._generation = 2
+            self.o._conn = new_conn
+            self.o._request_lookup[5] = subscribe
+            cothread.Callback.reset_mock()
+            # and then the old connection closes
+            future = Future()
+            future.set_result(None)
+            return future
+
+        new_conn = MagicMock()
+        old_conn.read_message.side_effect = stop_and_restart
+        self.run_recv_loop(1)
+        assert self.o._conn is new_conn
+        new_conn.close.assert_not_called()
+        assert self.o._request_lookup == {5: subscribe}
+        # It only tells _stop_client it has finished
+        cothread.Callback.assert_called_once_with(self.o._connected_queue.put, None)
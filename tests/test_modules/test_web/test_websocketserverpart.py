@@ -0,0 +1,83 @@
+import unittest
+
+from mock import MagicMock
+from tornado.concurrent import Future
+
+from malcolm.core import Delta, Return, Update
+from malcolm.modules.web.parts.websocketserverpart import (
+    OUTBOUND_HIGH_WATER,
+    OUTBOUND_LIMIT,
+    MalcWebSocketHandler,
+)
+
+
+class TestMalcWebSocketHandler(unittest.TestCase):
+    def setUp(self):
+        self.o = MalcWebSocketHandler.__new__(MalcWebSocketHandler)
+        self.o.initialize()
+        self.o.ws_connection = MagicMock(selected_subprotocol=None)
+        # Never complete the writes, so everything after the first is queued
+        self.o.write_message = MagicMock(return_value=Future())
+
+    def test_queued_until_high_water(self):
+        for i in range(OUTBOUND_HIGH_WATER + 1):
+            self.o._on_response(Update(1, i))
+        # The first one is being written, the rest are queued
+        assert self.o.write_message.call_count == 1
+        assert len(self.o._outbound) == OUTBOUND_HIGH_WATER
+        # Once past the high water mark they are merged into the last one
+        self.o._on_response(Update(1, "last"))
+        assert len(self.o._outbound) == OUTBOUND_HIGH_WATER
+        assert self.o._outbound[-1].value == "last"
+
+    def test_deltas_merged(self):
+        for i in range(OUTBOUND_HIGH_WATER):
+            self.o._on_response(Return(i + 10))
+        self.o._on_response(Delta(1, [[["a"], 1], [["b"], 2]]))
+        self.o._on_response(Delta(2, [[["a"], 3]]))
+        self.o._on_response(Delta(1, [[["a"], 4]]))
+        self.o._on_response(Delta(1, [[["c"]]]))
+        assert len(self.o._outbound) == OUTBOUND_HIGH_WATER + 1
+        assert self.o._outbound[-2].changes == [[["b"], 2], [["a"], 4], [["c"]]]
+        assert self.o._outbound[-1].changes == [[["a"], 3]]
+
+    def test_not_merged_past_return(self):
+        for i in range(OUTBOUND_HIGH_WATER):
+            self.o._on_response(Return(i + 10))
+        self.o._on_response(Update(1, 1))
+        self.o._on_response(Return(1))
+        self.o._on_response(Update(1, 2))
+        assert [r.id for r in list(self.o._outbound)[-3:]] == [1, 1, 1]
+        assert self.o._outbound[-1].value == 2
+
+    def test_connection_dropped_at_limit(self):
+        self.o._registrar = MagicMock()
+        self.o.request = MagicMock(remote_ip="1.2.3.4")
+        self.o.close = MagicMock()
+        self.o._id_to_mri[1] = "mri"
+        # Returns are never merged, so they fill the queue
+        for i in range(OUTBOUND_LIMIT + 1):
+            self.o._on_response(Return(i + 10))
+        assert len(self.o._outbound) == OUTBOUND_LIMIT
+        self.o.close.assert_not_called()
+        self.o._on_response(Return(1))
+        assert len(self.o._outbound) == 0
+        self.o.close.assert_called_once_with(
+            1008, "Too many responses waiting to be sent"
+        )
+        # Subscriptions are torn down
+        info = self.o._registrar.report.call_args[0][0]
+        assert info.mri == "mri"
+        assert info.request.typeid == "malcolm:core/Unsubscribe:1.0"
+        assert info.request.id == 1
+        # and later responses ignored
+        self.o._on_response(Return(2))
+        assert len(self.o._outbound) == 0
+        assert self.o.write_message.call_count == 1
+
+    def test_compression_on(self):
+        self.o.initialize(compression_level=6)
+        assert self.o.get_compression_options() == dict(compression_level=6)
+
+    def test_compression_off(self):
+        assert self.o.get_compression_options() is None